@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from langchain_core.messages import SystemMessage
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import END, START, MessagesState, StateGraph
-from langgraph.prebuilt import ToolNode, tools_condition
 
+from agents.context import ContextCompactor
+from agents.history import HistoryCompactor
+from agents.prefetch import PREFETCH_NAME, PrefetchStage
+from agents.tool_executor import ToolExecutor
 from prompt_library.prompt import SYSTEM_PROMPT
-from tools.calculator_tool import (
-    calculate,
-    calculate_percentage,
-    calculate_total_with_tax,
-)
-from tools.currency_conversion import convert_currency
-from tools.place_search import search_places, get_place_details
-from tools.weather_information import get_current_weather, get_weather_forecast
+from tools import load_tools
+from utils import deadline
+from utils.metrics import metrics
 from utils.model_loader import ModelLoader
-from models import UserPreferenceManager
+
+# Tag on the fast model's runs, so streaming clients can skip its drafts.
+TOOLS_ROUTE_TAG = "route:tools"
+
+FINALIZE_INSTRUCTION = (
+    "The time budget for this request has run out, so no more tools can be "
+    "called. Write the best complete travel plan you can from the information "
+    "gathered so far, and briefly say which details could not be checked."
+)
+SKIPPED_TOOL_MESSAGE = "[Skipped — the time budget for this request ran out before this call.]"
 
 
 class GraphBuilder:
@@ -24,48 +34,107 @@ class GraphBuilder:
     Responsibilities (Single Responsibility Principle):
         - Register all available tools.
         - Bind tools to the LLM.
-        - Construct and compile the StateGraph.
+        - Construct and compile the StateGraph, with a `ToolExecutor`
+          running each turn's tool calls concurrently, a `HistoryCompactor`
+          bounding persisted threads, and an optional `PrefetchStage` ahead
+          of the first agent call.
+        - Route each agent step to a model (see `_first_route`).
+        - Enforce the request's time and step budget: once either runs out
+          the graph jumps to a `finalize` node that writes the best plan
+          from the results gathered so far.
 
-    Open/Closed: New tools can be added to `self.tools` without touching
+    Open/Closed: New tools are registered in `tools.TOOL_REGISTRY` without touching
     the graph wiring logic.  User preferences are injected dynamically
-    via the UserPreferenceManager without modifying the base prompt.
+    at call time (see `_system_prompt`) without modifying the base prompt,
+    so a single compiled graph serves every user in the process.
     """
 
-    def __init__(self, model_provider: str = "groq", user_id: int | None = None) -> None:
-        self.tools: list = [
-            get_current_weather,
-            get_weather_forecast,
-            convert_currency,
-            calculate,
-            calculate_percentage,
-            calculate_total_with_tax,
-            search_places,
-            get_place_details,
-        ]
-
-        # ── Dynamic system prompt with user preferences ───────────────────
-        base_content = SYSTEM_PROMPT.content
-        if user_id is not None:
-            pref_mgr = UserPreferenceManager()
-            pref_block = pref_mgr.format_for_prompt(user_id)
-            base_content = base_content + pref_block
+    def __init__(
+        self,
+        model_provider: str = "groq",
+        enable_prefetch: bool | None = None,
+        checkpointer=None,
+    ) -> None:
+        self.tools: list = load_tools()
 
-        self.system_prompt = SystemMessage(content=base_content)
+        self.system_prompt = SYSTEM_PROMPT
 
         loader = ModelLoader(model_provider=model_provider)
-        llm = loader.load_llm()
-        self.llm_with_tools = llm.bind_tools(self.tools)
+        if loader.config.get_item("llm")["routing"]["enabled"]:
+            self.routes = {
+                route: loader.load_llm(route=route)
+                .bind_tools(self.tools)
+                .with_config(tags=[f"route:{route}"])
+                for route in ("tools", "synthesis")
+            }
+        else:
+            self.routes = {"synthesis": loader.load_llm().bind_tools(self.tools)}
+
+        budget_config = loader.config.get_item("agent")["budget"]
+        self.max_steps = budget_config["max_steps"]
+        self.finalize_timeout_seconds = budget_config["finalize_timeout_seconds"]
+        # Same model as the final write-up, with tool calls switched off
+        self.finalizer = loader.load_llm(
+            route="synthesis" if "tools" in self.routes else None
+        ).bind_tools(self.tools, tool_choice="none")
+
+        executor_config = loader.config.get_item("tools")["executor"]
+        self.tool_executor = ToolExecutor(
+            self.tools,
+            max_concurrency=executor_config["max_concurrency"],
+            timeout_seconds=executor_config["timeout_seconds"],
+            pool_workers=executor_config["pool_workers"],
+        )
+
+        if enable_prefetch is None:
+            enable_prefetch = loader.config.get_item("agent")["prefetch"]["enabled"]
+        self.enable_prefetch = enable_prefetch
+        self.prefetch = PrefetchStage(self.tool_executor)
+
+        # Conversation threads are persisted by the checkpointer (if any) and
+        # compacted once their history outgrows the token budget.
+        self.checkpointer = checkpointer
+        history_config = loader.config.get_item("agent")["history"]
+        self.history = HistoryCompactor(
+            max_tokens=history_config["max_tokens"],
+            keep_turns=history_config["keep_turns"],
+            summary_chars=history_config["summary_chars"],
+        )
+
+        context_config = loader.config.get_item("agent")["context"]
+        self.context = ContextCompactor(
+            max_prompt_tokens=context_config["max_prompt_tokens"],
+            summarise_older_tool_results=context_config["summarise_older_tool_results"],
+        )
 
-    def _agent_node(self, state: MessagesState) -> dict:
+    def _system_prompt(self, config: RunnableConfig | None) -> SystemMessage:
         """
-        Core ReAct agent node.
+        Return the system prompt for this run.
+
+        Per-user preferences travel in the runnable config as
+        ``config["configurable"]["user_preferences"]`` (the block produced by
+        `UserPreferenceManager.format_for_prompt`) and are appended here, at
+        call time, instead of being baked into a per-user compiled graph.
+        """
+        configurable = (config or {}).get("configurable", {})
+        pref_block = configurable.get("user_preferences") or ""
+        if not pref_block:
+            return self.system_prompt
+        return SystemMessage(content=self.system_prompt.content + pref_block)
+
+    def _prepare_messages(self, state: MessagesState, config: RunnableConfig) -> list:
+        """
+        Build the message list sent to the LLM.
 
         Guards:
-          1. Ensures the SYSTEM_PROMPT is always the first message — even if
-             the state already carries a system message from a previous cycle.
+          1. Ensures the SYSTEM_PROMPT (plus the caller's preference block, if
+             any) is always the first message — even if the state already
+             carries a system message from a previous cycle.
           2. If any message content is an empty dict or falsy non-string value
              (e.g. a failed tool call returning {}), it is replaced with a
              descriptive error string so the LLM always receives useful context.
+          3. Tool results are compacted and the prompt is kept within the
+             configured token budget (see `ContextCompactor`).
         """
         user_messages = state["messages"]
 
@@ -76,7 +145,7 @@ class GraphBuilder:
                 continue  # drop any stale system messages from state
             sanitized.append(msg)
 
-        input_messages = [self.system_prompt] + sanitized
+        input_messages = [self._system_prompt(config)] + sanitized
 
         # ── Guard 2: replace empty / failed tool responses ────────────────
         cleaned_messages = []
@@ -93,21 +162,228 @@ class GraphBuilder:
                 })
             cleaned_messages.append(msg)
 
-        response = self.llm_with_tools.invoke(cleaned_messages)
+        # ── Guard 3: compact tool results to the prompt budget ────────────
+        compacted, before, after = self.context.compact(cleaned_messages)
+        metrics.incr("context.tokens_saved", before - after)
+        metrics.observe("context.prompt_tokens", after)
+        return compacted
+
+    def _agent_node(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """
+        Core ReAct agent node (blocking; used by `invoke`).
+
+        If the request deadline passes during the LLM call, no message is
+        added and `_after_agent` sends the run to `finalize`.
+        """
+        messages = self._prepare_messages(state, config)
+        try:
+            route = self._first_route(state)
+            response = self._route_call(route, self.routes[route].invoke, messages)
+            if route == "tools" and not response.tool_calls:
+                response = self._route_call("synthesis", self.routes["synthesis"].invoke, messages)
+        except Exception:
+            if not deadline.expired():
+                raise
+            return {"messages": []}
+        self._record_plan(state, response)
+        return {"messages": [response]}
+
+    async def _aagent_node(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """Core ReAct agent node (non-blocking; used by `ainvoke` / `astream`)."""
+        messages = self._prepare_messages(state, config)
+        try:
+            route = self._first_route(state)
+            response = await self._aroute_call(route, self.routes[route].ainvoke, messages)
+            if route == "tools" and not response.tool_calls:
+                response = await self._aroute_call("synthesis", self.routes["synthesis"].ainvoke, messages)
+        except Exception:
+            if not deadline.expired():
+                raise
+            return {"messages": []}
+        self._record_plan(state, response)
         return {"messages": [response]}
 
+    # ── Budget ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _steps(state: MessagesState) -> int:
+        """Agent (LLM) steps taken for the current question."""
+        steps = 0
+        for msg in reversed(state["messages"]):
+            if isinstance(msg, HumanMessage):
+                break
+            if isinstance(msg, AIMessage) and msg.name != PREFETCH_NAME:
+                steps += 1
+        return steps
+
+    def _out_of_budget(self, state: MessagesState) -> str | None:
+        """Return why the run must wrap up ("deadline" / "steps"), or None."""
+        if deadline.expired():
+            return "deadline"
+        if self._steps(state) >= self.max_steps:
+            return "steps"
+        return None
+
+    def _after_agent(self, state: MessagesState) -> str:
+        """Replaces `tools_condition`: END on an answer, else tools or finalize."""
+        last = state["messages"][-1]
+        if isinstance(last, AIMessage) and not last.tool_calls:
+            return END
+        reason = self._out_of_budget(state)
+        if reason is not None or not isinstance(last, AIMessage):
+            metrics.incr(f"agent.finalized.{reason or 'deadline'}")
+            return "finalize"
+        return "tools"
+
+    def _after_tools(self, state: MessagesState) -> str:
+        reason = self._out_of_budget(state)
+        if reason == "deadline":
+            metrics.incr("agent.finalized.deadline")
+            return "finalize"
+        return "agent"
+
+    def _finalize_input(self, state: MessagesState, config: RunnableConfig) -> tuple[list, list]:
+        """
+        Answer any tool calls left pending with a "skipped" result, then
+        build the prompt: the compacted conversation plus the wrap-up
+        instruction.
+        """
+        last = state["messages"][-1]
+        skipped = [
+            ToolMessage(
+                content=SKIPPED_TOOL_MESSAGE, name=call["name"], tool_call_id=call["id"], status="error"
+            )
+            for call in (last.tool_calls if isinstance(last, AIMessage) else [])
+        ]
+        messages = self._prepare_messages({"messages": [*state["messages"], *skipped]}, config)
+        return skipped, messages + [HumanMessage(content=FINALIZE_INSTRUCTION)]
+
+    def _finalize_node(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """Write the best plan from what was gathered (blocking)."""
+        skipped, messages = self._finalize_input(state, config)
+        # The request deadline has passed; the wrap-up gets its own short budget
+        with deadline.request_deadline(self.finalize_timeout_seconds):
+            response = self._route_call("finalize", self.finalizer.invoke, messages)
+        return {"messages": [*skipped, response]}
+
+    async def _afinalize_node(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """Write the best plan from what was gathered (non-blocking)."""
+        skipped, messages = self._finalize_input(state, config)
+        with deadline.request_deadline(self.finalize_timeout_seconds):
+            response = await self._aroute_call("finalize", self.finalizer.ainvoke, messages)
+        return {"messages": [*skipped, response]}
+
+    # ── LLM calls ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _llm_kwargs() -> dict:
+        """Per-call LLM options: the HTTP timeout is what's left of the request."""
+        left = deadline.remaining()
+        return {} if left is None else {"timeout": deadline.cap(left)}
+
+    def _first_route(self, state: MessagesState) -> str:
+        """
+        Pick the model for an agent step.
+
+        With routing enabled, a step that follows a finished tool round
+        (every call of the last tool-calling message answered, including
+        the pre-fetch results) goes straight to the "synthesis" model: it is
+        usually the final write-up, and a fast-model draft would only be
+        discarded.  Any other step goes to the fast "tools" model first; if
+        it asks for tools that is the step, otherwise its draft is discarded
+        and the "synthesis" model answers.
+
+        The cost: an extra tool round the synthesis model asks for runs on
+        the large model, and a question answered without any tools still
+        takes two calls.
+        """
+        if "tools" not in self.routes:
+            return "synthesis"
+        messages = state["messages"]
+        if not messages or not isinstance(messages[-1], ToolMessage):
+            return "tools"
+        answered = set()
+        for msg in reversed(messages):
+            if isinstance(msg, ToolMessage):
+                answered.add(msg.tool_call_id)
+            elif isinstance(msg, AIMessage) and msg.tool_calls:
+                pending = {call["id"] for call in msg.tool_calls} - answered
+                return "tools" if pending else "synthesis"
+            else:
+                break
+        return "tools"
+
+    def _route_call(self, route: str, call, messages: list) -> AIMessage:
+        """Run one agent step on the model for `route` (see `_first_route`)."""
+        start = time.perf_counter()
+        response = call(messages, **self._llm_kwargs())
+        self._record_route(route, response, time.perf_counter() - start)
+        return response
+
+    async def _aroute_call(self, route: str, call, messages: list) -> AIMessage:
+        """Async counterpart of `_route_call`."""
+        start = time.perf_counter()
+        response = await call(messages, **self._llm_kwargs())
+        self._record_route(route, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _record_route(route: str, response: AIMessage, seconds: float) -> None:
+        """Per-route call count, latency and token usage (`llm.route.<route>.*`)."""
+        metrics.incr("agent.llm_calls")
+        metrics.incr(f"llm.route.{route}.calls")
+        metrics.observe(f"llm.route.{route}.seconds", seconds)
+        usage = response.usage_metadata or {}
+        metrics.incr(f"llm.route.{route}.input_tokens", usage.get("input_tokens", 0))
+        metrics.incr(f"llm.route.{route}.output_tokens", usage.get("output_tokens", 0))
+        if route == "tools" and not response.tool_calls:
+            metrics.incr("llm.route.tools.escalations")
+
+    def _record_plan(self, state: MessagesState, response: AIMessage) -> None:
+        """
+        Count agent steps per plan, split by pre-fetch mode, so the steps
+        saved by the pre-fetch stage show up as the difference between the
+        two `agent.llm_calls_per_plan.*` observations in /metrics.
+        """
+        if response.tool_calls:
+            return
+
+        llm_calls = self._steps(state) + 1
+        mode = "prefetch_on" if self.enable_prefetch else "prefetch_off"
+        metrics.observe(f"agent.llm_calls_per_plan.{mode}", llm_calls)
+
     def build_graph(self):
         """Assemble and compile the StateGraph."""
         graph_builder = StateGraph(MessagesState)
 
-        graph_builder.add_node("agent", self._agent_node)
-        graph_builder.add_node("tools", ToolNode(tools=self.tools))
+        graph_builder.add_node(
+            "agent", RunnableLambda(self._agent_node, afunc=self._aagent_node)
+        )
+        graph_builder.add_node(
+            "tools",
+            RunnableLambda(self.tool_executor.invoke, afunc=self.tool_executor.ainvoke),
+        )
+
+        graph_builder.add_node("history", self.history.invoke)
+        graph_builder.add_edge(START, "history")
 
-        graph_builder.add_edge(START, "agent")
-        graph_builder.add_conditional_edges("agent", tools_condition)
-        graph_builder.add_edge("tools", "agent")
+        if self.enable_prefetch:
+            graph_builder.add_node(
+                "prefetch",
+                RunnableLambda(self.prefetch.invoke, afunc=self.prefetch.ainvoke),
+            )
+            graph_builder.add_edge("history", "prefetch")
+            graph_builder.add_edge("prefetch", "agent")
+        else:
+            graph_builder.add_edge("history", "agent")
+        graph_builder.add_node(
+            "finalize", RunnableLambda(self._finalize_node, afunc=self._afinalize_node)
+        )
+        graph_builder.add_conditional_edges("agent", self._after_agent, ["tools", "finalize", END])
+        graph_builder.add_conditional_edges("tools", self._after_tools, ["agent", "finalize"])
+        graph_builder.add_edge("finalize", END)
 
-        self.graph = graph_builder.compile()
+        self.graph = graph_builder.compile(checkpointer=self.checkpointer)
         return self.graph
 
     def __call__(self):
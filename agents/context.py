@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from utils.tokens import estimate_messages_tokens
+
+# Fields the model actually uses from each tool's JSON result.
+TOOL_FIELDS: dict[str, tuple[str, ...]] = {
+    "search_places": ("name", "address", "rating", "user_ratings_total", "latitude", "longitude", "place_id"),
+    "find_nearby_places": (
+        "name", "address", "rating", "user_ratings_total", "latitude", "longitude", "place_id", "distance_km"
+    ),
+    "get_place_details": ("name", "rating", "user_ratings_total", "latitude", "longitude", "top_review"),
+    "get_current_weather": ("city", "temperature", "feels_like", "humidity", "description", "wind_speed"),
+    "get_weather_forecast": ("date", "min_temp", "max_temp", "description"),
+}
+
+OMITTED = "[Tool result omitted to fit the prompt budget.]"
+
+
+def _parse(content: Any) -> Any:
+    if not isinstance(content, str):
+        return content
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content
+
+
+def _dump(data: Any) -> str:
+    if isinstance(data, str):
+        return data
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+# ── One-line summaries of older tool results ─────────────────────────────────
+
+def _summarise_places(data: list) -> str:
+    parts = []
+    for p in data:
+        rating = f" {p['rating']}★" if p.get("rating") is not None else ""
+        coords = (
+            f" @{p['latitude']},{p['longitude']}"
+            if p.get("latitude") is not None else ""
+        )
+        distance = f" {p['distance_km']}km" if p.get("distance_km") is not None else ""
+        parts.append(f"{p.get('name', '')}{rating}{coords}{distance} [{p.get('place_id', '')}]")
+    return f"{len(data)} places: " + "; ".join(parts)
+
+
+def _summarise_forecast(data: list) -> str:
+    return "Forecast: " + "; ".join(
+        f"{d.get('date')} {d.get('min_temp')}–{d.get('max_temp')}°C {d.get('description', '')}"
+        for d in data
+    )
+
+
+def _summarise_current(data: dict) -> str:
+    return (
+        f"Now in {data.get('city')}: {data.get('temperature')}°C, "
+        f"{data.get('description')}, humidity {data.get('humidity')}%"
+    )
+
+
+def _summarise_weather_bundle(data: dict) -> str:
+    parts = []
+    for city, weather in data.items():
+        if "error" in weather:
+            parts.append(f"{city}: unavailable")
+            continue
+        current = weather.get("current", {})
+        parts.append(
+            f"{city}: now {current.get('temperature')}°C {current.get('description', '')}; "
+            + _summarise_forecast(weather.get("forecast", []))
+        )
+    return " | ".join(parts)
+
+
+def _summarise_details(data: dict) -> str:
+    if "error" in data:
+        return f"unavailable: {_clip(str(data['error']), 120)}"
+    return (
+        f"{data.get('name')} {data.get('rating')}★ "
+        f"@{data.get('latitude')},{data.get('longitude')}: "
+        f"{_clip(str(data.get('top_review', '')), 120)}"
+    )
+
+
+def _summarise_places_details(data: dict) -> str:
+    return " | ".join(f"[{place_id}] " + _summarise_details(details) for place_id, details in data.items())
+
+
+def _summarise_itinerary(data: dict) -> str:
+    return " | ".join(
+        f"Day {day.get('day')}: " + " → ".join(stop.get("name", "") for stop in day.get("stops", []))
+        + f" ({day.get('total_km')} km, {day.get('total_minutes')} min)"
+        for day in data.get("days", [])
+    )
+
+
+def _summarise_budget(data: dict) -> str:
+    currency = data.get("currency", "")
+    categories = ", ".join(f"{name} {total}" for name, total in data.get("per_category", {}).items())
+    errors = f"; {len(data['errors'])} item(s) failed" if data.get("errors") else ""
+    return f"Budget: total {data.get('total')} {currency} ({categories}){errors}"
+
+
+SUMMARISERS: dict[str, tuple[type, Callable[[Any], str]]] = {
+    "search_places": (list, _summarise_places),
+    "find_nearby_places": (list, _summarise_places),
+    "get_weather_forecast": (list, _summarise_forecast),
+    "get_current_weather": (dict, _summarise_current),
+    "get_weather_bundle": (dict, _summarise_weather_bundle),
+    "get_place_details": (dict, _summarise_details),
+    "get_places_details": (dict, _summarise_places_details),
+    "optimize_itinerary": (dict, _summarise_itinerary),
+    "compute_budget": (dict, _summarise_budget),
+}
+
+
+class ContextCompactor:
+    """
+    Shrinks the message list sent to the LLM on each agent step.
+
+    The graph state keeps every raw tool result; only the prompt is compacted:
+        1. Tool results are reduced to the fields in `TOOL_FIELDS`.
+        2. Tool results from earlier agent turns are replaced by one-line
+           summaries (names, ratings, coordinates and place_ids survive).
+        3. While the prompt exceeds `max_prompt_tokens`: the latest tool
+           results are summarised too, then long earlier messages are
+           clipped, then the oldest tool results are omitted.
+    The system prompt and the latest user question are never touched.
+    """
+
+    def __init__(
+        self,
+        max_prompt_tokens: int = 12000,
+        summarise_older_tool_results: bool = True,
+        clip_chars: int = 1500,
+    ) -> None:
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summarise_older_tool_results = summarise_older_tool_results
+        self.clip_chars = clip_chars
+
+    def compact(self, messages: list) -> tuple[list, int, int]:
+        """
+        Compact `messages` for one LLM call.
+
+        Returns:
+            (compacted messages, estimated tokens before, estimated tokens after)
+        """
+        before = estimate_messages_tokens(messages)
+        latest_batch = self._latest_tool_batch(messages)
+
+        compacted = [self._filter_fields(m) if isinstance(m, ToolMessage) else m for m in messages]
+        if self.summarise_older_tool_results:
+            compacted = [
+                self._summarise(m) if isinstance(m, ToolMessage) and i not in latest_batch else m
+                for i, m in enumerate(compacted)
+            ]
+
+        if estimate_messages_tokens(compacted) > self.max_prompt_tokens:
+            compacted = [self._summarise(m) if isinstance(m, ToolMessage) else m for m in compacted]
+
+        if estimate_messages_tokens(compacted) > self.max_prompt_tokens:
+            last_human = max(
+                (i for i, m in enumerate(compacted) if isinstance(m, HumanMessage)), default=-1
+            )
+            compacted = [
+                self._clip_message(m) if i < last_human and not isinstance(m, SystemMessage) else m
+                for i, m in enumerate(compacted)
+            ]
+
+        for i, msg in enumerate(compacted):
+            if estimate_messages_tokens(compacted) <= self.max_prompt_tokens:
+                break
+            if isinstance(msg, ToolMessage) and msg.content != OMITTED:
+                compacted[i] = msg.model_copy(update={"content": OMITTED})
+
+        return compacted, before, estimate_messages_tokens(compacted)
+
+    # ── Helpers ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _latest_tool_batch(messages: list) -> set[int]:
+        """Indices of the ToolMessages answering the most recent tool-call turn."""
+        batch: set[int] = set()
+        for i in range(len(messages) - 1, -1, -1):
+            msg = messages[i]
+            if isinstance(msg, ToolMessage):
+                batch.add(i)
+            elif isinstance(msg, AIMessage) and msg.tool_calls:
+                break
+            elif batch:
+                break
+        return batch
+
+    @staticmethod
+    def _filter_fields(msg: ToolMessage) -> ToolMessage:
+        fields = TOOL_FIELDS.get(msg.name or "")
+        data = _parse(msg.content)
+        if not fields or isinstance(data, str):
+            return msg
+
+        def keep(item: Any) -> Any:
+            if not isinstance(item, dict):
+                return item
+            # Why a call failed (not found vs. upstream down) always reaches the model
+            return {k: item[k] for k in (*fields, "error") if item.get(k) not in (None, "", [])}
+
+        filtered = [keep(item) for item in data] if isinstance(data, list) else keep(data)
+        return msg.model_copy(update={"content": _dump(filtered)})
+
+    def _summarise(self, msg: ToolMessage) -> ToolMessage:
+        data = _parse(msg.content)
+        expected_type, summarise = SUMMARISERS.get(msg.name or "", (None, None))
+        if summarise is not None and isinstance(data, expected_type) and data:
+            try:
+                summary = summarise(data)
+            except (AttributeError, KeyError, TypeError):
+                summary = _clip(_dump(data), 300)
+        else:
+            summary = _clip(_dump(data), 300)
+        return msg.model_copy(update={"content": summary})
+
+    def _clip_message(self, msg):
+        if isinstance(msg, ToolMessage) or not isinstance(msg.content, str):
+            return msg
+        if len(msg.content) <= self.clip_chars:
+            return msg
+        return msg.model_copy(update={"content": _clip(msg.content, self.clip_chars)})
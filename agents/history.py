@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from utils.metrics import metrics
+from utils.tokens import estimate_messages_tokens
+
+# The AI message that stands in for summarised turns carries this name.
+HISTORY_SUMMARY_NAME = "conversation_summary"
+
+
+def split_turns(messages: list) -> list[list]:
+    """Split a message history into turns, each starting at a HumanMessage."""
+    turns: list[list] = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+
+class HistoryCompactor:
+    """
+    Graph node that keeps a persisted conversation thread within budget.
+
+    Runs at the start of every request.  While the previous turns fit in
+    `max_tokens` nothing changes.  Once they don't:
+        1. Turns older than the last `keep_turns` are folded into a single
+           summary message (question + the start of the final answer).
+        2. If that is still over budget, the tool exchanges of the kept turns
+           are dropped too — their final answers already contain the results.
+
+    A follow-up like "make day 3 cheaper" then costs the previous plan plus
+    a short summary, not a replay of every earlier tool call.
+    """
+
+    _SUMMARY_HEADER = "Summary of our earlier conversation:\n"
+
+    def __init__(self, max_tokens: int = 6000, keep_turns: int = 2, summary_chars: int = 300) -> None:
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary_chars = summary_chars
+
+    def invoke(self, state: MessagesState, config: RunnableConfig) -> dict:
+        messages = state["messages"]
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return {"messages": []}
+
+        *previous, current = split_turns(messages)
+        before = estimate_messages_tokens([m for turn in previous for m in turn])
+        if before <= self.max_tokens:
+            return {"messages": []}
+
+        old = previous[:-self.keep_turns] if self.keep_turns else previous
+        kept = previous[len(old):]
+
+        summary = self._summarise(old)
+        compacted = ([summary] if summary else []) + [m for turn in kept for m in turn]
+        if estimate_messages_tokens(compacted) > self.max_tokens:
+            compacted = ([summary] if summary else []) + [
+                m for turn in kept for m in self._final_exchange(turn)
+            ]
+
+        after = estimate_messages_tokens(compacted)
+        if after >= before:
+            return {"messages": []}  # only the kept turns left; nothing to fold
+
+        metrics.incr("history.compactions")
+        metrics.incr("history.tokens_saved", before - after)
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted, *current]}
+
+    def _summarise(self, turns: list[list]) -> AIMessage | None:
+        lines = []
+        for turn in turns:
+            for msg in turn:
+                if isinstance(msg, AIMessage) and msg.name == HISTORY_SUMMARY_NAME:
+                    lines.append(str(msg.content).removeprefix(self._SUMMARY_HEADER))
+            question = next((m for m in turn if isinstance(m, HumanMessage)), None)
+            answer = self._final_answer(turn)
+            if question is None:
+                continue
+            line = f"- User asked: {self._clip(str(question.content))}"
+            if answer:
+                line += f"\n  Assistant answered: {self._clip(answer)}"
+            lines.append(line)
+        if not lines:
+            return None
+        return AIMessage(content=self._SUMMARY_HEADER + "\n".join(lines), name=HISTORY_SUMMARY_NAME)
+
+    @staticmethod
+    def _final_answer(turn: list) -> str:
+        for msg in reversed(turn):
+            if isinstance(msg, AIMessage) and not msg.tool_calls and msg.name != HISTORY_SUMMARY_NAME:
+                return str(msg.content)
+        return ""
+
+    @staticmethod
+    def _final_exchange(turn: list) -> list:
+        """Drop a turn's tool-call / tool-result messages, keeping Q and A."""
+        return [
+            m for m in turn
+            if not isinstance(m, ToolMessage) and not (isinstance(m, AIMessage) and m.tool_calls)
+        ]
+
+    def _clip(self, text: str) -> str:
+        text = " ".join(text.split())
+        if len(text) <= self.summary_chars:
+            return text
+        return text[:self.summary_chars].rstrip() + "…"
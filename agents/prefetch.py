@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import re
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+
+from agents.tool_executor import ToolExecutor
+from utils.metrics import metrics
+
+# AI messages synthesised by the pre-fetch stage carry this name so the
+# agent node can tell them apart from real model turns.
+PREFETCH_NAME = "prefetch"
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₺": "TRY", "₹": "INR"}
+CURRENCY_WORDS = {
+    "dollar": "USD", "dollars": "USD", "euro": "EUR", "euros": "EUR",
+    "pound": "GBP", "pounds": "GBP", "yen": "JPY", "lira": "TRY", "rupees": "INR",
+}
+CURRENCY_CODES = {
+    "USD", "EUR", "GBP", "JPY", "TRY", "INR", "CHF", "CAD", "AUD", "CNY",
+    "SEK", "NOK", "DKK", "PLN", "CZK", "HUF", "THB", "SGD", "HKD", "MXN",
+    "BRL", "ZAR", "KRW", "NZD", "IDR", "AED",
+}
+
+# Local currency of frequently requested destinations, used to pre-convert
+# the budget.  Unknown destinations simply skip the currency pre-fetch.
+DESTINATION_CURRENCY = {
+    "paris": "EUR", "rome": "EUR", "barcelona": "EUR", "madrid": "EUR",
+    "amsterdam": "EUR", "berlin": "EUR", "munich": "EUR", "vienna": "EUR",
+    "lisbon": "EUR", "athens": "EUR", "dublin": "EUR", "venice": "EUR",
+    "florence": "EUR", "milan": "EUR", "prague": "CZK", "budapest": "HUF",
+    "london": "GBP", "edinburgh": "GBP", "zurich": "CHF", "geneva": "CHF",
+    "istanbul": "TRY", "antalya": "TRY", "tokyo": "JPY", "kyoto": "JPY",
+    "osaka": "JPY", "bangkok": "THB", "phuket": "THB", "singapore": "SGD",
+    "hong kong": "HKD", "dubai": "AED", "new york": "USD", "los angeles": "USD",
+    "san francisco": "USD", "miami": "USD", "toronto": "CAD", "vancouver": "CAD",
+    "sydney": "AUD", "melbourne": "AUD", "bali": "IDR", "goa": "INR",
+    "mumbai": "INR", "delhi": "INR", "mexico city": "MXN", "cancun": "MXN",
+    "cape town": "ZAR", "seoul": "KRW", "copenhagen": "DKK", "stockholm": "SEK",
+    "oslo": "NOK", "warsaw": "PLN", "krakow": "PLN",
+}
+
+_DESTINATION_KEYWORDS = {"to", "in", "visit", "visiting", "explore", "exploring", "around"}
+_DESTINATION_STOPWORDS = {
+    "for", "with", "on", "under", "over", "during", "next", "this", "from",
+    "and", "within", "by", "at", "a", "an", "the", "plan", "trip", "days",
+    "day", "week", "weekend", "budget", "me", "my", "us", "our", "please",
+    "do", "see", "go", "eat", "stay", "travel", "fly", "get", "spend",
+}
+
+_DAYS_RE = re.compile(r"\b(\d{1,2})\s*(?:-\s*)?(?:days?|nights?)\b", re.IGNORECASE)
+_BUDGET_SYMBOL_RE = re.compile(r"([$€£¥₺₹])\s?(\d[\d,]*(?:\.\d+)?)")
+_BUDGET_CODE_RE = re.compile(r"\b(\d[\d,]*(?:\.\d+)?)\s?([A-Za-z]{3}|[A-Za-z]+s?)\b")
+_TOKEN_RE = re.compile(r"[A-Za-zÀ-ÿ'.-]+|\d+|[^\sA-Za-zÀ-ÿ\d]")
+
+
+def parse_trip_request(question: str) -> dict:
+    """
+    Extract destination, duration and budget from a free-text trip request.
+
+    Returns:
+        Dict with keys: destination (str | None), days (int | None),
+        budget (float | None), currency (str | None) and
+        local_currency (str | None).
+    """
+    budget, currency = _parse_budget(question)
+    destination = _parse_destination(question)
+
+    days = None
+    match = _DAYS_RE.search(question)
+    if match:
+        days = int(match.group(1))
+    elif re.search(r"\bweekend\b", question, re.IGNORECASE):
+        days = 2
+    elif re.search(r"\b(?:a|one)\s+week\b", question, re.IGNORECASE):
+        days = 7
+
+    local_currency = None
+    explicit = re.search(r"\bin\s+([A-Z]{3})\b", question)
+    if explicit and explicit.group(1) in CURRENCY_CODES:
+        local_currency = explicit.group(1)
+    elif destination:
+        local_currency = DESTINATION_CURRENCY.get(destination.lower())
+
+    return {
+        "destination": destination,
+        "days": days,
+        "budget": budget,
+        "currency": currency,
+        "local_currency": local_currency,
+    }
+
+
+def _parse_budget(question: str) -> tuple[float | None, str | None]:
+    match = _BUDGET_SYMBOL_RE.search(question)
+    if match:
+        return float(match.group(2).replace(",", "")), CURRENCY_SYMBOLS[match.group(1)]
+    for match in _BUDGET_CODE_RE.finditer(question):
+        unit = match.group(2)
+        code = unit.upper() if unit.upper() in CURRENCY_CODES else CURRENCY_WORDS.get(unit.lower())
+        if code:
+            return float(match.group(1).replace(",", "")), code
+    return None, None
+
+
+def _parse_destination(question: str) -> str | None:
+    tokens = _TOKEN_RE.findall(question)
+    for i, token in enumerate(tokens):
+        if token.lower() not in _DESTINATION_KEYWORDS:
+            continue
+        words: list[str] = []
+        for candidate in tokens[i + 1:i + 5]:
+            lowered = candidate.lower()
+            if (
+                not candidate[0].isalpha()
+                or lowered in _DESTINATION_STOPWORDS
+                or lowered in _DESTINATION_KEYWORDS
+                or candidate.upper() in CURRENCY_CODES and candidate.isupper()
+            ):
+                break
+            words.append(candidate)
+        if words:
+            return " ".join(w if w[0].isupper() else w.capitalize() for w in words)
+    return None
+
+
+class PrefetchStage:
+    """
+    Graph node that runs before the first `agent` call of a request.
+
+    It parses the latest question for destination, duration and budget,
+    fetches the obvious tool results (weather, forecast, places and budget
+    conversion) concurrently through the shared `ToolExecutor`, and injects
+    them as an AI tool-call message followed by the ToolMessages — exactly
+    what the model would otherwise spend two or three round trips asking for.
+    """
+
+    PLACE_QUERIES = ("top tourist attractions", "hotels", "restaurants")
+
+    def __init__(self, executor: ToolExecutor) -> None:
+        self.executor = executor
+
+    def plan_calls(self, question: str) -> list[dict]:
+        """Return the tool calls to pre-fetch for `question` (may be empty)."""
+        intent = parse_trip_request(question)
+        destination = intent["destination"]
+        if not destination:
+            return []
+
+        calls = [
+            ("get_weather_bundle", {"cities": [destination], "days": min(intent["days"] or 5, 5)}),
+        ]
+        calls += [
+            ("search_places", {"query": query, "location": destination})
+            for query in self.PLACE_QUERIES
+        ]
+        if (
+            intent["budget"]
+            and intent["currency"]
+            and intent["local_currency"]
+            and intent["currency"] != intent["local_currency"]
+        ):
+            calls.append((
+                "convert_currency",
+                {
+                    "amount": intent["budget"],
+                    "from_currency": intent["currency"],
+                    "to_currency": intent["local_currency"],
+                },
+            ))
+
+        return [
+            {"name": name, "args": args, "id": f"prefetch_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+            for name, args in calls
+            if name in self.executor.tools_by_name
+        ]
+
+    def _request(self, state: MessagesState) -> AIMessage | None:
+        last = state["messages"][-1]
+        if not isinstance(last, HumanMessage):
+            return None  # not the start of a request
+        calls = self.plan_calls(str(last.content))
+        if not calls:
+            return None
+        return AIMessage(content="", tool_calls=calls, name=PREFETCH_NAME)
+
+    def invoke(self, state: MessagesState, config: RunnableConfig) -> dict:
+        request = self._request(state)
+        if request is None:
+            return {"messages": []}
+        result = self.executor.invoke({"messages": [request]}, config)
+        self._record(request)
+        return {"messages": [request] + result["messages"]}
+
+    async def ainvoke(self, state: MessagesState, config: RunnableConfig) -> dict:
+        request = self._request(state)
+        if request is None:
+            return {"messages": []}
+        result = await self.executor.ainvoke({"messages": [request]}, config)
+        self._record(request)
+        return {"messages": [request] + result["messages"]}
+
+    @staticmethod
+    def _record(request: AIMessage) -> None:
+        metrics.incr("prefetch.runs")
+        metrics.incr("prefetch.tool_calls", len(request.tool_calls))
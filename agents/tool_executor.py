@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import MessagesState
+
+from exception.handling import UpstreamUnavailable
+from utils import deadline, tool_cache
+from utils.http_client import describe_error
+from utils.metrics import metrics
+
+NO_DATA_MESSAGE = (
+    "[Tool returned no data — information could not be retrieved. "
+    "Please proceed with available information.]"
+)
+
+
+class ToolExecutor:
+    """
+    Graph node that runs every tool call from one agent turn concurrently.
+
+    Replaces `ToolNode` in the ReAct graph:
+        - At most `max_concurrency` calls of one batch run at the same time.
+          Sync batches share a pool of `pool_workers` threads with every
+          other request, so each batch admits its own calls into the pool.
+        - Each call is limited to `timeout_seconds` from when it starts, or
+          to what is left of the request deadline; a timeout becomes a
+          descriptive error ToolMessage instead of an empty result.  A call
+          the busy pool could not start within that time says so instead.
+        - A call to an upstream whose circuit breaker is open (and that has
+          no stored fallback) returns an "unavailable" ToolMessage at once.
+        - ToolMessages are returned in the order of the model's tool calls.
+        - Inside `utils.tool_cache.shared_tool_results`, identical calls from
+          concurrent runs (e.g. one batch) share one execution.
+        - The duration of every batch is recorded in `utils.metrics`.
+    """
+
+    def __init__(
+        self,
+        tools: list,
+        max_concurrency: int = 6,
+        timeout_seconds: float = 20.0,
+        pool_workers: int = 32,
+    ) -> None:
+        self.tools_by_name = {t.name: t for t in tools}
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(pool_workers, max_concurrency), thread_name_prefix="tool"
+        )
+
+    # ── Graph entry points ────────────────────────────────────────────────
+
+    def invoke(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """Run the last AI message's tool calls in the shared thread pool."""
+        calls = self._tool_calls(state)
+        start = time.perf_counter()
+        messages: list[ToolMessage | None] = [None] * len(calls)
+        waiting = list(enumerate(calls))[::-1]
+        running: dict[Future, tuple[int, dict]] = {}
+
+        while waiting or running:
+            while waiting and len(running) < self.max_concurrency:
+                index, call = waiting.pop()
+                slot = {"submitted": time.monotonic(), "started": None, "timeout": None}
+                # Copy the context so request-scoped metrics and the deadline reach the workers
+                future = self._pool.submit(
+                    contextvars.copy_context().run, self._run_timed, slot, call, config
+                )
+                running[future] = (index, slot)
+
+            now = time.monotonic()
+            done, _ = wait(
+                running,
+                timeout=max(0.0, min(self._expiry(slot) for _, slot in running.values()) - now),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                index, _ = running.pop(future)
+                messages[index] = future.result()
+
+            # Abandon expired calls; a call still running keeps its pool thread
+            # until it returns, but no longer holds one of this batch's slots.
+            now = time.monotonic()
+            for future, (index, slot) in list(running.items()):
+                if now < self._expiry(slot):
+                    continue
+                if slot["started"] is None:
+                    if not future.cancel():
+                        continue  # a thread picked it up just now; it gets its own timeout
+                    messages[index] = self._busy_message(calls[index], now - slot["submitted"])
+                else:
+                    messages[index] = self._timeout_message(calls[index], slot["timeout"])
+                del running[future]
+
+        self._record_batch(messages, time.perf_counter() - start)
+        return {"messages": messages}
+
+    async def ainvoke(self, state: MessagesState, config: RunnableConfig) -> dict:
+        """Run the last AI message's tool calls as concurrent coroutines."""
+        calls = self._tool_calls(state)
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(call: dict) -> ToolMessage:
+            async with semaphore:
+                timeout = self._timeout()
+                try:
+                    return await asyncio.wait_for(self._run_async(call, config), timeout=timeout)
+                except asyncio.TimeoutError:
+                    return self._timeout_message(call, timeout)
+
+        messages = list(await asyncio.gather(*(run(call) for call in calls)))
+
+        self._record_batch(messages, time.perf_counter() - start)
+        return {"messages": messages}
+
+    # ── Single call ───────────────────────────────────────────────────────
+
+    def _run_timed(self, slot: dict, call: dict, config: RunnableConfig) -> ToolMessage:
+        """Stamp when the pool actually starts the call (and its timeout), then run it."""
+        slot["timeout"] = self._timeout()
+        slot["started"] = time.monotonic()
+        return self._run_sync(call, config)
+
+    def _expiry(self, slot: dict) -> float:
+        """
+        Monotonic time at which a submitted call is given up on: `timeout`
+        after it started, or — while it still waits for a pool thread —
+        `timeout_seconds` after submission (never past the request deadline).
+        """
+        if slot["started"] is not None:
+            return slot["started"] + slot["timeout"]
+        expiry = slot["submitted"] + self.timeout_seconds
+        request_deadline = deadline.current()
+        return expiry if request_deadline is None else min(expiry, request_deadline)
+
+    def _run_sync(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._unknown_tool_message(call)
+        try:
+            cache = tool_cache.current()
+            if cache is None:
+                output = tool.invoke(call["args"], config)
+            else:
+                output = cache.run(call["name"], call["args"], lambda: tool.invoke(call["args"], config))
+            return self._to_message(call, output)
+        except UpstreamUnavailable as e:
+            return self._unavailable_message(call, e)
+        except Exception as e:
+            return self._error_message(call, e)
+
+    async def _run_async(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._unknown_tool_message(call)
+        try:
+            cache = tool_cache.current()
+            if cache is None:
+                output = await tool.ainvoke(call["args"], config)
+            else:
+                output = await cache.arun(call["name"], call["args"], lambda: tool.ainvoke(call["args"], config))
+            return self._to_message(call, output)
+        except UpstreamUnavailable as e:
+            return self._unavailable_message(call, e)
+        except Exception as e:
+            return self._error_message(call, e)
+
+    # ── Helpers ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _tool_calls(state: MessagesState) -> list[dict]:
+        last = state["messages"][-1]
+        if not isinstance(last, AIMessage):
+            raise ValueError("ToolExecutor expects the last message to be an AIMessage.")
+        return list(last.tool_calls)
+
+    @staticmethod
+    def _to_message(call: dict, output: Any) -> ToolMessage:
+        if isinstance(output, dict) and output.get("error"):
+            metrics.incr("tools.error_results")  # a tool that reports its failure in-band
+        if output is None or (isinstance(output, (dict, list)) and not output):
+            content = NO_DATA_MESSAGE
+        elif isinstance(output, str):
+            content = output
+        else:
+            content = json.dumps(output, ensure_ascii=False, default=str)
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+
+    def _timeout(self) -> float:
+        """Per-call timeout, shortened to the time left in the request."""
+        left = deadline.remaining()
+        if left is None:
+            return self.timeout_seconds
+        return max(0.0, min(self.timeout_seconds, left))
+
+    @staticmethod
+    def _timeout_message(call: dict, timeout: float) -> ToolMessage:
+        metrics.incr("tools.timeouts")
+        return ToolMessage(
+            content=(
+                f"[Tool '{call['name']}' timed out after {timeout:.3g}s — "
+                "information could not be retrieved. Please proceed with available information.]"
+            ),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _busy_message(call: dict, waited: float) -> ToolMessage:
+        metrics.incr("tools.queue_timeouts")
+        return ToolMessage(
+            content=(
+                f"[Tool '{call['name']}' could not start within {waited:.3g}s because the server is busy — "
+                "information could not be retrieved. Please proceed with available information.]"
+            ),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _unavailable_message(call: dict, error: UpstreamUnavailable) -> ToolMessage:
+        metrics.incr("tools.unavailable")
+        return ToolMessage(
+            content=(
+                f"[Tool '{call['name']}' is unavailable: {error} "
+                "Please proceed with available information.]"
+            ),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _error_message(call: dict, error: Exception) -> ToolMessage:
+        metrics.incr("tools.errors")
+        return ToolMessage(
+            content=f"Error: {describe_error(error)}\n Please fix your mistakes.",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _unknown_tool_message(self, call: dict) -> ToolMessage:
+        return ToolMessage(
+            content=(
+                f"Error: {call['name']} is not a valid tool, "
+                f"try one of [{', '.join(self.tools_by_name)}]."
+            ),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _record_batch(messages: list[ToolMessage], elapsed: float) -> None:
+        metrics.incr("tools.calls", len(messages))
+        metrics.observe("tools.batch_seconds", elapsed)
+        metrics.observe("tools.batch_size", len(messages))
+        print(f"Ran {len(messages)} tool call(s) in {elapsed:.2f}s")
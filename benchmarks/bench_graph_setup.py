@@ -0,0 +1,106 @@
+"""
+bench_graph_setup.py — Per-request setup cost of a personalised /query.
+
+Compares the old flow (a fresh GraphBuilder per request: config re-read,
+new ChatGroq client, tool re-binding, preference lookup, StateGraph compile)
+with the current flow (one compiled graph per process; the preference block
+is looked up and passed through the runnable config).
+
+No LLM calls are made — only the setup work that happens before
+`invoke` is measured.
+
+Usage:
+    python benchmarks/bench_graph_setup.py [--iterations 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# ChatGroq only needs a key to be constructed; nothing is sent upstream.
+os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark_placeholder")
+
+from langchain_core.messages import SystemMessage  # noqa: E402
+from langchain_groq import ChatGroq  # noqa: E402
+from langgraph.graph import START, MessagesState, StateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode, tools_condition  # noqa: E402
+
+from agents.agentic_workflow import GraphBuilder  # noqa: E402
+from models import UserPreferenceManager, init_db  # noqa: E402
+from prompt_library.prompt import SYSTEM_PROMPT  # noqa: E402
+from utils.config_loader import load_config  # noqa: E402
+
+
+def _legacy_setup(pref_mgr: UserPreferenceManager, user_id: int, tools: list):
+    """Replicates the old per-request `GraphBuilder(user_id=...)()` path."""
+    pref_block = UserPreferenceManager().format_for_prompt(user_id)
+    system_prompt = SystemMessage(content=SYSTEM_PROMPT.content + pref_block)
+
+    model_name = load_config.__wrapped__()["llm"]["groq"]["model_name"]  # re-read, uncached
+    llm = ChatGroq(model=model_name, api_key=os.getenv("GROQ_API_KEY"))
+    llm_with_tools = llm.bind_tools(tools)
+
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node("agent", lambda state: {"messages": []})
+    graph_builder.add_node("tools", ToolNode(tools=tools))
+    graph_builder.add_edge(START, "agent")
+    graph_builder.add_conditional_edges("agent", tools_condition)
+    graph_builder.add_edge("tools", "agent")
+    return graph_builder.compile(), system_prompt, llm_with_tools
+
+
+def _current_setup(pref_mgr: UserPreferenceManager, user_id: int) -> dict:
+    """The per-request work left in `query_travel_agent` today."""
+    return {"configurable": {"user_preferences": pref_mgr.format_for_prompt(user_id)}}
+
+
+def _time(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<28} mean={statistics.mean(samples):8.2f} ms  "
+        f"median={statistics.median(samples):8.2f} ms  "
+        f"max={max(samples):8.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    pref_mgr = UserPreferenceManager()
+    user_id = pref_mgr.get_or_create_user("benchmark-user")
+    pref_mgr.add_preference(user_id, "budget", "mid-range")
+    pref_mgr.add_preference(user_id, "diet", "vegetarian")
+
+    builder = GraphBuilder(model_provider="groq")
+    builder()  # the one-off startup compile, paid once per process
+
+    legacy = _time(lambda: _legacy_setup(pref_mgr, user_id, builder.tools), args.iterations)
+    current = _time(lambda: _current_setup(pref_mgr, user_id), args.iterations)
+
+    print(f"Per-request setup over {args.iterations} iterations:")
+    _report("per-request GraphBuilder", legacy)
+    _report("shared graph + config", current)
+    print(f"speed-up: {statistics.mean(legacy) / statistics.mean(current):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
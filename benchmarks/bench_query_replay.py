@@ -0,0 +1,90 @@
+"""
+bench_query_replay.py — Reproducible /query latency from a recorded run.
+
+Record once, with network and API keys:
+
+    python benchmarks/bench_query_replay.py --record --cassette cassettes/bench.json
+
+then replay any number of times, offline — every Groq, OpenWeatherMap,
+Google Places and Frankfurter call is answered from the cassette after its
+recorded latency (or `--latency` seconds):
+
+    python benchmarks/bench_query_replay.py --cassette cassettes/bench.json [--runs 5] [--latency 0]
+
+The plan cache is disabled so every run executes the graph.  The place
+catalog and the weather cache stay warm after the first run, which is why
+the first run is reported separately.
+
+Usage:
+    python benchmarks/bench_query_replay.py --cassette PATH [--record] [--runs 5] [--latency recorded|SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.cassette import use_cassette  # noqa: E402
+from utils.metrics import metrics  # noqa: E402
+
+QUESTIONS = (
+    "Plan a 3 day trip to Paris with museums and cafes, budget in USD.",
+    "What should I pack for 2 days in Tokyo, and what is 20000 JPY in EUR?",
+    "Suggest a food tour in Rome with highly rated restaurants near the Colosseum.",
+)
+
+
+def _run_questions(client) -> float:
+    start = time.perf_counter()
+    for question in QUESTIONS:
+        response = client.post("/query", json={"question": question})
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--record", action="store_true", help="run live once and save the cassette")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", default="recorded", help="'recorded' or seconds per replayed call")
+    args = parser.parse_args()
+
+    latency = args.latency if args.latency == "recorded" else float(args.latency)
+    mode = "record" if args.record else "replay"
+    with use_cassette(args.cassette, mode, latency) as cassette:
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+
+        with TestClient(app_module.app) as client:
+            app_module.app.state.plan_cache = None
+            if args.record:
+                print(f"recorded {len(QUESTIONS)} questions in {_run_questions(client):.2f} s")
+                return
+
+            samples = []
+            for _ in range(args.runs):
+                cassette.rewind()
+                samples.append(_run_questions(client))
+
+    counters = metrics.snapshot()["counters"]
+    print(f"first run          {samples[0]:8.2f} s")
+    if len(samples) > 1:
+        print(f"later runs         median {statistics.median(samples[1:]):8.2f} s")
+    print(
+        f"replayed           {counters.get('cassette.llm.replayed', 0):.0f} LLM, "
+        f"{counters.get('cassette.http.replayed', 0):.0f} HTTP "
+        f"({counters.get('cassette.fallbacks', 0):.0f} matched by order)"
+    )
+
+
+if __name__ == "__main__":
+    main()
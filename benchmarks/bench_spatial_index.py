@@ -0,0 +1,108 @@
+"""
+bench_spatial_index.py — Build and radius-query cost of the place index.
+
+Fills a `SpatialIndex` with N synthetic places (clustered around a few
+dozen city centres, like a real catalog) and times:
+    - the build (`add_many`),
+    - radius queries around random city points, against a linear scan
+      over every place (what a list-backed lookup would cost).
+
+No network or database access.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--sizes 100000 1000000] [--queries 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.spatial_index import SpatialIndex, haversine_km  # noqa: E402
+
+TYPES = ("restaurant", "cafe", "museum", "lodging", "park", "bar", "tourist_attraction")
+RADII_KM = (0.5, 1.0, 5.0)
+
+
+def _synthetic_places(n: int, rng: random.Random) -> tuple[list, list[tuple[float, float]]]:
+    """N (place_id, lat, lng, types) tuples around random city centres, and the centres."""
+    centres = [(rng.uniform(-55, 65), rng.uniform(-170, 170)) for _ in range(40)]
+    places = []
+    for i in range(n):
+        lat, lng = rng.choice(centres)
+        places.append(
+            (f"place-{i}", lat + rng.gauss(0, 0.08), lng + rng.gauss(0, 0.08), rng.sample(TYPES, 2))
+        )
+    return places, centres
+
+
+def _linear_scan(places, lat, lng, radius_km, types):
+    wanted = set(types)
+    matches = [
+        (pid, d)
+        for pid, p_lat, p_lng, p_types in places
+        if (not wanted or wanted.intersection(p_types))
+        and (d := haversine_km(lat, lng, p_lat, p_lng)) <= radius_km
+    ]
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def _ms(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"median {statistics.median(samples) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=5, help="linear-scan queries per size (slow)")
+    parser.add_argument("--cell-km", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for size in args.sizes:
+        places, centres = _synthetic_places(size, rng)
+        print(f"\n── {size:,} places ──")
+
+        index = SpatialIndex(args.cell_km)
+        start = time.perf_counter()
+        index.add_many(places)
+        print(f"build              {time.perf_counter() - start:8.2f} s")
+
+        queries = []
+        for _ in range(args.queries):
+            lat, lng = rng.choice(centres)
+            queries.append(
+                (lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05), rng.choice(RADII_KM),
+                 rng.sample(TYPES, 1) if rng.random() < 0.5 else [])
+            )
+
+        samples, found = [], []
+        for lat, lng, radius_km, types in queries:
+            start = time.perf_counter()
+            found.append(len(index.query(lat, lng, radius_km, types)))
+            samples.append(time.perf_counter() - start)
+        print(f"index query        {_ms(samples)}   (avg {statistics.mean(found):.0f} matches)")
+
+        scan_samples = []
+        for lat, lng, radius_km, types in queries[: args.scan_queries]:
+            start = time.perf_counter()
+            expected = _linear_scan(places, lat, lng, radius_km, types)
+            scan_samples.append(time.perf_counter() - start)
+            assert {pid for pid, _ in expected} == {pid for pid, _ in index.query(lat, lng, radius_km, types)}
+        print(f"linear scan        {_ms(scan_samples)}")
+
+
+if __name__ == "__main__":
+    main()
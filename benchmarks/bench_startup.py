@@ -0,0 +1,91 @@
+"""
+bench_startup.py — Import time and cold start of the FastAPI app.
+
+Each sample runs in a fresh interpreter, so nothing is already imported or
+cached:
+
+    * import  — `import main` (what tooling, workers and tests pay)
+    * cold    — `import main` plus the lifespan startup (schema, graph
+                compile, warm-up) until the app is ready to serve
+
+The cold start runs against the offline model (LLM_PROVIDER=fake), so no
+network calls are made.
+
+Usage:
+    python benchmarks/bench_startup.py [--iterations 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+print("elapsed", time.perf_counter() - start)
+"""
+
+_COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app):
+    print("elapsed", time.perf_counter() - start)
+"""
+
+
+def _run(script: str) -> float:
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "gsk_benchmark_placeholder"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The app prints its own progress lines; pick out the timing
+    for line in result.stdout.splitlines():
+        if line.startswith("elapsed "):
+            return float(line.split()[1]) * 1000
+    raise RuntimeError(f"No timing in output:\n{result.stdout}")
+
+
+def _time(script: str, iterations: int) -> list[float]:
+    return [_run(script) for _ in range(iterations)]
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<28} mean={statistics.mean(samples):8.2f} ms  "
+        f"median={statistics.median(samples):8.2f} ms  "
+        f"max={max(samples):8.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    _run(_IMPORT_SCRIPT)  # fill the OS file cache and write .pyc files
+
+    print(f"Fresh-interpreter startup over {args.iterations} iterations:")
+    _report("import main", _time(_IMPORT_SCRIPT, args.iterations))
+    _report("cold start (fake LLM)", _time(_COLD_START_SCRIPT, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import math
+
+
+class RateLimitExceeded(Exception):
+    """
+    An LLM call could not be made within the provider's rate limits.
+
+    Raised when the local queue is full, a call waited past its deadline, or
+    the provider kept answering 429 after every retry.  `retry_after` is a
+    hint (in seconds) for when the client may try again.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current request's time budget ran out before a call could start."""
+
+
+class UpstreamUnavailable(Exception):
+    """
+    An upstream API's circuit breaker is open, so the call was not made.
+
+    `retry_after` is how many seconds remain until the breaker lets a probe
+    call through again.
+    """
+
+    def __init__(self, upstream: str, retry_after: float = 0.0) -> None:
+        super().__init__(f"{upstream} is temporarily unavailable; retry in {math.ceil(retry_after)}s.")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CassetteMiss(LookupError):
+    """A replayed run made a call the cassette holds no recording for."""
@@ -7,10 +7,13 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 from flask import (
-    Flask, render_template, request, jsonify, session, send_file
+    Flask, Response, render_template, request, jsonify, session, send_file,
+    stream_with_context,
 )
 from dotenv import load_dotenv
 import io
+import json
+import uuid
 
 load_dotenv()
 
@@ -20,6 +23,14 @@ app.secret_key = os.getenv("FLASK_SECRET_KEY", "mustafa-concierge-dev-key")
 # FastAPI backend URL
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
 
+# Attempts per query relay.  Every attempt carries the same Idempotency-Key,
+# so a retry attaches to the backend run the previous attempt started.
+QUERY_ATTEMPTS = 2
+
+# How the chat page submits questions: "job" (submit + poll, no long-held
+# connection) or "stream" (server-sent events through `/query`).
+QUERY_MODE = os.getenv("QUERY_MODE", "job")
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────
 
@@ -35,18 +46,101 @@ def _ensure_user() -> int:
     return session["user_id"]
 
 
+def _ensure_thread() -> str:
+    """Return the session's conversation thread id, starting one if needed."""
+    if "thread_id" not in session:
+        session["thread_id"] = uuid.uuid4().hex
+    return session["thread_id"]
+
+
 # ── Routes ─────────────────────────────────────────────────────────────────
 
 @app.route("/")
 def index():
     """Landing page."""
     _ensure_user()
-    return render_template("index.html")
+    return render_template("index.html", query_mode=QUERY_MODE)
+
+
+def _relay_stream(payload: dict, headers: dict) -> Response:
+    """
+    Relay the FastAPI `/query/stream` server-sent events to the browser
+    chunk-by-chunk, so the first bytes arrive while the agent is still working.
+
+    A connection that fails before anything was relayed is retried with the
+    same headers (and so the same Idempotency-Key).
+    """
+
+    def _error_event(message: str) -> str:
+        return f"event: error\ndata: {json.dumps({'error': message})}\n\n"
+
+    def generate():
+        for attempt in range(1, QUERY_ATTEMPTS + 1):
+            relayed = False
+            try:
+                # (connect timeout, read timeout between chunks)
+                with requests.post(
+                    f"{FASTAPI_URL}/query/stream",
+                    json=payload,
+                    headers=headers,
+                    stream=True,
+                    timeout=(10, 300),
+                ) as response:
+                    if not response.ok:
+                        yield _error_event(f"Backend returned {response.status_code}")
+                        return
+                    for chunk in response.iter_content(chunk_size=None):
+                        relayed = True
+                        yield chunk
+                return
+            except requests.exceptions.ConnectionError:
+                if relayed or attempt == QUERY_ATTEMPTS:
+                    yield _error_event(
+                        "Could not connect to the AI backend. "
+                        "Please ensure the FastAPI server is running on port 8000."
+                    )
+                    return
+            except requests.exceptions.Timeout:
+                if relayed or attempt == QUERY_ATTEMPTS:
+                    yield _error_event("The AI agent took too long to respond. Please try again.")
+                    return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _post_query(payload: dict, headers: dict) -> requests.Response:
+    """
+    POST to FastAPI `/query`, retrying connection failures and timeouts.
+
+    The retry reuses the Idempotency-Key, so it picks up the run (or the
+    finished answer) of the attempt that failed instead of starting over.
+    """
+    for attempt in range(1, QUERY_ATTEMPTS + 1):
+        try:
+            return requests.post(
+                f"{FASTAPI_URL}/query",
+                json=payload,
+                headers=headers,
+                timeout=(10, 300),  # complex trips can take 2-3 minutes
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == QUERY_ATTEMPTS:
+                raise
 
 
 @app.route("/query", methods=["POST"])
 def query():
-    """Relay the travel query to the FastAPI backend with the session user_id."""
+    """
+    Relay the travel query to the FastAPI backend with the session user_id
+    and conversation thread, so follow-up questions build on earlier answers.
+
+    Clients that send ``Accept: text/event-stream`` get a streaming relay of
+    tokens and tool progress; everyone else gets the single JSON answer.
+    """
     data = request.get_json(force=True)
     question = (data or {}).get("question", "").strip()
 
@@ -54,13 +148,14 @@ def query():
         return jsonify({"error": "No question provided."}), 400
 
     user_id = _ensure_user()
+    payload = {"question": question, "user_id": user_id, "thread_id": _ensure_thread()}
+    headers = {"Idempotency-Key": request.headers.get("Idempotency-Key") or uuid.uuid4().hex}
+
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return _relay_stream(payload, headers)
 
     try:
-        response = requests.post(
-            f"{FASTAPI_URL}/query",
-            json={"question": question, "user_id": user_id},
-            timeout=300,  # complex trips can take 2-3 minutes
-        )
+        response = _post_query(payload, headers)
 
         # Forward FastAPI response (both success and error)
         try:
@@ -88,6 +183,53 @@ def query():
         return jsonify({"error": str(exc)}), 500
 
 
+# ── Background jobs ────────────────────────────────────────────────────────
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """
+    Queue the question as a FastAPI background job and return its id at once;
+    the page then polls `/jobs/<job_id>` instead of holding a request open.
+    """
+    data = request.get_json(force=True)
+    question = (data or {}).get("question", "").strip()
+
+    if not question:
+        return jsonify({"error": "No question provided."}), 400
+
+    payload = {"question": question, "user_id": _ensure_user(), "thread_id": _ensure_thread()}
+    headers = {"Idempotency-Key": request.headers.get("Idempotency-Key") or uuid.uuid4().hex}
+
+    # Safe to retry: the Idempotency-Key makes a repeated POST return the same job
+    for attempt in range(1, QUERY_ATTEMPTS + 1):
+        try:
+            resp = requests.post(f"{FASTAPI_URL}/jobs", json=payload, headers=headers, timeout=10)
+            return jsonify(resp.json()), resp.status_code
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == QUERY_ATTEMPTS:
+                return jsonify({
+                    "error": "Could not connect to the AI backend. "
+                             "Please ensure the FastAPI server is running on port 8000."
+                }), 503
+        except Exception as exc:
+            return jsonify({"error": str(exc)}), 500
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """Relay a job's status and partial output; only the session's own jobs are visible."""
+    try:
+        resp = requests.get(f"{FASTAPI_URL}/jobs/{job_id}", timeout=10)
+        body = resp.json()
+        if resp.ok and body.get("user_id") != _ensure_user():
+            return jsonify({"error": "Job not found."}), 404
+        return jsonify(body), resp.status_code
+    except requests.exceptions.RequestException:
+        return jsonify({"error": "Could not reach the AI backend."}), 503
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+
+
 # ── Preferences ────────────────────────────────────────────────────────────
 
 @app.route("/preferences", methods=["GET"])
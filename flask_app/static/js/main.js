@@ -174,7 +174,13 @@ const sendBtn = document.getElementById('send-btn');
 const sendIcon = document.getElementById('send-icon');
 const sendSpinner = document.getElementById('send-spinner');
 const statusBar = document.getElementById('status-bar');
+const statusText = document.getElementById('status-text');
+const STATUS_DEFAULT = statusText ? statusText.textContent : '';
 const exportBar = document.getElementById('export-bar');
+// "job": submit the question as a background job and poll it; "stream": SSE
+const QUERY_MODE = document.body.dataset.queryMode || 'stream';
+const JOB_POLL_MS = 1000;
+const JOB_POLL_MAX_FAILURES = 5;
 
 let isLoading = false;
 let lastBotAnswer = '';   // stored for PDF export
@@ -191,14 +197,36 @@ function appendUserMessage(text) {
     scrollToBottom();
 }
 
+function renderMarkdown(markdown) {
+    return typeof marked !== 'undefined' ? marked.parse(markdown) : escapeHtml(markdown).replace(/\n/g, '<br>');
+}
+
 function appendBotMessage(markdown) {
     const w = document.createElement('div');
     w.className = 'flex gap-3 items-start';
-    const html = typeof marked !== 'undefined' ? marked.parse(markdown) : escapeHtml(markdown).replace(/\n/g, '<br>');
-    w.innerHTML = `<div class="avatar-bot shrink-0">✈</div><div class="chat-bubble-bot glass-card-inner rounded-2xl rounded-tl-sm p-4 text-sm text-white/80 leading-relaxed max-w-[90%] overflow-auto md-content">${html}</div>`;
+    w.innerHTML = `<div class="avatar-bot shrink-0">✈</div><div class="chat-bubble-bot glass-card-inner rounded-2xl rounded-tl-sm p-4 text-sm text-white/80 leading-relaxed max-w-[90%] overflow-auto md-content">${renderMarkdown(markdown)}</div>`;
     chatMessages.appendChild(w);
     scrollToBottom();
     gsap.from(w, { opacity: 0, x: -12, duration: 0.4, ease: 'power2.out' });
+    return w.querySelector('.chat-bubble-bot');
+}
+
+/**
+ * Create an empty bot bubble and return a function that re-renders it with
+ * the markdown received so far (at most once per animation frame).
+ */
+function appendStreamingBotMessage() {
+    const bubble = appendBotMessage('');
+    let pending = null;
+    return (markdown) => {
+        pending = markdown;
+        requestAnimationFrame(() => {
+            if (pending === null) return;
+            bubble.innerHTML = renderMarkdown(pending);
+            pending = null;
+            scrollToBottom();
+        });
+    };
 }
 
 function showTypingIndicator() {
@@ -221,36 +249,182 @@ function setLoading(loading) {
     sendIcon.classList.toggle('hidden', loading);
     sendSpinner.classList.toggle('hidden', !loading);
     statusBar.classList.toggle('hidden', !loading);
+    if (statusText && !loading) statusText.textContent = STATUS_DEFAULT;
+}
+
+function setStatus(text) {
+    if (statusText) statusText.textContent = text;
 }
 
 function escapeHtml(str) {
     return str.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
 }
 
+function finishAnswer(answer) {
+    lastBotAnswer = answer;
+    exportBar.classList.remove('hidden');
+
+    // Try to extract coordinates and plot on map
+    extractAndPlotLocations(answer);
+}
+
+/**
+ * Read a text/event-stream response body and dispatch each parsed event
+ * to `onEvent(type, data)`.
+ */
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let type = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event:')) type = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            onEvent(type, data ? JSON.parse(data) : {});
+        }
+    }
+}
+
+/**
+ * Submit the question as a background job and poll it until it finishes,
+ * rendering the partial answer and tool progress on each poll.
+ */
+async function runJob(question, idempotencyKey) {
+    const response = await fetch('/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+        body: JSON.stringify({ question }),
+    });
+    const job = await response.json();
+    if (!response.ok) {
+        hideTypingIndicator();
+        appendBotMessage(`⚠️ **Error:** ${job.error || 'An unknown error occurred.'}`);
+        return;
+    }
+
+    let render = null;
+    let failures = 0;
+    while (true) {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+
+        let data;
+        try {
+            const poll = await fetch(`/jobs/${job.job_id}`);
+            data = await poll.json();
+            if (!poll.ok) throw new Error(data.error);
+            failures = 0;
+        } catch (err) {
+            // A restarting backend resumes the job, so ride out short outages
+            if (++failures < JOB_POLL_MAX_FAILURES) continue;
+            hideTypingIndicator();
+            appendBotMessage('⚠️ **Connection error.** Lost track of the plan while it was being built.');
+            return;
+        }
+
+        if (data.status === 'succeeded') {
+            hideTypingIndicator();
+            if (!render) render = appendStreamingBotMessage();
+            render(data.answer);
+            finishAnswer(data.answer);
+            return;
+        }
+        if (data.status === 'failed') {
+            hideTypingIndicator();
+            appendBotMessage(`⚠️ **Error:** ${data.error || 'An unknown error occurred.'}`);
+            return;
+        }
+        if (data.progress) setStatus(data.progress);
+        if (data.partial_output) {
+            if (!render) { hideTypingIndicator(); render = appendStreamingBotMessage(); }
+            render(data.partial_output);
+        }
+    }
+}
+
 async function sendQuery(question) {
     if (!question.trim() || isLoading) return;
     appendUserMessage(question);
     setLoading(true);
     showTypingIndicator();
 
+    // One key per question: resubmissions and relay retries reuse the same run
+    const idempotencyKey = (crypto.randomUUID && crypto.randomUUID())
+        || `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
     try {
+        if (QUERY_MODE === 'job') {
+            await runJob(question, idempotencyKey);
+            return;
+        }
+
         const response = await fetch('/query', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'Idempotency-Key': idempotencyKey,
+            },
             body: JSON.stringify({ question }),
         });
-        hideTypingIndicator();
-        const data = await response.json();
 
-        if (response.ok && data.answer) {
-            lastBotAnswer = data.answer;
-            appendBotMessage(data.answer);
-            exportBar.classList.remove('hidden');
+        // Validation errors come back as plain JSON, not as a stream
+        if (!(response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+            hideTypingIndicator();
+            const data = await response.json();
+            if (response.ok && data.answer) {
+                appendBotMessage(data.answer);
+                finishAnswer(data.answer);
+            } else {
+                appendBotMessage(`⚠️ **Error:** ${data.error || 'An unknown error occurred.'}`);
+            }
+            return;
+        }
+
+        let render = null;
+        let streamed = '';
+        let finished = false;
+
+        await readEventStream(response, (type, data) => {
+            if (type === 'token') {
+                if (!render) { hideTypingIndicator(); render = appendStreamingBotMessage(); }
+                streamed += data.content;
+                render(streamed);
+            } else if (type === 'tool_start') {
+                setStatus(`Calling ${data.name}…`);
+                // A tool call ends the current model turn; the next turn starts afresh
+                streamed = '';
+            } else if (type === 'tool_end') {
+                setStatus(`${data.name} finished — agent is thinking…`);
+            } else if (type === 'done') {
+                finished = true;
+                hideTypingIndicator();
+                const answer = data.answer || streamed;
+                if (!render) render = appendStreamingBotMessage();
+                render(answer);
+                finishAnswer(answer);
+            } else if (type === 'error') {
+                finished = true;
+                hideTypingIndicator();
+                appendBotMessage(`⚠️ **Error:** ${data.error || 'An unknown error occurred.'}`);
+            }
+        });
 
-            // Try to extract coordinates and plot on map
-            extractAndPlotLocations(data.answer);
-        } else {
-            appendBotMessage(`⚠️ **Error:** ${data.error || 'An unknown error occurred.'}`);
+        if (!finished) {
+            hideTypingIndicator();
+            appendBotMessage('⚠️ **Error:** The response stream ended unexpectedly.');
         }
     } catch (err) {
         hideTypingIndicator();
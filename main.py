@@ -1,34 +1,103 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import uuid
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from starlette.responses import JSONResponse
-
-from agents.agentic_workflow import GraphBuilder
-from models import UserPreferenceManager
+from pydantic import AnyHttpUrl, BaseModel, Field
+from starlette.responses import JSONResponse, StreamingResponse
+
+from exception.handling import RateLimitExceeded
+from models import DB_PATH, JobManager, UserPreferenceManager, init_db
+from utils.config_loader import load_config
+from utils.deadline import request_deadline
+from utils.job_queue import JobWorkerPool, check_callback_url
+from utils.metrics import metrics, request_scope
+from utils.response_cache import PlanCache, normalise_question
 from utils.save_document import save_document
+from utils.single_flight import SingleFlight
+from utils.tool_cache import ToolResultCache, shared_tool_results
 
 load_dotenv()
 
 pref_mgr = UserPreferenceManager()
+job_mgr = JobManager()
+
+# Strong references to fire-and-forget tasks (stale-while-revalidate refreshes)
+_background_tasks: set[asyncio.Task] = set()
+
+# Per-request counters that mark an answer as degraded — cut short by the
+# time/step budget, or built on tool calls that failed, timed out or fell
+# back to stale data.  Degraded answers are returned but never cached.
+DEGRADED_COUNTER_PREFIXES = (
+    "agent.finalized.", "tools.errors", "tools.error_results", "tools.timeouts",
+    "tools.queue_timeouts", "tools.unavailable",
+)
 
 
 # ---------------------------------------------------------------------------
-# Lifespan: build the default (no-user) graph ONCE at startup.
-# Per-user graphs with preference injection are built on demand.
+# Lifespan: build the graph ONCE at startup.
+# Per-user preferences are passed through the runnable config on each call,
+# so the same compiled graph (and LLM client) serves every request.
+# Conversation threads are checkpointed into the app's SQLite database.
+# The agent stack (LangGraph, LangChain, tool modules) is imported here rather
+# than at module level, so importing `main` stays cheap for tooling and tests.
 # ---------------------------------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan context manager — runs startup logic before yield."""
-    print("Initialising default GraphBuilder and compiling ReAct graph...")
-    graph_builder = GraphBuilder(model_provider="groq")
-    app.state.agent = graph_builder()
-    print("Graph compiled and ready.")
-    yield
-    print("Application shutting down.")
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    from agents.agentic_workflow import GraphBuilder
+    from utils.cassette import save_active as save_cassette
+    from utils.http_client import aclose_clients, awarm_up_clients
+    from utils.model_loader import awarm_up_llms
+
+    await asyncio.to_thread(init_db)
+    async with AsyncSqliteSaver.from_conn_string(DB_PATH) as checkpointer:
+        print("Initialising GraphBuilder and compiling ReAct graph...")
+        # LLM_PROVIDER=fake runs the whole API against the offline model
+        model_provider = os.getenv("LLM_PROVIDER", "groq")
+        graph_builder = GraphBuilder(model_provider=model_provider, checkpointer=checkpointer)
+        app.state.agent = graph_builder()
+        print("Graph compiled and ready.")
+
+        config = load_config()
+        startup_config = config["startup"]
+        if startup_config["warm_up"]:
+            timeout = startup_config["warm_up_timeout_seconds"]
+            await asyncio.gather(awarm_up_llms(timeout), awarm_up_clients(timeout))
+        app.state.deadline_seconds = config["agent"]["budget"]["deadline_seconds"]
+        cache_config = config["cache"]
+        plans_config = cache_config["plans"]
+        app.state.plan_cache = PlanCache.from_config(plans_config) if plans_config["enabled"] else None
+        app.state.flight = SingleFlight()
+        app.state.idempotency_ttl = cache_config["idempotency"]["ttl_seconds"]
+        app.state.batch = config["batch"]
+
+        jobs_config = config["jobs"]
+        app.state.job_deadline_seconds = jobs_config["deadline_seconds"]
+        app.state.jobs = JobWorkerPool(
+            job_mgr,
+            _run_job,
+            workers=jobs_config["workers"],
+            progress_interval_seconds=jobs_config["progress_interval_seconds"],
+            callback_timeout_seconds=jobs_config["callback_timeout_seconds"],
+            callback_retries=jobs_config["callback_retries"],
+            callback_allowed_hosts=jobs_config["callback_allowed_hosts"],
+        )
+        await app.state.jobs.start()
+        yield
+        print("Application shutting down.")
+        await app.state.jobs.stop()
+        await aclose_clients()
+        save_cassette()
 
 
 # ---------------------------------------------------------------------------
@@ -56,10 +125,25 @@ app.add_middleware(
 class QueryRequest(BaseModel):
     question: str
     user_id: Optional[int] = None
+    thread_id: Optional[str] = None  # continue an earlier conversation
 
 
 class QueryResponse(BaseModel):
     answer: str
+    thread_id: str
+
+
+class BatchQueryRequest(BaseModel):
+    questions: list[str] = Field(min_length=1)
+    user_id: Optional[int] = None
+    max_concurrency: Optional[int] = Field(default=None, ge=1)  # capped by batch.max_concurrency
+
+
+class JobRequest(BaseModel):
+    question: str
+    user_id: Optional[int] = None
+    thread_id: Optional[str] = None
+    callback_url: Optional[AnyHttpUrl] = None  # receives the finished job as JSON
 
 
 class PreferenceIn(BaseModel):
@@ -76,56 +160,495 @@ class PreferenceDeleteIn(BaseModel):
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
+async def _run_config(query: QueryRequest) -> dict:
+    """
+    Build the runnable config for a graph run.
+
+    If `user_id` is provided, the user's stored preferences are passed in the
+    runnable config and appended to the system prompt by the agent node.  The
+    blocking preference lookup runs in a worker thread.  Requests without a
+    `thread_id` start a new conversation thread.
+    """
+    config = {"configurable": {"thread_id": query.thread_id or uuid.uuid4().hex}}
+    if query.user_id is not None:
+        config["configurable"]["user_preferences"] = await asyncio.to_thread(
+            pref_mgr.format_for_prompt, query.user_id
+        )
+    return config
+
+
+def _report_request(stats: dict) -> None:
+    """Log and record the per-request totals collected by `request_scope`."""
+    saved = int(stats.get("context.tokens_saved", 0))
+    metrics.observe("context.tokens_saved_per_request", saved)
+    print(
+        f"Request finished: {int(stats.get('agent.llm_calls', 0))} LLM call(s), "
+        f"{int(stats.get('tools.calls', 0))} tool call(s), "
+        f"~{saved} prompt tokens saved by context compaction."
+    )
+
+
+def _degraded(stats: dict) -> bool:
+    """True if the request's counters show a degraded answer (see DEGRADED_COUNTER_PREFIXES)."""
+    return any(
+        value and (name.startswith(DEGRADED_COUNTER_PREFIXES) or name.endswith(".stale_served"))
+        for name, value in stats.items()
+    )
+
+
+def _store_plan(cache_key: tuple | None, answer: str, degraded: bool) -> None:
+    """Cache a finished plan, unless it is empty, not cacheable or degraded."""
+    if cache_key is None or not answer:
+        return
+    if degraded:
+        metrics.incr("plan_cache.degraded_skipped")
+        return
+    app.state.plan_cache.store(cache_key, answer)
+
+
+async def _run_graph(question: str, config: dict) -> tuple[str, bool]:
+    """
+    Run the shared graph for one question; returns (answer, degraded).
+
+    The run gets the request time budget (`agent.budget.deadline_seconds`);
+    when it runs out the graph answers with the best plan it has so far.
+    """
+    with request_scope() as stats, request_deadline(app.state.deadline_seconds):
+        output = await app.state.agent.ainvoke({"messages": [question]}, config=config)
+    _report_request(stats)
+
+    if isinstance(output, dict) and "messages" in output:
+        return output["messages"][-1].content, _degraded(stats)
+    return str(output), _degraded(stats)
+
+
+def _schedule_refresh(key: tuple, question: str, config: dict) -> None:
+    """Re-run a stale cached plan in the background and store the result."""
+    plan_cache: PlanCache = app.state.plan_cache
+    if key in plan_cache.refreshing:
+        return
+    plan_cache.refreshing.add(key)
+
+    # Refresh on a throwaway thread so the requester's conversation is untouched
+    refresh_config = {"configurable": {**config["configurable"], "thread_id": uuid.uuid4().hex}}
+
+    from utils.llm_scheduler import PRIORITY_BACKGROUND, llm_priority
+
+    async def refresh() -> None:
+        try:
+            # Refreshes queue behind interactive requests for LLM rate-limit slots
+            with llm_priority(PRIORITY_BACKGROUND):
+                answer, degraded = await _run_graph(question, refresh_config)
+            # A degraded refresh leaves the stale entry to be served until it expires
+            _store_plan(key, answer, degraded)
+            if not degraded:
+                metrics.incr("plan_cache.refreshes")
+        except Exception:
+            import traceback
+            traceback.print_exc()
+        finally:
+            plan_cache.refreshing.discard(key)
+
+    task = asyncio.create_task(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _cached_answer(question: str, config: dict) -> tuple[str | None, tuple | None]:
+    """
+    Look the question up in the plan cache.
+
+    Only the first question of a thread is cacheable — follow-ups depend on
+    the conversation so far.  A hit is written into the thread so follow-ups
+    can build on it.
+
+    Returns (answer, key): answer is None on a miss, key is None when the
+    question is not cacheable.  Stale hits are returned and refreshed in the
+    background.
+    """
+    plan_cache: PlanCache | None = app.state.plan_cache
+    if plan_cache is None:
+        return None, None
+
+    snapshot = await app.state.agent.aget_state(config)
+    if snapshot.values.get("messages"):
+        return None, None
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    pref_block = config["configurable"].get("user_preferences", "")
+    answer, state, key = plan_cache.lookup(question, pref_block)
+    if state == "stale":
+        _schedule_refresh(key, question, config)
+    if answer is not None:
+        await app.state.agent.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=question), AIMessage(content=answer)]},
+            as_node="agent",
+        )
+    return answer, key
+
+
+def _flight_key(query: QueryRequest, config: dict, idempotency_key: str | None) -> tuple[str, float]:
+    """
+    Return the single-flight key for a request and how long to keep its result.
+
+    With an `Idempotency-Key` header the key is the client's, and the result
+    is kept for `cache.idempotency.ttl_seconds` so retries get it back.
+    Otherwise identical in-flight requests — same normalised question, user,
+    preferences and thread — share one run, and nothing is kept afterwards.
+    """
+    if idempotency_key:
+        return f"idempotency:{query.user_id}:{idempotency_key}", app.state.idempotency_ttl
+
+    pref_block = config["configurable"].get("user_preferences", "")
+    pref_hash = hashlib.sha256(pref_block.encode()).hexdigest()[:16]
+    return (
+        f"query:{query.user_id}:{query.thread_id or ''}:{pref_hash}:"
+        f"{normalise_question(query.question)}",
+        0,
+    )
+
+
+async def _answer(question: str, config: dict) -> dict:
+    """Answer one question from the plan cache or a graph run."""
+    thread_id = config["configurable"]["thread_id"]
+
+    answer, cache_key = await _cached_answer(question, config)
+    if answer is not None:
+        return {"answer": answer, "thread_id": thread_id}
+
+    answer, degraded = await _run_graph(question, config)
+    _store_plan(cache_key, answer, degraded)
+    return {"answer": answer, "thread_id": thread_id}
+
+
 @app.post("/query", response_model=QueryResponse)
-async def query_travel_agent(query: QueryRequest):
+async def query_travel_agent(query: QueryRequest, idempotency_key: Optional[str] = Header(default=None)):
     """
     Accept a natural-language travel question and return a detailed travel plan.
 
-    If `user_id` is provided, a personalised graph with the user's stored
-    preferences is compiled on-the-fly.  Otherwise, the default singleton
-    graph is used.
+    Answers are served from the plan cache when the same (or a near-identical)
+    question was answered recently for the same preferences.  Otherwise the
+    singleton graph compiled at startup runs via `ainvoke`: LLM and tool HTTP
+    calls are awaited, so the event loop keeps serving other requests while
+    a plan is being built.
+
+    A request identical to one still running — or carrying the
+    `Idempotency-Key` of a recent request — waits for that run's answer
+    (and thread_id) instead of starting another.
     """
     try:
-        if query.user_id is not None:
-            # Build a per-user graph with preference injection
-            builder = GraphBuilder(model_provider="groq", user_id=query.user_id)
-            react_app = builder()
-        else:
-            react_app = app.state.agent
+        config = await _run_config(query)
+        key, keep_for = _flight_key(query, config, idempotency_key)
+        result = await app.state.flight.do(key, lambda: _answer(query.question, config), keep_for)
+        return QueryResponse(**result)
+
+    except RateLimitExceeded as e:
+        return _rate_limited(e)
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+def _rate_limited(error: RateLimitExceeded) -> JSONResponse:
+    """429 response telling the client when the LLM is likely to accept calls again."""
+    retry_after = max(1, math.ceil(error.retry_after))
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(error), "retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)},
+    )
 
-        messages = {"messages": [query.question]}
-        output = react_app.invoke(messages)
 
-        if isinstance(output, dict) and "messages" in output:
-            final_output = output["messages"][-1].content
-        else:
-            final_output = str(output)
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        return QueryResponse(answer=final_output)
+
+async def _graph_events(
+    question: str, config: dict, deadline_seconds: float
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run the graph with `astream_events` and yield its progress as
+    (event, data) pairs: "token", "tool_start", "tool_end", then one "done"
+    carrying the final answer and whether it is degraded (see `_degraded`).
+    """
+    from agents.agentic_workflow import TOOLS_ROUTE_TAG
+
+    answer = ""
+    with request_scope() as stats, request_deadline(deadline_seconds):
+        async for event in app.state.agent.astream_events(
+            {"messages": [question]}, config=config, version="v2"
+        ):
+            kind = event["event"]
+            if TOOLS_ROUTE_TAG in event.get("tags", ()) and kind.startswith("on_chat_model"):
+                continue  # the fast model's drafts are superseded by the synthesis model
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content and isinstance(content, str):
+                    yield "token", {"content": content}
+            elif kind == "on_chat_model_end":
+                output = event["data"].get("output")
+                if output is not None and not getattr(output, "tool_calls", None):
+                    answer = output.content
+            elif kind == "on_tool_start":
+                yield "tool_start", {"name": event["name"], "input": event["data"].get("input", {})}
+            elif kind == "on_tool_end":
+                yield "tool_end", {"name": event["name"]}
+    _report_request(stats)
+    yield "done", {"answer": answer, "degraded": _degraded(stats)}
+
+
+async def _stream_plan(query: QueryRequest, idempotency_key: str | None) -> AsyncIterator[str]:
+    """
+    Run the graph with `astream_events` and translate its events to SSE.
+
+    Event types:
+        start       — {"thread_id": str}, sent as soon as the run is set up.
+        token       — {"content": str}, one LLM output chunk.
+        tool_start  — {"name": str, "input": dict}
+        tool_end    — {"name": str}
+        done        — {"answer": str, "thread_id": str}, the final plan.
+        error       — {"error": str}, plus "retry_after" (seconds) when the
+                      LLM rate limit could not be satisfied.
+
+    A request matching a run already in flight (see `_flight_key`) gets no
+    progress events, only that run's `done`.
+    """
+    flight: SingleFlight = app.state.flight
+    key = leader = None
+    try:
+        config = await _run_config(query)
+        thread_id = config["configurable"]["thread_id"]
+        yield _sse("start", {"thread_id": thread_id})
+
+        key, keep_for = _flight_key(query, config, idempotency_key)
+        running = flight.lookup(key)
+        if running is not None:
+            metrics.incr("single_flight.coalesced")
+            yield _sse("done", await asyncio.shield(running))
+            return
+        leader = flight.start(key)
+
+        answer, cache_key = await _cached_answer(query.question, config)
+        if answer is not None:
+            result = {"answer": answer, "thread_id": thread_id}
+            flight.resolve(key, leader, result, keep_for)
+            yield _sse("done", result)
+            return
+
+        degraded = False
+        async for event, data in _graph_events(query.question, config, app.state.deadline_seconds):
+            if event == "done":
+                answer, degraded = data["answer"], data["degraded"]
+            else:
+                yield _sse(event, data)
+
+        _store_plan(cache_key, answer, degraded)
+        result = {"answer": answer, "thread_id": thread_id}
+        flight.resolve(key, leader, result, keep_for)
+        yield _sse("done", result)
+
+    except RateLimitExceeded as e:
+        if leader is not None:
+            flight.fail(key, leader, e)
+        yield _sse("error", {"error": str(e), "retry_after": max(1, math.ceil(e.retry_after))})
 
     except Exception as e:
+        if leader is not None:
+            flight.fail(key, leader, e)
         import traceback
         traceback.print_exc()
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        yield _sse("error", {"error": str(e)})
+
+    finally:
+        # Client went away mid-run: release requests waiting on this one
+        if leader is not None and not leader.done():
+            flight.fail(key, leader, RuntimeError("The streaming request was cancelled."))
+
+
+@app.post("/query/stream")
+async def stream_travel_agent(query: QueryRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """
+    Same as `/query`, but streams LLM tokens and tool progress as
+    server-sent events while the plan is being built.
+    """
+    return StreamingResponse(
+        _stream_plan(query, idempotency_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── Batch planning ────────────────────────────────────────────────────────
+
+async def _batch_results(batch: BatchQueryRequest, concurrency: int) -> AsyncIterator[str]:
+    """
+    Plan every question of a batch, at most `concurrency` at a time, and
+    yield one NDJSON line per question as it finishes.
+
+    Each question gets its own thread.  Questions that normalise to the same
+    text share one run, and all runs share one tool-result cache, so data
+    several plans need is fetched once.  Batches queue behind interactive
+    requests for LLM slots.  Disconnecting cancels the unfinished runs.
+    """
+    from utils.llm_scheduler import PRIORITY_JOBS, llm_priority
+
+    base = await _run_config(QueryRequest(question="", user_id=batch.user_id))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def plan(question: str) -> dict:
+        config = {"configurable": {**base["configurable"], "thread_id": uuid.uuid4().hex}}
+        async with semaphore:
+            return await _answer(question, config)
+
+    async def run(index: int, question: str, shared: asyncio.Task) -> dict:
+        item = {"index": index, "question": question}
+        try:
+            return {**item, **await asyncio.shield(shared)}
+        except RateLimitExceeded as e:
+            return {**item, "error": str(e), "retry_after": max(1, math.ceil(e.retry_after))}
+        except Exception as e:
+            return {**item, "error": str(e)}
+
+    runs: dict[str, asyncio.Task] = {}
+    # Tasks copy the context they are created in: cache and priority reach every run
+    with shared_tool_results(ToolResultCache()), llm_priority(PRIORITY_JOBS):
+        for question in batch.questions:
+            key = normalise_question(question)
+            if key not in runs:
+                runs[key] = asyncio.create_task(plan(question))
+        items = [
+            asyncio.create_task(run(index, question, runs[normalise_question(question)]))
+            for index, question in enumerate(batch.questions)
+        ]
+
+    try:
+        for finished in asyncio.as_completed(items):
+            yield json.dumps(await finished, default=str) + "\n"
+        metrics.incr("batch.questions", len(items))
+        metrics.observe("batch.unique_questions", len(runs))
+    finally:
+        for task in [*runs.values(), *items]:
+            task.cancel()
+
+
+@app.post("/query/batch")
+async def batch_travel_agent(batch: BatchQueryRequest):
+    """
+    Plan many questions in one request (e.g. one page per destination).
+
+    Runs up to `batch.max_concurrency` questions at a time (or the smaller
+    `max_concurrency` of the request) and streams the results as NDJSON in
+    completion order.  Each line carries the question's `index` in the
+    request and either `answer` and `thread_id` or `error`.
+    """
+    limits = app.state.batch
+    if len(batch.questions) > limits["max_items"]:
+        return JSONResponse(
+            status_code=422,
+            content={"error": f"A batch may contain at most {limits['max_items']} questions."},
+        )
+    concurrency = min(batch.max_concurrency or limits["max_concurrency"], limits["max_concurrency"])
+    return StreamingResponse(_batch_results(batch, concurrency), media_type="application/x-ndjson")
+
+
+# ── Background jobs ───────────────────────────────────────────────────────
+
+async def _run_job(job: dict, report: Callable[..., Awaitable[None]]) -> str:
+    """
+    Run one background job and return its answer (called by `JobWorkerPool`).
+
+    Jobs queue behind interactive requests for LLM slots and get their own,
+    longer deadline (`jobs.deadline_seconds`).  The answer text streamed so
+    far and the current tool step are reported as the job's progress.
+    """
+    from utils.llm_scheduler import PRIORITY_JOBS, llm_priority
+
+    query = QueryRequest(question=job["question"], user_id=job["user_id"], thread_id=job["thread_id"])
+    config = await _run_config(query)
+
+    answer, cache_key = await _cached_answer(query.question, config)
+    if answer is not None:
+        return answer
+
+    streamed, degraded = "", False
+    with llm_priority(PRIORITY_JOBS):
+        async for event, data in _graph_events(query.question, config, app.state.job_deadline_seconds):
+            if event == "token":
+                streamed += data["content"]
+                await report(partial_output=streamed)
+            elif event == "tool_start":
+                streamed = ""  # the next model turn starts a new text
+                await report(progress=f"Calling {data['name']}…")
+            elif event == "tool_end":
+                await report(progress=f"{data['name']} finished — agent is thinking…")
+            elif event == "done":
+                answer, degraded = data["answer"], data["degraded"]
+
+    _store_plan(cache_key, answer, degraded)
+    return answer
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(job: JobRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """
+    Queue a travel question and return its job id immediately.
+
+    Poll `GET /jobs/{job_id}` for status and partial output, or pass a
+    `callback_url` to have the finished job POSTed there (it must be a
+    public http(s) host, see `check_callback_url`).  Re-sending an
+    `Idempotency-Key` returns the job it created the first time.
+    """
+    if job.callback_url:
+        try:
+            await check_callback_url(str(job.callback_url), app.state.jobs.callback_allowed_hosts)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+    record, created = await asyncio.to_thread(
+        job_mgr.create_job,
+        job.question,
+        job.thread_id or uuid.uuid4().hex,
+        job.user_id,
+        str(job.callback_url) if job.callback_url else None,
+        idempotency_key,
+    )
+    if created:
+        app.state.jobs.submit(record["job_id"])
+    return {"job_id": record["job_id"], "status": record["status"], "thread_id": record["thread_id"]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Return a job's status, progress, partial output and — once done — answer or error."""
+    record = job_mgr.get_job(job_id)
+    if record is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found."})
+    return record
 
 
 # ── Preferences CRUD ──────────────────────────────────────────────────────
+# These use blocking SQLAlchemy sessions, so they are plain `def` endpoints:
+# FastAPI runs them in its threadpool instead of on the event loop.
 
 @app.post("/preferences")
-async def set_preference(pref: PreferenceIn):
+def set_preference(pref: PreferenceIn):
     """Add or update a user preference."""
     pref_mgr.add_preference(pref.user_id, pref.key, pref.value)
     return {"status": "ok", "message": f"Preference '{pref.key}' saved."}
 
 
 @app.get("/preferences/{user_id}")
-async def get_preferences(user_id: int):
+def get_preferences(user_id: int):
     """Return all preferences for a user."""
     return {"user_id": user_id, "preferences": pref_mgr.get_preferences(user_id)}
 
 
 @app.delete("/preferences")
-async def delete_preference(pref: PreferenceDeleteIn):
+def delete_preference(pref: PreferenceDeleteIn):
     """Delete a specific preference."""
     deleted = pref_mgr.delete_preference(pref.user_id, pref.key)
     if deleted:
@@ -134,12 +657,28 @@ async def delete_preference(pref: PreferenceDeleteIn):
 
 
 @app.post("/users")
-async def create_user(name: str = "Traveller"):
+def create_user(name: str = "Traveller"):
     """Create a new user and return their ID."""
     user_id = pref_mgr.get_or_create_user(name)
     return {"user_id": user_id, "name": name}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Return in-process counters, timing summaries and place-catalog savings."""
+    from utils.place_info import catalog_stats
+
+    return {**metrics.snapshot(), "place_catalog": catalog_stats()}
+
+
+@app.get("/admin/upstreams")
+async def get_upstreams():
+    """Circuit-breaker state, adaptive timeout and latency histogram per upstream API."""
+    from utils.http_client import upstream_status
+
+    return upstream_status()
+
+
 @app.get("/health")
 async def health_check():
     """Simple health-check endpoint."""
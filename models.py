@@ -4,16 +4,23 @@ models.py — SQLAlchemy ORM models and preference manager for long-term user me
 Tables:
     - User:       Stores user profiles.
     - Preference:  Stores key-value preferences per user (e.g. "diet" → "vegan").
+    - Job:         Background travel-plan runs (see `JobManager`).
+    - CatalogPlace: Google Places data by place_id, each field group with its
+                   own timestamp (see `PlaceCatalog`).
+    - PlaceQuery:  Which place_ids a normalised search returned.
 """
 
 import os
 import datetime
+import json
+import uuid
 from sqlalchemy import (
-    Column, Integer, String, DateTime, ForeignKey, Text, create_engine
+    Column, Integer, Float, String, DateTime, ForeignKey, Text, UniqueConstraint, create_engine
 )
 from sqlalchemy.orm import (
     declarative_base, relationship, sessionmaker, Session
 )
+from sqlalchemy.exc import IntegrityError
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "travel_planner.db")
@@ -54,8 +61,69 @@ class Preference(Base):
         return f"<Preference {self.key!r}={self.value!r}>"
 
 
-# Create tables on first import
-Base.metadata.create_all(engine)
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key"),)
+
+    id              = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id         = Column(Integer, ForeignKey("users.id"), nullable=True)
+    thread_id       = Column(String(64), nullable=False)
+    question        = Column(Text, nullable=False)
+    status          = Column(String(16), nullable=False, default="queued")
+    progress        = Column(String(200), nullable=True)   # e.g. "Calling search_places…"
+    partial_output  = Column(Text, nullable=True)          # answer text streamed so far
+    answer          = Column(Text, nullable=True)
+    error           = Column(Text, nullable=True)
+    callback_url    = Column(String(2048), nullable=True)
+    idempotency_key = Column(String(128), nullable=True)
+    created_at      = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at      = Column(DateTime, nullable=True)
+    finished_at     = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job id={self.id} status={self.status}>"
+
+
+class CatalogPlace(Base):
+    __tablename__ = "place_catalog"
+
+    place_id           = Column(String(256), primary_key=True)
+    name               = Column(String(300), nullable=True)
+    address            = Column(Text, nullable=True)
+    types              = Column(Text, nullable=True)      # JSON list
+    latitude           = Column(Float, nullable=True)
+    longitude          = Column(Float, nullable=True)
+    rating             = Column(Float, nullable=True)
+    user_ratings_total = Column(Integer, nullable=True)
+    top_review         = Column(Text, nullable=True)
+    # When each field group was last fetched (see PlaceCatalog.GROUPS)
+    identity_updated_at = Column(DateTime, nullable=True)
+    location_updated_at = Column(DateTime, nullable=True)
+    ratings_updated_at  = Column(DateTime, nullable=True)
+    reviews_updated_at  = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<CatalogPlace {self.place_id} name={self.name!r}>"
+
+
+class PlaceQuery(Base):
+    __tablename__ = "place_queries"
+
+    key        = Column(String(512), primary_key=True)   # normalised "query|location"
+    place_ids  = Column(Text, nullable=False)            # JSON list, in ranking order
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<PlaceQuery {self.key!r}>"
+
+
+def init_db() -> None:
+    """
+    Create any missing tables.  Called once from the FastAPI lifespan (and by
+    scripts that use the managers directly) rather than on import, so
+    importing this module never touches the database.
+    """
+    Base.metadata.create_all(engine)
 
 
 # ── Preference Manager (Single Responsibility) ───────────────────────────────
@@ -140,3 +208,258 @@ class UserPreferenceManager:
         for p in prefs:
             lines.append(f"- **{p['key']}**: {p['value']}")
         return "\n".join(lines)
+
+
+# ── Job Manager ───────────────────────────────────────────────────────────────
+
+class JobManager:
+    """
+    Persists background plan jobs, so queued and interrupted jobs survive a
+    restart.  Status moves queued → running → succeeded | failed.
+    """
+
+    QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+    def __init__(self) -> None:
+        self._session_factory = SessionLocal
+
+    def _session(self) -> Session:
+        return self._session_factory()
+
+    @staticmethod
+    def _to_dict(job: Job) -> dict:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "user_id": job.user_id,
+            "thread_id": job.thread_id,
+            "question": job.question,
+            "progress": job.progress,
+            "partial_output": job.partial_output,
+            "answer": job.answer,
+            "error": job.error,
+            "callback_url": job.callback_url,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+
+    def create_job(
+        self,
+        question: str,
+        thread_id: str,
+        user_id: int | None = None,
+        callback_url: str | None = None,
+        idempotency_key: str | None = None,
+    ) -> tuple[dict, bool]:
+        """
+        Queue a job.  Returns (job, created); with an idempotency key already
+        used by this user the existing job is returned and created is False.
+        Of two concurrent requests with the same key, the one that loses the
+        insert race gets the winner's job.
+        """
+        with self._session() as session:
+            if idempotency_key:
+                existing = self._find_idempotent(session, user_id, idempotency_key)
+                if existing:
+                    return self._to_dict(existing), False
+            job = Job(
+                question=question,
+                thread_id=thread_id,
+                user_id=user_id,
+                callback_url=callback_url,
+                idempotency_key=idempotency_key,
+            )
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                existing = self._find_idempotent(session, user_id, idempotency_key) if idempotency_key else None
+                if existing is None:
+                    raise
+                return self._to_dict(existing), False
+            session.refresh(job)
+            return self._to_dict(job), True
+
+    @staticmethod
+    def _find_idempotent(session: Session, user_id: int | None, idempotency_key: str) -> Job | None:
+        return session.query(Job).filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._session() as session:
+            job = session.get(Job, job_id)
+            return self._to_dict(job) if job else None
+
+    def update_job(self, job_id: str, **fields) -> None:
+        """Set columns on a job (status, progress, partial_output, …)."""
+        with self._session() as session:
+            job = session.get(Job, job_id)
+            if job is None:
+                return
+            for name, value in fields.items():
+                setattr(job, name, value)
+            session.commit()
+
+    def mark_running(self, job_id: str) -> None:
+        self.update_job(job_id, status=self.RUNNING, started_at=datetime.datetime.utcnow())
+
+    def mark_succeeded(self, job_id: str, answer: str) -> None:
+        self.update_job(
+            job_id, status=self.SUCCEEDED, answer=answer, progress=None,
+            finished_at=datetime.datetime.utcnow(),
+        )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self.update_job(
+            job_id, status=self.FAILED, error=error, progress=None,
+            finished_at=datetime.datetime.utcnow(),
+        )
+
+    def requeue_unfinished(self) -> list[str]:
+        """
+        Reset jobs interrupted by a shutdown to queued and return every
+        queued job id, oldest first — called once at startup.
+        """
+        with self._session() as session:
+            session.query(Job).filter_by(status=self.RUNNING).update(
+                {"status": self.QUEUED, "progress": None, "partial_output": None}
+            )
+            session.commit()
+            jobs = (
+                session.query(Job)
+                .filter_by(status=self.QUEUED)
+                .order_by(Job.created_at)
+                .all()
+            )
+            return [job.id for job in jobs]
+
+
+# ── Place Catalog ─────────────────────────────────────────────────────────────
+
+class PlaceCatalog:
+    """
+    Persistent store of Google Places results.
+
+    Place fields are grouped by how fast they change; each group carries its
+    own `<group>_updated_at`, so callers can refresh ratings weekly while
+    keeping coordinates for a year.  Freshness rules live with the caller
+    (`utils.place_info.PlaceInfo`); this class only stores and retrieves.
+    """
+
+    GROUPS: dict[str, tuple[str, ...]] = {
+        "identity": ("name", "address", "types"),
+        "location": ("latitude", "longitude"),
+        "ratings":  ("rating", "user_ratings_total"),
+        "reviews":  ("top_review",),
+    }
+
+    WRITE_ATTEMPTS = 3
+
+    def __init__(self) -> None:
+        self._session_factory = SessionLocal
+
+    def _session(self) -> Session:
+        return self._session_factory()
+
+    @classmethod
+    def _to_dict(cls, place: CatalogPlace) -> dict:
+        data = {"place_id": place.place_id}
+        for group, fields in cls.GROUPS.items():
+            for name in fields:
+                data[name] = getattr(place, name)
+            data[f"{group}_updated_at"] = getattr(place, f"{group}_updated_at")
+        data["types"] = json.loads(data["types"]) if data["types"] else []
+        return data
+
+    def get_places(self, place_ids: list[str]) -> dict[str, dict]:
+        """Return the stored places among `place_ids`, keyed by place_id."""
+        if not place_ids:
+            return {}
+        with self._session() as session:
+            places = session.query(CatalogPlace).filter(CatalogPlace.place_id.in_(place_ids)).all()
+            return {p.place_id: self._to_dict(p) for p in places}
+
+    def _write(self, apply) -> None:
+        """
+        Run `apply(session)` and commit.  Concurrent tool calls may insert
+        the same new row at once; the loser of that race starts over and
+        then finds the row, so it updates it instead.
+        """
+        for attempt in range(self.WRITE_ATTEMPTS):
+            with self._session() as session:
+                try:
+                    apply(session)
+                    session.commit()
+                    return
+                except IntegrityError:
+                    session.rollback()
+                    if attempt == self.WRITE_ATTEMPTS - 1:
+                        raise
+
+    def upsert_places(self, places: list[dict], groups: tuple[str, ...]) -> None:
+        """Store the `groups` fields of each place and stamp those groups as fresh."""
+        now = datetime.datetime.utcnow()
+
+        def apply(session: Session) -> None:
+            for data in places:
+                place = session.get(CatalogPlace, data["place_id"])
+                if place is None:
+                    place = CatalogPlace(place_id=data["place_id"])
+                    session.add(place)
+                for group in groups:
+                    for name in self.GROUPS[group]:
+                        value = data.get(name)
+                        setattr(place, name, json.dumps(value) if name == "types" else value)
+                    setattr(place, f"{group}_updated_at", now)
+
+        self._write(apply)
+
+    def locations(self) -> list[tuple[str, float, float, list[str]]]:
+        """(place_id, latitude, longitude, types) of every place with coordinates."""
+        with self._session() as session:
+            rows = (
+                session.query(
+                    CatalogPlace.place_id, CatalogPlace.latitude, CatalogPlace.longitude, CatalogPlace.types
+                )
+                .filter(CatalogPlace.latitude.isnot(None), CatalogPlace.longitude.isnot(None))
+                .all()
+            )
+            return [(pid, lat, lng, json.loads(types) if types else []) for pid, lat, lng, types in rows]
+
+    def get_query(self, key: str) -> tuple[list[str], datetime.datetime] | None:
+        """Return (place_ids, updated_at) for a stored search, if any."""
+        with self._session() as session:
+            query = session.get(PlaceQuery, key)
+            return (json.loads(query.place_ids), query.updated_at) if query else None
+
+    def store_query(self, key: str, place_ids: list[str]) -> None:
+        def apply(session: Session) -> None:
+            query = session.get(PlaceQuery, key)
+            if query is None:
+                query = PlaceQuery(key=key)
+                session.add(query)
+            query.place_ids = json.dumps(place_ids)
+            query.updated_at = datetime.datetime.utcnow()
+
+        self._write(apply)
+
+    def purge_expired(self, query_ttl_seconds: float, place_ttl_seconds: float) -> int:
+        """
+        Delete searches older than `query_ttl_seconds` and places not
+        refreshed for `place_ttl_seconds` in any field group.  Returns the
+        number of rows deleted.
+        """
+        now = datetime.datetime.utcnow()
+        query_cutoff = now - datetime.timedelta(seconds=query_ttl_seconds)
+        place_cutoff = now - datetime.timedelta(seconds=place_ttl_seconds)
+        with self._session() as session:
+            deleted = session.query(PlaceQuery).filter(PlaceQuery.updated_at < query_cutoff).delete()
+            stale = [
+                (getattr(CatalogPlace, f"{group}_updated_at") < place_cutoff)
+                | (getattr(CatalogPlace, f"{group}_updated_at").is_(None))
+                for group in self.GROUPS
+            ]
+            deleted += session.query(CatalogPlace).filter(*stale).delete(synchronize_session=False)
+            session.commit()
+            return deleted
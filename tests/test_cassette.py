@@ -0,0 +1,91 @@
+import json
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+
+from exception.handling import CassetteMiss
+from utils.cassette import CassetteChatModel, use_cassette
+from utils.fake_llm import FakeChatModel
+from utils.http_client import UpstreamClient
+
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class OfflineChatModel(FakeChatModel):
+    """Fails if a replay ever reaches the model."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise AssertionError("replay called the LLM")
+
+
+def _client(handler) -> UpstreamClient:
+    client = UpstreamClient("openweathermap", max_retries=0)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _weather(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"name": request.url.params["q"], "temp": 11.0})
+
+
+def _offline(request: httpx.Request) -> httpx.Response:
+    raise AssertionError(f"replay reached the network: {request.url}")
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A cassette holding one weather request and one LLM answer."""
+    path = str(tmp_path / "cassette.json")
+    with use_cassette(path, "record"):
+        response = _client(_weather).get(WEATHER_URL, {"q": "Paris", "appid": "secret-key"})
+        message = CassetteChatModel(llm=FakeChatModel(latency_seconds=0)).invoke([HumanMessage(content="Paris")])
+    return path, response.json(), message.content
+
+
+def test_record_then_replay_offline(recording):
+    path, weather, answer = recording
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert len(data["http"]) == 1 and len(data["llm"]) == 1
+    assert "secret-key" not in json.dumps(data)
+
+    with use_cassette(path, "replay", replay_latency=0):
+        response = _client(_offline).get(WEATHER_URL, {"q": "Paris", "appid": "other-key"})
+        message = CassetteChatModel(llm=OfflineChatModel()).invoke([HumanMessage(content="Paris")])
+    assert response.json() == weather
+    assert message.content == answer
+
+
+def test_replay_records_errors(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    with use_cassette(path, "record"):
+        with pytest.raises(httpx.HTTPStatusError):
+            _client(lambda request: httpx.Response(404, json={"cod": "404"})).get(WEATHER_URL, {"q": "Atlantis"})
+
+    with use_cassette(path, "replay", replay_latency=0):
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            _client(_offline).get(WEATHER_URL, {"q": "Atlantis"})
+    assert error.value.response.status_code == 404
+
+
+def test_strict_replay_misses_unrecorded_calls(recording):
+    path, _, _ = recording
+    with use_cassette(path, "replay", replay_latency=0, strict=True):
+        with pytest.raises(CassetteMiss):
+            _client(_offline).get(WEATHER_URL, {"q": "Rome"})
+        with pytest.raises(CassetteMiss):
+            CassetteChatModel(llm=OfflineChatModel()).invoke([HumanMessage(content="Rome")])
+
+        # Each recording plays once; a repeat of the same call is a miss too
+        _client(_offline).get(WEATHER_URL, {"q": "Paris"})
+        with pytest.raises(CassetteMiss):
+            _client(_offline).get(WEATHER_URL, {"q": "Paris"})
+
+
+def test_lenient_replay_falls_back_to_the_same_endpoint(recording):
+    path, weather, _ = recording
+    with use_cassette(path, "replay", replay_latency=0):
+        assert _client(_offline).get(WEATHER_URL, {"q": "Rome"}).json() == weather
+        with pytest.raises(CassetteMiss):
+            _client(_offline).get(WEATHER_URL, {"q": "Rome"})
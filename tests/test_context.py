@@ -0,0 +1,38 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agents.context import ContextCompactor
+
+NOT_FOUND = "Google Places answered NOT_FOUND for this place_id."
+
+
+def _details_turn(call_id: str, content: dict) -> list:
+    call = {"name": "get_place_details", "args": {"place_id": call_id}, "id": call_id}
+    return [
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content=json.dumps(content), name="get_place_details", tool_call_id=call_id),
+    ]
+
+
+def test_latest_batch_keeps_the_error_of_a_failed_call():
+    messages = [HumanMessage(content="Tell me about this place"), *_details_turn("a", {"error": NOT_FOUND})]
+    compacted, _, _ = ContextCompactor().compact(messages)
+    assert json.loads(compacted[-1].content) == {"error": NOT_FOUND}
+
+
+def test_older_batches_summarise_the_error_of_a_failed_call():
+    messages = [
+        HumanMessage(content="Tell me about these places"),
+        *_details_turn("a", {"error": NOT_FOUND}),
+        *_details_turn("b", {"name": "Louvre", "rating": 4.7, "latitude": 48.86, "longitude": 2.34}),
+    ]
+    compacted, _, _ = ContextCompactor().compact(messages)
+    assert compacted[2].content == f"unavailable: {NOT_FOUND}"
+    assert json.loads(compacted[-1].content)["name"] == "Louvre"
+
+
+def test_fields_the_model_does_not_use_are_dropped():
+    messages = [HumanMessage(content="Details"), *_details_turn("a", {"name": "Louvre", "photo_refs": ["x"]})]
+    compacted, _, _ = ContextCompactor().compact(messages)
+    assert json.loads(compacted[-1].content) == {"name": "Louvre"}
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from exception.handling import RateLimitExceeded
+from utils.fake_llm import FakeChatModel, FakeRateLimitError
+from utils.llm_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    LLMScheduler,
+    ScheduledChatModel,
+    TokenBucket,
+    llm_priority,
+)
+
+
+class FlakyChatModel(FakeChatModel):
+    """Fails its first calls with `errors`, then answers like FakeChatModel."""
+
+    errors: list = []
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def _scheduled(llm, **scheduler_kwargs) -> ScheduledChatModel:
+    scheduler_kwargs.setdefault("backoff_base_seconds", 0.01)
+    return ScheduledChatModel(llm=llm, scheduler=LLMScheduler(**scheduler_kwargs))
+
+
+def test_token_bucket_waits_for_refill_past_its_limit():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0
+
+
+def test_requests_past_the_rpm_limit_queue_until_their_deadline():
+    scheduler = LLMScheduler(requests_per_minute=2, max_wait_seconds=0.2)
+    scheduler.acquire(10)
+    scheduler.acquire(10)
+
+    start = time.monotonic()
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire(10)  # the next slot is 30 s away
+    assert 0.15 <= time.monotonic() - start < 1.0
+
+
+def test_429_is_retried_after_the_advertised_delay():
+    llm = FlakyChatModel(latency_seconds=0, errors=[FakeRateLimitError(retry_after=0.3)])
+    model = _scheduled(llm)
+
+    start = time.monotonic()
+    answer = model.invoke([HumanMessage(content="Paris")])
+    assert "Paris" in answer.content
+    assert time.monotonic() - start >= 0.3
+
+
+def test_429_gives_up_after_max_retries():
+    errors = [FakeRateLimitError(retry_after=0) for _ in range(3)]
+    model = _scheduled(FlakyChatModel(latency_seconds=0, errors=errors), max_retries=2)
+    with pytest.raises(RateLimitExceeded):
+        model.invoke([HumanMessage(content="Paris")])
+
+
+def test_transient_errors_are_retried_but_others_are_not():
+    llm = FlakyChatModel(latency_seconds=0, errors=[ServerError("503"), ConnectionError("reset")])
+    assert "Rome" in _scheduled(llm).invoke([HumanMessage(content="Rome")]).content
+
+    llm = FlakyChatModel(latency_seconds=0, errors=[ValueError("bad request")])
+    with pytest.raises(ValueError):
+        _scheduled(llm).invoke([HumanMessage(content="Rome")])
+
+
+def test_high_priority_is_admitted_before_low_priority():
+    async def run() -> list[str]:
+        scheduler = LLMScheduler(backoff_base_seconds=0.01)
+        scheduler.retry_delay(FakeRateLimitError(retry_after=0.2), 0)  # pause the queue
+        admitted = []
+
+        async def call(name: str) -> None:
+            await scheduler.aacquire(10)
+            admitted.append(name)
+
+        with llm_priority(PRIORITY_BACKGROUND):
+            low = asyncio.create_task(call("background"))
+        await asyncio.sleep(0.02)  # the background call queues first
+        with llm_priority(PRIORITY_INTERACTIVE):
+            high = asyncio.create_task(call("interactive"))
+        await asyncio.gather(low, high)
+        return admitted
+
+    assert asyncio.run(run()) == ["interactive", "background"]
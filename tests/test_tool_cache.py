@@ -0,0 +1,42 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.tool_cache import ToolResultCache
+
+
+def test_overlapping_sync_calls_run_once():
+    cache = ToolResultCache()
+    calls = []
+
+    def fetch():
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        return {"city": "Paris"}
+
+    with ThreadPoolExecutor(8) as pool:
+        outputs = list(pool.map(lambda _: cache.run("get_current_weather", {"city": "Paris"}, fetch), range(8)))
+    assert len(calls) == 1
+    assert outputs == [{"city": "Paris"}] * 8
+
+
+def test_failed_sync_call_reaches_waiters_and_is_not_kept():
+    cache = ToolResultCache()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ConnectionError("upstream down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(cache.run, "convert_currency", {"amount": 1}, fail)
+        started.wait()
+        waiter = pool.submit(cache.run, "convert_currency", {"amount": 1}, lambda: "unused")
+        for future in (leader, waiter):
+            with pytest.raises(ConnectionError):
+                future.result()
+
+    assert cache.run("convert_currency", {"amount": 1}, lambda: 1.08) == 1.08
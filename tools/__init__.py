@@ -0,0 +1,38 @@
+"""
+Tool registry.
+
+Tools are listed by name and their modules are imported on first use, so
+importing this package (or `agents.agentic_workflow`) loads no tool module
+and creates no API client.
+"""
+
+from importlib import import_module
+
+# tool name → "module:attribute"; the order is the order the LLM sees them in
+TOOL_REGISTRY: dict[str, str] = {
+    "get_current_weather": "tools.weather_information:get_current_weather",
+    "get_weather_forecast": "tools.weather_information:get_weather_forecast",
+    "get_weather_bundle": "tools.weather_information:get_weather_bundle",
+    "convert_currency": "tools.currency_conversion:convert_currency",
+    "convert_many": "tools.currency_conversion:convert_many",
+    "calculate": "tools.calculator_tool:calculate",
+    "calculate_percentage": "tools.calculator_tool:calculate_percentage",
+    "calculate_total_with_tax": "tools.calculator_tool:calculate_total_with_tax",
+    "compute_budget": "tools.budget_planner:compute_budget",
+    "search_places": "tools.place_search:search_places",
+    "find_nearby_places": "tools.place_search:find_nearby_places",
+    "get_place_details": "tools.place_search:get_place_details",
+    "get_places_details": "tools.place_search:get_places_details",
+    "optimize_itinerary": "tools.itinerary_planner:optimize_itinerary",
+}
+
+
+def load_tool(name: str):
+    """Import and return the tool registered as `name`."""
+    module_name, attribute = TOOL_REGISTRY[name].split(":")
+    return getattr(import_module(module_name), attribute)
+
+
+def load_tools(names=None) -> list:
+    """Return the tools for `names` (default: every registered tool)."""
+    return [load_tool(name) for name in (names or TOOL_REGISTRY)]
@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from tools.calculator_tool import _get_calculator
+from tools.currency_conversion import _get_converter
+from utils.budget import BudgetEngine
+
+
+@lru_cache(maxsize=None)
+def _get_budget_engine() -> BudgetEngine:
+    """Create the shared BudgetEngine on first use (same rate table as convert_currency)."""
+    return BudgetEngine(_get_calculator(), _get_converter())
+
+
+class BudgetItem(BaseModel):
+    description: str = Field(description="What the cost is (e.g. 'Hotel Le Marais').")
+    category: str = Field(default="other", description="e.g. lodging, food, transport, activities.")
+    quantity: float | str = Field(
+        default=1.0, description="Number or expression over days, nights, travellers (e.g. 'nights')."
+    )
+    unit_price: float | str = Field(description="Price per unit, or an expression (e.g. '12.5 * 2').")
+    currency: str = Field(description="ISO-4217 currency of unit_price (e.g. 'EUR').")
+    tax_pct: float = Field(default=0, description="Tax percentage on the subtotal.")
+    tip_pct: float = Field(default=0, description="Tip or service percentage on the subtotal.")
+    per_day: bool = Field(default=False, description="True if this cost repeats every day of the trip.")
+    day: int | None = Field(default=None, description="Trip day (1-based) a one-time cost falls on, if any.")
+
+
+def _as_dicts(items: list) -> list[dict]:
+    return [i.model_dump() if isinstance(i, BaseModel) else dict(i) for i in items]
+
+
+def _compute_budget(
+    items: list[BudgetItem], days: int, target_currency: str, travellers: int = 1
+) -> dict:
+    """
+    Price a whole trip budget in one call — use this instead of chaining
+    calculate / calculate_percentage / convert_currency calls.
+
+    Args:
+        items:           Line items, each with quantity, unit_price, currency,
+                         tax_pct, tip_pct, per_day (and optionally day).
+        days:            Trip length in days.
+        target_currency: ISO-4217 code for every total (e.g. 'USD').
+        travellers:      Number of travellers, usable in item expressions.
+
+    Returns:
+        Dict with per-item amounts, per_day totals, per_category totals,
+        one_off_total and total in target_currency, plus `errors` for items
+        that could not be priced.
+    """
+    return _get_budget_engine().compute(_as_dicts(items), days, target_currency, travellers)
+
+
+async def _acompute_budget(
+    items: list[BudgetItem], days: int, target_currency: str, travellers: int = 1
+) -> dict:
+    return await _get_budget_engine().acompute(_as_dicts(items), days, target_currency, travellers)
+
+
+compute_budget = StructuredTool.from_function(
+    func=_compute_budget,
+    coroutine=_acompute_budget,
+    name="compute_budget",
+)
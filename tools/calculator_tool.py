@@ -1,8 +1,14 @@
+from functools import lru_cache
+
 from langchain_core.tools import tool
 
 from utils.calculator import Calculator
 
-_calc = Calculator()
+
+@lru_cache(maxsize=None)
+def _get_calculator() -> Calculator:
+    """Create the shared Calculator on first use."""
+    return Calculator()
 
 
 @tool
@@ -19,11 +25,12 @@ def calculate(operation: str, a: float, b: float) -> float:
         Result of the arithmetic operation as a float.
     """
     operation = operation.lower().strip()
+    calc = _get_calculator()
     ops = {
-        "add": _calc.add,
-        "subtract": _calc.subtract,
-        "multiply": _calc.multiply,
-        "divide": _calc.divide,
+        "add": calc.add,
+        "subtract": calc.subtract,
+        "multiply": calc.multiply,
+        "divide": calc.divide,
     }
     if operation not in ops:
         raise ValueError(
@@ -45,7 +52,7 @@ def calculate_percentage(value: float, pct: float) -> float:
     Returns:
         The percentage portion as a float.
     """
-    return _calc.percentage(value, pct)
+    return _get_calculator().percentage(value, pct)
 
 
 @tool
@@ -60,4 +67,4 @@ def calculate_total_with_tax(value: float, tax_pct: float) -> float:
     Returns:
         The total amount including tax.
     """
-    return _calc.total_with_tax(value, tax_pct)
\ No newline at end of file
+    return _get_calculator().total_with_tax(value, tax_pct)
\ No newline at end of file
@@ -1,12 +1,18 @@
-from langchain_core.tools import tool
+from functools import lru_cache
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
 
 from utils.currency_converter import CurrencyConverter
 
-_converter = CurrencyConverter()
+
+@lru_cache(maxsize=None)
+def _get_converter() -> CurrencyConverter:
+    """Create the shared CurrencyConverter on first use."""
+    return CurrencyConverter()
 
 
-@tool
-def convert_currency(amount: float, from_currency: str, to_currency: str) -> float:
+def _convert_currency(amount: float, from_currency: str, to_currency: str) -> float:
     """
     Convert an amount of money from one currency to another.
 
@@ -18,4 +24,51 @@ def convert_currency(amount: float, from_currency: str, to_currency: str) -> flo
     Returns:
         The converted amount as a float.
     """
-    return _converter.convert(amount, from_currency, to_currency)
\ No newline at end of file
+    return _get_converter().convert(amount, from_currency, to_currency)
+
+
+async def _aconvert_currency(amount: float, from_currency: str, to_currency: str) -> float:
+    return await _get_converter().aconvert(amount, from_currency, to_currency)
+
+
+class CurrencyAmount(BaseModel):
+    amount: float = Field(description="The monetary value to convert.")
+    from_currency: str = Field(description="ISO-4217 source currency code (e.g. 'USD').")
+    to_currency: str = Field(description="ISO-4217 target currency code (e.g. 'EUR').")
+
+
+def _as_dicts(conversions: list) -> list[dict]:
+    return [c.model_dump() if isinstance(c, BaseModel) else dict(c) for c in conversions]
+
+
+def _convert_many(conversions: list[CurrencyAmount]) -> list:
+    """
+    Convert several amounts in one call — use this for budget breakdowns
+    instead of one convert_currency call per line item.
+
+    Args:
+        conversions: Items with amount, from_currency and to_currency.
+
+    Returns:
+        The items in the same order, each with `converted` added, or with
+        `error` if that conversion failed.
+    """
+    return _get_converter().convert_many(_as_dicts(conversions))
+
+
+async def _aconvert_many(conversions: list[CurrencyAmount]) -> list:
+    return await _get_converter().aconvert_many(_as_dicts(conversions))
+
+
+# `invoke` runs the blocking conversion, `ainvoke` awaits the coroutine.
+convert_currency = StructuredTool.from_function(
+    func=_convert_currency,
+    coroutine=_aconvert_currency,
+    name="convert_currency",
+)
+
+convert_many = StructuredTool.from_function(
+    func=_convert_many,
+    coroutine=_aconvert_many,
+    name="convert_many",
+)
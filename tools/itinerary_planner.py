@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from utils.route_optimizer import RouteOptimizer
+
+
+@lru_cache(maxsize=None)
+def _get_optimizer() -> RouteOptimizer:
+    """Create the shared RouteOptimizer on first use."""
+    return RouteOptimizer()
+
+
+class ItineraryPlace(BaseModel):
+    name: str = Field(description="Place name.")
+    latitude: float | None = Field(default=None, description="Latitude from search_places.")
+    longitude: float | None = Field(default=None, description="Longitude from search_places.")
+    place_id: str = Field(default="", description="Google place_id, if known.")
+
+
+class StartPoint(BaseModel):
+    latitude: float = Field(description="Latitude of the hotel or starting point.")
+    longitude: float = Field(description="Longitude of the hotel or starting point.")
+    name: str = Field(default="Start", description="Label for the starting point.")
+
+
+def _as_dict(item) -> dict:
+    return item.model_dump() if isinstance(item, BaseModel) else dict(item)
+
+
+def _optimize_itinerary(
+    places: list[ItineraryPlace], days: int, start_point: StartPoint | None = None
+) -> dict:
+    """
+    Split places into days and order each day into a short route — use this
+    instead of working out distances yourself.
+
+    Args:
+        places:      Places to visit, with the latitude/longitude returned by
+                     search_places.
+        days:        Number of days of the trip.
+        start_point: Optional hotel or starting point; each day then starts
+                     and ends there.
+
+    Returns:
+        {"days": [...], "unplaced": [...]}. Each day lists its stops in
+        visiting order and its legs with distance_km, mode (walk or transit)
+        and estimated minutes, plus total_km and total_minutes. "unplaced"
+        names places that had no coordinates.
+    """
+    return _get_optimizer().optimize(
+        [_as_dict(p) for p in places], days, _as_dict(start_point) if start_point else None
+    )
+
+
+# CPU-bound and quick: `ainvoke` runs it in the default executor.
+optimize_itinerary = StructuredTool.from_function(
+    func=_optimize_itinerary,
+    name="optimize_itinerary",
+)
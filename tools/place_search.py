@@ -1,17 +1,19 @@
 from __future__ import annotations
 
-from langchain_core.tools import tool
+from functools import lru_cache
+
+from langchain_core.tools import StructuredTool
 
 from utils.place_info import PlaceInfo
 
 
+@lru_cache(maxsize=None)
 def _get_place_info() -> PlaceInfo:
-    """Lazily create the PlaceInfo singleton."""
+    """Create the shared PlaceInfo on first use."""
     return PlaceInfo()
 
 
-@tool
-def search_places(query: str, location: str = "") -> list:
+def _search_places(query: str, location: str = "") -> list:
     """
     Search for places, attractions, hotels, or restaurants relevant to a trip.
 
@@ -27,8 +29,39 @@ def search_places(query: str, location: str = "") -> list:
     return _get_place_info().search(query, location)
 
 
-@tool
-def get_place_details(place_id: str) -> dict:
+async def _asearch_places(query: str, location: str = "") -> list:
+    return await _get_place_info().asearch(query, location)
+
+
+def _find_nearby_places(
+    lat: float, lng: float, radius_km: float = 1.0, types: list[str] | None = None
+) -> list:
+    """
+    Find places near a point, e.g. restaurants within 1 km of a landmark
+    whose coordinates came from search_places.
+
+    Args:
+        lat:       Latitude of the centre point.
+        lng:       Longitude of the centre point.
+        radius_km: Search radius in kilometres.
+        types:     Google place types to keep (e.g. ['restaurant', 'cafe']);
+                   any type if omitted.
+
+    Returns:
+        Places nearest first, each with name, address, rating,
+        user_ratings_total, latitude, longitude, types, place_id and
+        distance_km.
+    """
+    return _get_place_info().find_nearby(lat, lng, radius_km, types)
+
+
+async def _afind_nearby_places(
+    lat: float, lng: float, radius_km: float = 1.0, types: list[str] | None = None
+) -> list:
+    return await _get_place_info().afind_nearby(lat, lng, radius_km, types)
+
+
+def _place_details(place_id: str) -> dict:
     """
     Get detailed information about a specific place including its top review.
 
@@ -37,6 +70,61 @@ def get_place_details(place_id: str) -> dict:
 
     Returns:
         Dict with name, rating, user_ratings_total, latitude, longitude,
-        and top_review text.
+        and top_review text, or an "error" message if the place could not
+        be fetched.
+    """
+    return _get_place_info().get_place_details(place_id)
+
+
+async def _aplace_details(place_id: str) -> dict:
+    return await _get_place_info().aget_place_details(place_id)
+
+
+def _places_details(place_ids: list[str], fields: list[str] | None = None) -> dict:
+    """
+    Get details for several places in one call — prefer this over calling
+    get_place_details once per place.
+
+    Args:
+        place_ids: Google Places place_ids returned by search_places.
+        fields:    Fields to return, any of: name, address, types, latitude,
+                   longitude, rating, user_ratings_total, top_review.
+                   Defaults to name, rating, user_ratings_total, latitude,
+                   longitude and top_review.
+
+    Returns:
+        Dict keyed by place_id. Each value holds the requested fields, or
+        an "error" message if that place could not be fetched.
     """
-    return _get_place_info().get_place_details(place_id)
\ No newline at end of file
+    return _get_place_info().get_places_details(place_ids, fields)
+
+
+async def _aplaces_details(place_ids: list[str], fields: list[str] | None = None) -> dict:
+    return await _get_place_info().aget_places_details(place_ids, fields)
+
+
+# Each tool carries a sync and an async implementation: `invoke` runs the
+# blocking one, `ainvoke` (used by the async graph) awaits the coroutine.
+search_places = StructuredTool.from_function(
+    func=_search_places,
+    coroutine=_asearch_places,
+    name="search_places",
+)
+
+find_nearby_places = StructuredTool.from_function(
+    func=_find_nearby_places,
+    coroutine=_afind_nearby_places,
+    name="find_nearby_places",
+)
+
+get_place_details = StructuredTool.from_function(
+    func=_place_details,
+    coroutine=_aplace_details,
+    name="get_place_details",
+)
+
+get_places_details = StructuredTool.from_function(
+    func=_places_details,
+    coroutine=_aplaces_details,
+    name="get_places_details",
+)
@@ -1,17 +1,19 @@
 from __future__ import annotations
 
-from langchain_core.tools import tool
+from functools import lru_cache
+
+from langchain_core.tools import StructuredTool
 
 from utils.weather_info import WeatherInfo
 
 
+@lru_cache(maxsize=None)
 def _get_weather() -> WeatherInfo:
-    """Lazily create the WeatherInfo singleton (avoids EnvironmentError on import)."""
+    """Create the shared WeatherInfo on first use (avoids EnvironmentError on import)."""
     return WeatherInfo()
 
 
-@tool
-def get_current_weather(city: str) -> dict:
+def _current_weather(city: str) -> dict:
     """
     Get the current weather conditions for a city.
 
@@ -24,8 +26,11 @@ def get_current_weather(city: str) -> dict:
     return _get_weather().get_current_weather(city)
 
 
-@tool
-def get_weather_forecast(city: str, days: int = 5) -> list:
+async def _acurrent_weather(city: str) -> dict:
+    return await _get_weather().aget_current_weather(city)
+
+
+def _weather_forecast(city: str, days: int = 5) -> list:
     """
     Get a multi-day weather forecast for a city.
 
@@ -37,3 +42,49 @@ def get_weather_forecast(city: str, days: int = 5) -> list:
         List of daily forecast entries with avg/min/max temperature in °C.
     """
     return _get_weather().get_forecast_weather(city, days)
+
+
+async def _aweather_forecast(city: str, days: int = 5) -> list:
+    return await _get_weather().aget_forecast_weather(city, days)
+
+
+def _weather_bundle(cities: list[str], days: int = 5) -> dict:
+    """
+    Get current conditions and a daily forecast for one or more cities in a
+    single call — prefer this over separate current/forecast calls, and list
+    every city of a multi-city trip at once.
+
+    Args:
+        cities: City names (e.g. ['Rome', 'Florence', 'Venice']).
+        days:   Number of forecast days (1–5).
+
+    Returns:
+        {city: {"current": {...}, "forecast": [daily entries]}}; a city that
+        could not be fetched maps to {"error": "..."}.
+    """
+    return _get_weather().get_weather_bundle(cities, days)
+
+
+async def _aweather_bundle(cities: list[str], days: int = 5) -> dict:
+    return await _get_weather().aget_weather_bundle(cities, days)
+
+
+# Each tool carries a sync and an async implementation: `invoke` runs the
+# blocking one, `ainvoke` (used by the async graph) awaits the coroutine.
+get_current_weather = StructuredTool.from_function(
+    func=_current_weather,
+    coroutine=_acurrent_weather,
+    name="get_current_weather",
+)
+
+get_weather_forecast = StructuredTool.from_function(
+    func=_weather_forecast,
+    coroutine=_aweather_forecast,
+    name="get_weather_forecast",
+)
+
+get_weather_bundle = StructuredTool.from_function(
+    func=_weather_bundle,
+    coroutine=_aweather_bundle,
+    name="get_weather_bundle",
+)
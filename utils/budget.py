@@ -0,0 +1,145 @@
+import asyncio
+from collections import defaultdict
+
+from utils.calculator import Calculator
+from utils.currency_converter import CurrencyConverter
+
+
+class BudgetEngine:
+    """
+    Prices a whole trip budget in one pass.
+
+    Each line item is costed in its own currency (quantity × unit price,
+    plus tax and tip, both charged on the pre-tax subtotal), then every
+    item is converted to the target currency with one `convert_many` call
+    against a single rate table.  Quantities and unit prices may be
+    arithmetic expressions over `days`, `nights` and `travellers`,
+    evaluated by `Calculator.evaluate`.
+
+    Items are spread over the trip as follows:
+        - per_day items cost their amount on every day,
+        - items with a `day` are charged to that day,
+        - everything else is a one-off (flights, passes, …).
+    """
+
+    DEFAULT_CATEGORY = "other"
+
+    def __init__(self, calculator: Calculator, converter: CurrencyConverter) -> None:
+        self.calculator = calculator
+        self.converter = converter
+
+    def compute(self, items: list[dict], days: int, target_currency: str, travellers: int = 1) -> dict:
+        """
+        Compute a budget.
+
+        Args:
+            items:           Dicts with description, category, quantity,
+                             unit_price, currency, tax_pct, tip_pct, per_day
+                             and optionally day (1-based).
+            days:            Trip length in days.
+            target_currency: ISO-4217 code every total is reported in.
+            travellers:      Value of `travellers` in item expressions.
+
+        Returns:
+            {currency, days, items, per_day, per_category, one_off_total,
+             total, errors} — amounts in `target_currency`; items that could
+            not be priced are listed in `errors` and left out of the totals.
+        """
+        priced, errors = self._price_items(items, days, travellers)
+        conversions = self.converter.convert_many(self._conversions(priced, target_currency))
+        return self._summarise(priced, conversions, errors, days, target_currency)
+
+    async def acompute(self, items: list[dict], days: int, target_currency: str, travellers: int = 1) -> dict:
+        """Async variant of `compute`; expressions are evaluated off the event loop."""
+        priced, errors = await asyncio.to_thread(self._price_items, items, days, travellers)
+        conversions = await self.converter.aconvert_many(self._conversions(priced, target_currency))
+        return self._summarise(priced, conversions, errors, days, target_currency)
+
+    # ── Helpers ───────────────────────────────────────────────────────────
+
+    def _price_items(self, items: list[dict], days: int, travellers: int) -> tuple[list[dict], list[dict]]:
+        """Cost each item in its own currency; returns (priced items, errors)."""
+        if days < 1:
+            raise ValueError("days must be at least 1.")
+        variables = {"days": days, "nights": max(days - 1, 0), "travellers": travellers}
+        calc = self.calculator
+        priced, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                day = item.get("day")
+                if day is not None and not 1 <= int(day) <= days:
+                    raise ValueError(f"day {day} is outside the trip (1–{days}).")
+                subtotal = calc.multiply(
+                    calc.evaluate(item.get("quantity", 1), variables),
+                    calc.evaluate(item["unit_price"], variables),
+                )
+                extras = calc.add(
+                    calc.percentage(subtotal, item.get("tax_pct") or 0),
+                    calc.percentage(subtotal, item.get("tip_pct") or 0),
+                )
+                priced.append(
+                    {
+                        "index": index,
+                        "description": item.get("description", ""),
+                        "category": (item.get("category") or self.DEFAULT_CATEGORY).strip().lower(),
+                        "currency": str(item["currency"]).upper().strip(),
+                        "per_day": bool(item.get("per_day")),
+                        "day": int(day) if day is not None else None,
+                        "amount": calc.add(subtotal, extras),
+                    }
+                )
+            except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                errors.append({"index": index, "description": item.get("description", ""), "error": str(e)})
+        return priced, errors
+
+    @staticmethod
+    def _conversions(priced: list[dict], target_currency: str) -> list[dict]:
+        return [
+            {"amount": p["amount"], "from_currency": p["currency"], "to_currency": target_currency}
+            for p in priced
+        ]
+
+    def _summarise(
+        self, priced: list[dict], conversions: list[dict], errors: list[dict], days: int, target_currency: str
+    ) -> dict:
+        per_day = [0.0] * days
+        per_category: dict[str, float] = defaultdict(float)
+        one_off = 0.0
+        items = []
+        for item, conversion in zip(priced, conversions):
+            if "error" in conversion:
+                errors.append({"index": item["index"], "description": item["description"], "error": conversion["error"]})
+                continue
+            amount = conversion["converted"]
+            if item["per_day"]:
+                trip_amount = amount * days
+                per_day = [total + amount for total in per_day]
+            elif item["day"] is not None:
+                trip_amount = amount
+                per_day[item["day"] - 1] += amount
+            else:
+                trip_amount = amount
+                one_off += amount
+            per_category[item["category"]] += trip_amount
+            items.append(
+                {
+                    "description": item["description"],
+                    "category": item["category"],
+                    "amount": round(amount, 2),
+                    "original_amount": item["amount"],
+                    "original_currency": item["currency"],
+                    "per_day": item["per_day"],
+                    "trip_amount": round(trip_amount, 2),
+                }
+            )
+        errors.sort(key=lambda e: e["index"])
+        return {
+            "currency": target_currency.upper().strip(),
+            "days": days,
+            "items": items,
+            "per_day": [{"day": day, "total": round(total, 2)} for day, total in enumerate(per_day, start=1)],
+            "per_category": {category: round(total, 2) for category, total in sorted(per_category.items())},
+            "one_off_total": round(one_off, 2),
+            "total": round(sum(per_day) + one_off, 2),
+            "errors": errors,
+        }
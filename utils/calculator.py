@@ -1,3 +1,8 @@
+import ast
+import math
+import operator
+
+
 class Calculator:
     """
     Provides basic arithmetic operations for travel budget and cost calculations.
@@ -5,6 +10,20 @@ class Calculator:
     errors when the LLM passes integer-like strings or int values.
     """
 
+    # Operators `evaluate` accepts; anything else in an expression is rejected
+    BINARY_OPERATORS = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+    }
+    UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+    MAX_EXPRESSION_LENGTH = 200
+    MAX_EXPONENT = 12
+
     def add(self, a: float, b: float) -> float:
         """Return a + b."""
         a, b = float(a), float(b)
@@ -49,4 +68,55 @@ class Calculator:
     def total_with_tax(self, value: float, tax_pct: float) -> float:
         """Return value with tax applied: value + percentage(value, tax_pct)."""
         value, tax_pct = float(value), float(tax_pct)
-        return round(value + self.percentage(value, tax_pct), 4)
\ No newline at end of file
+        return round(value + self.percentage(value, tax_pct), 4)
+
+    def evaluate(self, expression, variables: dict | None = None) -> float:
+        """
+        Safely evaluate an arithmetic expression such as "3 * 45.5 + 20".
+
+        Only numbers, + - * / // % **, parentheses and the names in
+        `variables` are allowed — no calls, attributes or other Python.
+        Everything is evaluated in floats, so nested powers overflow
+        instead of growing into huge exact integers.
+
+        Raises:
+            ValueError: If the expression is empty, too long, not plain
+                        arithmetic, or its value is out of range.
+            ZeroDivisionError: If it divides by zero.
+        """
+        if isinstance(expression, (int, float)):
+            return float(expression)
+        expression = str(expression).strip()
+        if not expression or len(expression) > self.MAX_EXPRESSION_LENGTH:
+            raise ValueError(f"Invalid expression '{expression[:40]}'.")
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{expression}'.") from e
+        return round(float(self._eval_node(tree.body, variables or {})), 4)
+
+    def _eval_node(self, node: ast.AST, variables: dict) -> float:
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return float(node.value)
+        if isinstance(node, ast.Name) and node.id in variables:
+            return float(variables[node.id])
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self.UNARY_OPERATORS:
+            return self.UNARY_OPERATORS[type(node.op)](self._eval_node(node.operand, variables))
+        if isinstance(node, ast.BinOp) and type(node.op) in self.BINARY_OPERATORS:
+            left = self._eval_node(node.left, variables)
+            right = self._eval_node(node.right, variables)
+            if isinstance(node.op, ast.Pow) and abs(right) > self.MAX_EXPONENT:
+                raise ValueError(f"Exponent {right} is too large.")
+            if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)) and right == 0:
+                raise ZeroDivisionError("Division by zero is not allowed.")
+            try:
+                result = self.BINARY_OPERATORS[type(node.op)](left, right)
+            except OverflowError as e:
+                raise ValueError("Expression result is out of range.") from e
+            # A negative base to a fractional power gives a complex number
+            if isinstance(result, complex) or not math.isfinite(result):
+                raise ValueError("Expression result is out of range.")
+            return result
+        if isinstance(node, ast.Name):
+            raise ValueError(f"Unknown name '{node.id}'; allowed: {sorted(variables)}.")
+        raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}.")
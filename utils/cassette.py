@@ -0,0 +1,433 @@
+"""
+cassette.py — Record and replay upstream HTTP and LLM calls.
+
+In ``record`` mode every upstream exchange of a real run is captured:
+    * HTTP: each `UpstreamClient.get`/`aget` (status, body, elapsed time;
+      API keys are dropped from the stored parameters),
+    * LLM: each chat-model call made through `CassetteChatModel` (the
+      resulting message and elapsed time).
+In ``replay`` mode the same calls are answered from the cassette file
+without touching the network, after the recorded latency (or a fixed
+injected one, see `replay_latency`).
+
+Matching is by request: upstream + URL + parameters for HTTP; model, bound
+tool names and the message contents for the LLM.  Repeated identical
+requests replay their recordings in order.  A request the cassette does not
+know falls back to the next unplayed recording of its kind — for HTTP, of
+the same endpoint — (counted under `cassette.fallbacks`), so runs whose
+prompts differ slightly, e.g. a date in the system prompt, still replay;
+with nothing left, `CassetteMiss` is raised.  A ``strict`` cassette never
+falls back: any request it has no exact recording for is a miss.
+
+Select a cassette with the `cassette` section of config.yaml (or the
+`CASSETTE_MODE` / `CASSETTE_PATH` environment variables), or for a test or
+benchmark with ``with use_cassette(path, "replay"): ...``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from exception.handling import CassetteMiss
+from utils.config_loader import load_config
+from utils.metrics import metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SECRET_PARAMS = frozenset({"key", "appid", "api_key"})
+# The backends refuse to start without these; a replay never sends them
+REPLAY_PLACEHOLDER_ENV = ("GROQ_API_KEY", "OPENWEATHERMAP_API_KEY", "GOOGLE_PLACES_API_KEY")
+KEPT_HEADERS = ("content-type", "retry-after")
+
+_active: Cassette | None = None
+_configured = False
+_active_lock = threading.Lock()
+
+
+class Cassette:
+    """One cassette file, in ``record`` or ``replay`` mode."""
+
+    def __init__(
+        self, path: str, mode: str, replay_latency: float | str = "recorded", strict: bool = False
+    ) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'; use 'record' or 'replay'.")
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = {"http": [], "llm": []}
+        self._played: set[tuple[str, int]] = set()
+        self._by_key: dict[tuple[str, str], list[int]] = defaultdict(list)
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ── HTTP ──────────────────────────────────────────────────────────────
+
+    def http(self, upstream: str, url: str, params: dict | None, send: Callable[[], httpx.Response]) -> httpx.Response:
+        """Replay the exchange, or perform it with `send` and record it."""
+        key = self._http_key(upstream, url, params)
+        if self.replaying:
+            entry = self._lookup("http", key, lambda e: (e["upstream"], e["url"]) == (upstream, url))
+            time.sleep(self._delay(entry))
+            return self._http_response(entry, url, params)
+        start = time.perf_counter()
+        try:
+            response = send()
+        except httpx.HTTPStatusError as e:
+            self._record_http(key, upstream, url, params, start, response=e.response)
+            raise
+        except httpx.TransportError as e:
+            self._record_http(key, upstream, url, params, start, error=e)
+            raise
+        self._record_http(key, upstream, url, params, start, response=response)
+        return response
+
+    async def ahttp(
+        self, upstream: str, url: str, params: dict | None, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Async variant of `http`."""
+        key = self._http_key(upstream, url, params)
+        if self.replaying:
+            entry = self._lookup("http", key, lambda e: (e["upstream"], e["url"]) == (upstream, url))
+            await asyncio.sleep(self._delay(entry))
+            return self._http_response(entry, url, params)
+        start = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.HTTPStatusError as e:
+            self._record_http(key, upstream, url, params, start, response=e.response)
+            raise
+        except httpx.TransportError as e:
+            self._record_http(key, upstream, url, params, start, error=e)
+            raise
+        self._record_http(key, upstream, url, params, start, response=response)
+        return response
+
+    @staticmethod
+    def _public_params(params: dict | None) -> dict:
+        return {k: str(v) for k, v in sorted((params or {}).items()) if k not in SECRET_PARAMS}
+
+    def _http_key(self, upstream: str, url: str, params: dict | None) -> str:
+        return _digest([upstream, url, self._public_params(params)])
+
+    def _record_http(self, key, upstream, url, params, start, response=None, error=None) -> None:
+        entry = {
+            "upstream": upstream,
+            "url": url,
+            "params": self._public_params(params),
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+        if response is not None:
+            entry["status"] = response.status_code
+            entry["headers"] = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+            entry["body"] = response.text
+        else:
+            entry["error"] = type(error).__name__
+            entry["message"] = str(error)
+        self._append("http", key, entry)
+
+    @staticmethod
+    def _http_response(entry: dict, url: str, params: dict | None) -> httpx.Response:
+        request = httpx.Request("GET", url, params=params)
+        if "error" in entry:
+            error_type = getattr(httpx, entry["error"], httpx.TransportError)
+            raise error_type(entry["message"], request=request)
+        response = httpx.Response(
+            entry["status"], headers=entry["headers"], content=entry["body"].encode(), request=request
+        )
+        response.raise_for_status()
+        return response
+
+    # ── LLM ───────────────────────────────────────────────────────────────
+
+    def llm(self, key: str, call: Callable[[], AIMessage]) -> AIMessage:
+        """Replay the model's answer, or get it from `call` and record it."""
+        if self.replaying:
+            entry = self._lookup("llm", key)
+            time.sleep(self._delay(entry))
+            return _load_message(entry["message"])
+        start = time.perf_counter()
+        message = call()
+        self._append("llm", key, {"message": message_to_dict(message), "elapsed": round(time.perf_counter() - start, 4)})
+        return message
+
+    async def allm(self, key: str, call: Callable[[], Awaitable[AIMessage]]) -> AIMessage:
+        """Async variant of `llm`."""
+        if self.replaying:
+            entry = self._lookup("llm", key)
+            await asyncio.sleep(self._delay(entry))
+            return _load_message(entry["message"])
+        start = time.perf_counter()
+        message = await call()
+        self._append("llm", key, {"message": message_to_dict(message), "elapsed": round(time.perf_counter() - start, 4)})
+        return message
+
+    # ── Storage ───────────────────────────────────────────────────────────
+
+    def _append(self, kind: str, key: str, entry: dict) -> None:
+        with self._lock:
+            self._entries[kind].append({"key": key, **entry})
+        metrics.incr(f"cassette.{kind}.recorded")
+
+    def _lookup(self, kind: str, key: str, similar: Callable[[dict], bool] = lambda entry: True) -> dict:
+        """The next recording for `key`, else (unless strict) the next unplayed `similar` one of `kind`."""
+        with self._lock:
+            index = next((i for i in self._by_key[(kind, key)] if (kind, i) not in self._played), None)
+            if index is None and self.strict:
+                raise CassetteMiss(f"No recorded {kind} exchange matches this call in {self.path}.")
+            if index is None:
+                index = next(
+                    (
+                        i for i, entry in enumerate(self._entries[kind])
+                        if (kind, i) not in self._played and similar(entry)
+                    ),
+                    None,
+                )
+                if index is None:
+                    raise CassetteMiss(f"No recorded {kind} exchange left for this call in {self.path}.")
+                metrics.incr("cassette.fallbacks")
+            self._played.add((kind, index))
+            entry = self._entries[kind][index]
+        metrics.incr(f"cassette.{kind}.replayed")
+        return entry
+
+    def _delay(self, entry: dict) -> float:
+        if self.replay_latency == "recorded":
+            return entry["elapsed"]
+        return float(self.replay_latency)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CassetteMiss(f"Cannot read cassette {self.path}: {e}") from e
+        self._entries = {"http": data.get("http", []), "llm": data.get("llm", [])}
+        for kind, entries in self._entries.items():
+            for index, entry in enumerate(entries):
+                self._by_key[(kind, entry["key"])].append(index)
+
+    def rewind(self) -> None:
+        """Make every recording playable again (one cassette, several replays)."""
+        with self._lock:
+            self._played.clear()
+
+    def save(self) -> None:
+        """Write the recordings atomically (record mode only)."""
+        if self.replaying:
+            return
+        with self._lock:
+            data = {"version": 1, **self._entries}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        print(f"Cassette saved to {self.path} ({len(data['http'])} HTTP, {len(data['llm'])} LLM exchanges).")
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    Chat model that records or replays every call of `llm` through the
+    active cassette (and calls `llm` directly when there is none).
+
+    Streaming is recorded as the merged message and replayed as one chunk.
+    """
+
+    llm: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.llm._identifying_params
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the wrapped model format the tools, then bind them to the wrapper
+        return self.bind(**self.llm.bind_tools(tools, **kwargs).kwargs)
+
+    def _key(self, messages: list, kwargs: dict) -> str:
+        tools = [t.get("function", t).get("name") for t in kwargs.get("tools", []) if isinstance(t, dict)]
+        return _digest([
+            getattr(self.llm, "model_name", self._llm_type),
+            tools,
+            str(kwargs.get("tool_choice", "")),
+            [_message_signature(m) for m in messages],
+        ])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cassette = active()
+        if cassette is None:
+            return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        def call() -> AIMessage:
+            return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs).generations[0].message
+
+        return _result(cassette.llm(self._key(messages, kwargs), call))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cassette = active()
+        if cassette is None:
+            return await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        async def call() -> AIMessage:
+            result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return result.generations[0].message
+
+        return _result(await cassette.allm(self._key(messages, kwargs), call))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        cassette = active()
+        if cassette is None:
+            yield from self.llm._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        # Record the stream as one message; its pieces reach the caller on replay only
+        message = cassette.llm(self._key(messages, kwargs), lambda: _merge_chunks(
+            self.llm._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        ))
+        yield _as_chunk(message)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        cassette = active()
+        if cassette is None:
+            async for chunk in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        async def call() -> AIMessage:
+            chunks = [c async for c in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs)]
+            return _merge_chunks(chunks)
+
+        yield _as_chunk(await cassette.allm(self._key(messages, kwargs), call))
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _digest(parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def _message_signature(message) -> list:
+    """What identifies a prompt message — not its ids or provider metadata."""
+    tool_calls = [(c["name"], c["args"]) for c in getattr(message, "tool_calls", None) or []]
+    return [message.type, message.content, tool_calls, getattr(message, "name", None)]
+
+
+def _load_message(data: dict) -> AIMessage:
+    return messages_from_dict([data])[0]
+
+
+def _result(message: AIMessage) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _merge_chunks(chunks) -> AIMessage:
+    merged = None
+    for chunk in chunks:
+        merged = chunk.message if merged is None else merged + chunk.message
+    if merged is None:
+        return AIMessage(content="")
+    return AIMessage(
+        content=merged.content,
+        additional_kwargs=merged.additional_kwargs,
+        response_metadata=merged.response_metadata,
+        tool_calls=merged.tool_calls,
+        usage_metadata=merged.usage_metadata,
+        id=merged.id,
+    )
+
+
+def _as_chunk(message: AIMessage) -> ChatGenerationChunk:
+    return ChatGenerationChunk(
+        message=AIMessageChunk(
+            content=message.content,
+            additional_kwargs=message.additional_kwargs,
+            response_metadata=message.response_metadata,
+            tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+            id=message.id,
+        )
+    )
+
+
+# ── Active cassette ───────────────────────────────────────────────────────────
+
+def active() -> Cassette | None:
+    """The cassette in use: one set by `use_cassette`, else the configured one."""
+    global _active, _configured
+    if not _configured:
+        with _active_lock:
+            if not _configured:
+                cassette_config = load_config()["cassette"]
+                mode = os.getenv("CASSETTE_MODE", cassette_config["mode"])
+                if mode != "off":
+                    _active = _start(
+                        Cassette(
+                            os.getenv("CASSETTE_PATH", cassette_config["path"]),
+                            mode,
+                            cassette_config["replay_latency"],
+                            cassette_config["strict"],
+                        )
+                    )
+                _configured = True
+    return _active
+
+
+def _start(cassette: Cassette) -> Cassette:
+    if cassette.replaying:
+        for name in REPLAY_PLACEHOLDER_ENV:
+            os.environ.setdefault(name, "cassette-replay")
+    print(f"Cassette {cassette.mode}: {cassette.path}")
+    return cassette
+
+
+@contextmanager
+def use_cassette(
+    path: str, mode: str = "replay", replay_latency: float | str = "recorded", strict: bool = False
+) -> Iterator[Cassette]:
+    """
+    Record or replay every upstream call in the block; a recording is saved
+    on exit.  Enter it before the graph is built: LLM clients are wrapped
+    for the cassette when `ModelLoader` first creates them.
+    """
+    global _active, _configured
+    cassette = _start(Cassette(path, mode, replay_latency, strict))
+    with _active_lock:
+        previous = (_active, _configured)
+        _active, _configured = cassette, True
+    try:
+        yield cassette
+    finally:
+        with _active_lock:
+            _active, _configured = previous
+        cassette.save()
+
+
+def save_active() -> None:
+    """Save the configured cassette, if recording (called at shutdown)."""
+    if _active is not None:
+        _active.save()
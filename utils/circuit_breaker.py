@@ -0,0 +1,154 @@
+"""
+circuit_breaker.py — Per-upstream circuit breaker and adaptive timeout.
+
+`CircuitBreaker` stops calling an upstream after `failure_threshold`
+consecutive failures.  While open, calls fail immediately; after
+`open_seconds` it turns half-open and lets `half_open_probes` calls
+through — a success closes it, a failure opens it again.
+
+`LatencyTracker` keeps a window of recent call durations and derives the
+timeout for the next call from their p95, so a healthy upstream that
+answers in 200 ms is not waited on for 10 s when it stalls.  It also
+keeps a fixed-bucket histogram for the admin endpoint.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe closed → open → half-open state machine for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (a half-open breaker admits a few probes)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+                self._opened_at, self._probes = now, 0
+            elif self._state == HALF_OPEN and now - self._opened_at >= self.open_seconds:
+                self._opened_at, self._probes = now, 0  # the probes never reported back
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+        metrics.incr(f"breaker.{self.name}.rejected")
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 otherwise)."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def snapshot(self) -> dict:
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_after_seconds": round(retry_after, 1),
+            }
+
+    def _transition(self, state: str) -> None:
+        """Caller holds the lock."""
+        print(f"Circuit breaker for {self.name}: {self._state} → {state}")
+        metrics.incr(f"breaker.{self.name}.{state}")
+        self._state = state
+
+
+class LatencyTracker:
+    """Recent call durations of one upstream, and the timeout they suggest."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds, upper bounds
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        window: int = 200,
+        min_samples: int = 20,
+        p95_multiplier: float = 3.0,
+        min_seconds: float = 1.0,
+    ) -> None:
+        self.enabled = enabled
+        self.min_samples = min_samples
+        self.p95_multiplier = p95_multiplier
+        self.min_seconds = min_seconds
+        self._samples: deque[float] = deque(maxlen=window)
+        self._histogram = [0] * (len(self.BUCKETS) + 1)
+        self._p95: float | None = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._histogram[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            if len(self._samples) >= self.min_samples:
+                ordered = sorted(self._samples)
+                self._p95 = ordered[int(0.95 * (len(ordered) - 1))]
+
+    def timeout(self, ceiling: float) -> float:
+        """Timeout for the next call: p95 × multiplier, within [min_seconds, ceiling]."""
+        p95 = self._p95
+        if not self.enabled or p95 is None:
+            return ceiling
+        return min(ceiling, max(self.min_seconds, p95 * self.p95_multiplier))
+
+    def snapshot(self, ceiling: float) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            histogram = dict(zip([f"le_{b}" for b in self.BUCKETS] + ["inf"], self._histogram))
+
+        def percentile(q: float) -> float | None:
+            return round(ordered[int(q * (len(ordered) - 1))], 4) if ordered else None
+
+        return {
+            "samples": len(ordered),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "timeout_seconds": round(self.timeout(ceiling), 3),
+            "histogram": histogram,
+        }
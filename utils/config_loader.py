@@ -1,11 +1,18 @@
 import os
+from functools import lru_cache
+
 import yaml
 
 
+@lru_cache(maxsize=None)
 def load_config(config_path: str = None) -> dict:
     """
     Load and return the YAML configuration file.
 
+    The file is parsed once per path and the same dict is returned to every
+    caller in the process — treat it as read-only.  Call
+    `load_config.cache_clear()` to pick up edits without a restart.
+
     Args:
         config_path: Absolute or relative path to the config YAML file.
                      Defaults to <project_root>/config/config.yaml.
@@ -1,16 +1,47 @@
-import requests
+import datetime
+import json
+import os
+import threading
+import time
+
+from utils.config_loader import load_config
+from utils.http_client import get_client
+from utils.metrics import metrics
+from utils.single_flight import SingleFlight
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class CurrencyConverter:
     """
     Converts currency amounts using the free Frankfurter API.
-    No API key required.
+    No API key required.  `aconvert` is the coroutine variant used by the
+    async /query path; both use the pooled "frankfurter" client
+    (`utils.http_client`).
+
+    Instead of one request per conversion, the full rate table for
+    `BASE_CURRENCY` is fetched once per ECB publication (working days,
+    mid-afternoon CET) and every pair is computed locally as a cross rate.
+    The table is saved to `tools.currency.rates_path`, so a restart needs no
+    request and an unreachable upstream falls back to the last table.
     """
 
     BASE_URL = "https://api.frankfurter.app/latest"
+    BASE_CURRENCY = "EUR"
+    PUBLICATION_HOUR_UTC = 16  # ECB reference rates appear ~16:00 CET; this hour is safe in summer and winter
 
     def __init__(self) -> None:
-        pass
+        self.http = get_client("frankfurter")
+
+        currency_config = load_config()["tools"]["currency"]
+        self.rates_path = os.path.join(PROJECT_ROOT, currency_config["rates_path"])
+        self.retry_after_failure_seconds = currency_config["retry_after_failure_seconds"]
+        self._table: dict | None = self._load_table()
+        self._next_attempt = 0.0  # after a failed refresh, when to try again
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    # ── Conversion ────────────────────────────────────────────────────────
 
     def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
         """
@@ -25,35 +56,162 @@ class CurrencyConverter:
             The converted amount as a float.
 
         Raises:
-            ValueError: If the API returns an unexpected response.
-            requests.HTTPError: On network / API errors.
+            ValueError: If either currency is not in the rate table.
+            httpx.HTTPError: If no table was ever fetched and the API fails.
         """
-        from_currency = from_currency.upper().strip()
-        to_currency = to_currency.upper().strip()
+        from_currency, to_currency = self._normalise(from_currency, to_currency)
+        if from_currency == to_currency:
+            return round(amount, 4)
+        return self._cross(self._rates(), amount, from_currency, to_currency)
 
+    async def aconvert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """Async variant of `convert`."""
+        from_currency, to_currency = self._normalise(from_currency, to_currency)
         if from_currency == to_currency:
             return round(amount, 4)
+        return self._cross(await self._arates(), amount, from_currency, to_currency)
 
-        params = {
-            "amount": amount,
-            "from": from_currency,
-            "to": to_currency,
-        }
-        response = requests.get(self.BASE_URL, params=params, timeout=10)
-        response.raise_for_status()
+    def convert_many(self, conversions: list[dict]) -> list[dict]:
+        """
+        Convert several amounts with one rate table.
 
-        data = response.json()
-        if "rates" not in data or to_currency not in data["rates"]:
-            raise ValueError(
-                f"Could not retrieve exchange rate for {from_currency} → {to_currency}."
-            )
+        Args:
+            conversions: Dicts with amount, from_currency and to_currency.
 
-        return round(data["rates"][to_currency], 4)
+        Returns:
+            The input dicts, each with `converted` added — or `error` for a
+            conversion that failed (e.g. an unknown currency code).
+        """
+        return self._convert_all(self._rates(), conversions)
+
+    async def aconvert_many(self, conversions: list[dict]) -> list[dict]:
+        """Async variant of `convert_many`."""
+        return self._convert_all(await self._arates(), conversions)
 
     def get_supported_currencies(self) -> list[str]:
         """
         Return a list of currency codes supported by the Frankfurter API.
         """
-        response = requests.get("https://api.frankfurter.app/currencies", timeout=10)
-        response.raise_for_status()
-        return list(response.json().keys())
\ No newline at end of file
+        return sorted(self._rates())
+
+    # ── Rate table ────────────────────────────────────────────────────────
+
+    def _rates(self) -> dict[str, float]:
+        """Rates per 1 unit of `BASE_CURRENCY`, refreshed when a newer publication is due."""
+        if self._needs_refresh():
+            with self._lock:
+                if self._needs_refresh():
+                    try:
+                        response = self.http.get(self.BASE_URL, params=self._params())
+                    except Exception as e:
+                        self._refresh_failed(e)
+                    else:
+                        self._store(response)
+        return self._current_rates()
+
+    async def _arates(self) -> dict[str, float]:
+        """Async variant of `_rates`; concurrent callers share one refresh."""
+        if self._needs_refresh():
+            await self._flight.do("rates", self._arefresh)
+        return self._current_rates()
+
+    async def _arefresh(self) -> None:
+        if not self._needs_refresh():
+            return
+        try:
+            response = await self.http.aget(self.BASE_URL, params=self._params())
+        except Exception as e:
+            self._refresh_failed(e)
+            return
+        self._store(response)
+
+    def _refresh_failed(self, error: Exception) -> None:
+        """Keep serving the last table (if any) and back off before the next attempt."""
+        metrics.incr("currency.refresh_failures")
+        self._next_attempt = time.time() + self.retry_after_failure_seconds
+        if self._table is None:
+            raise error
+        print(f"Exchange-rate refresh failed ({error!r}); using rates of {self._table['date']}.")
+
+    def _store(self, response) -> None:
+        data = response.json()
+        rates = {code: float(rate) for code, rate in data["rates"].items()}
+        rates[data["base"]] = 1.0
+        self._table = {"base": data["base"], "date": data["date"], "rates": rates, "fetched_at": time.time()}
+        self._next_attempt = 0.0
+        metrics.incr("currency.refreshes")
+        self._save_table()
+
+    def _current_rates(self) -> dict[str, float]:
+        if self._table is None:
+            raise ValueError("No exchange-rate table is available.")
+        return self._table["rates"]
+
+    def _needs_refresh(self) -> bool:
+        now = time.time()
+        if now < self._next_attempt:
+            return False
+        return self._table is None or now >= self._next_publication(self._table["fetched_at"])
+
+    @classmethod
+    def _next_publication(cls, fetched_at: float) -> float:
+        """Timestamp of the first working-day publication after `fetched_at`."""
+        moment = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+        publication = moment.replace(hour=cls.PUBLICATION_HOUR_UTC, minute=0, second=0, microsecond=0)
+        if publication <= moment:
+            publication += datetime.timedelta(days=1)
+        while publication.weekday() >= 5:  # no publication on weekends
+            publication += datetime.timedelta(days=1)
+        return publication.timestamp()
+
+    def _params(self) -> dict:
+        return {"from": self.BASE_CURRENCY}
+
+    def _load_table(self) -> dict | None:
+        try:
+            with open(self.rates_path, encoding="utf-8") as f:
+                table = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return table if table.get("base") == self.BASE_CURRENCY else None
+
+    def _save_table(self) -> None:
+        """Write the table atomically, so a crash never leaves a truncated file."""
+        try:
+            os.makedirs(os.path.dirname(self.rates_path), exist_ok=True)
+            tmp_path = f"{self.rates_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._table, f)
+            os.replace(tmp_path, self.rates_path)
+        except OSError as e:
+            print(f"Could not save exchange rates to {self.rates_path}: {e}")
+
+    # ── Helpers ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _normalise(from_currency: str, to_currency: str) -> tuple[str, str]:
+        return from_currency.upper().strip(), to_currency.upper().strip()
+
+    @staticmethod
+    def _cross(rates: dict[str, float], amount: float, from_currency: str, to_currency: str) -> float:
+        if from_currency == to_currency:
+            return round(amount, 4)
+        if from_currency not in rates or to_currency not in rates:
+            raise ValueError(
+                f"Could not retrieve exchange rate for {from_currency} → {to_currency}."
+            )
+        return round(amount * rates[to_currency] / rates[from_currency], 4)
+
+    def _convert_all(self, rates: dict[str, float], conversions: list[dict]) -> list[dict]:
+        results = []
+        for conversion in conversions:
+            result = dict(conversion)
+            try:
+                from_currency, to_currency = self._normalise(
+                    conversion["from_currency"], conversion["to_currency"]
+                )
+                result["converted"] = self._cross(rates, float(conversion["amount"]), from_currency, to_currency)
+            except (KeyError, TypeError, ValueError) as e:
+                result["error"] = str(e)
+            results.append(result)
+        return results
@@ -0,0 +1,62 @@
+"""
+deadline.py — Per-request time budget shared by every call a request makes.
+
+`request_deadline(seconds)` opens a budget for the code inside it.  Because
+the deadline lives in a ContextVar it reaches graph nodes, tool coroutines
+and worker threads started by the request without being passed around:
+HTTP helpers shorten their timeouts with `cap()`, the LLM scheduler stops
+queueing at the deadline, and the graph switches to its final synthesis
+step once `expired()`.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from exception.handling import DeadlineExceeded
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float | None) -> Iterator[None]:
+    """Run the block with a deadline `seconds` from now (None: no deadline)."""
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current() -> float | None:
+    """The active deadline as a `time.monotonic()` timestamp, if any."""
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left before the deadline (negative once passed), or None."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def cap(timeout: float) -> float:
+    """
+    Return `timeout` shortened to the time left in the request.
+
+    Raises DeadlineExceeded if the deadline has already passed, so callers
+    fail fast instead of starting a request that cannot finish in time.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("The request's time budget is used up.")
+    return min(timeout, left)
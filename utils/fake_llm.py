@@ -0,0 +1,122 @@
+"""
+fake_llm.py — Offline chat model for load tests and local development.
+
+Select it with `ModelLoader(model_provider="fake")` (or `LLM_PROVIDER=fake`
+for the API).  It answers every question with a short canned plan after
+`latency_seconds`, streams that answer word by word, reports token usage,
+and can simulate a provider rate limit by raising 429 errors that carry a
+Retry-After header — enough to exercise the scheduler without the network.
+It never requests tools.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from utils.tokens import estimate_messages_tokens, estimate_tokens
+
+
+class FakeRateLimitError(Exception):
+    """Shaped like the provider SDK's 429 error (status_code + response headers)."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limit reached, retry after {retry_after:.1f}s")
+        self.response = SimpleNamespace(headers={"retry-after": f"{retry_after:.3f}"})
+
+
+class FakeChatModel(BaseChatModel):
+    """Canned-answer chat model with simulated latency and rate limiting."""
+
+    model_name: str = "fake-planner"
+    latency_seconds: float = 0.2
+    simulated_requests_per_minute: int = 0  # 0 disables the simulated limit
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: deque = PrivateAttr(default_factory=deque)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**kwargs)
+
+    def _check_rate_limit(self) -> None:
+        if not self.simulated_requests_per_minute:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.simulated_requests_per_minute:
+                raise FakeRateLimitError(60 - (now - self._calls[0]))
+            self._calls.append(now)
+
+    def _answer(self, messages: list) -> AIMessage:
+        question = next(
+            (str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), ""
+        )
+        content = (
+            f"## Travel plan\n\nHere is a suggested plan for: {question}\n\n"
+            "- Day 1: Arrive, check in and explore the old town.\n"
+            "- Day 2: Visit the main sights and try the local food.\n"
+            "- Day 3: Day trip, then an evening walk before departure."
+        )
+        input_tokens = estimate_messages_tokens(messages)
+        output_tokens = estimate_tokens(content)
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=word if last else word + " ",
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._check_rate_limit()
+        time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._answer(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._check_rate_limit()
+        await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._answer(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self._check_rate_limit()
+        time.sleep(self.latency_seconds)
+        for chunk in self._chunks(self._answer(messages)):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        self._check_rate_limit()
+        await asyncio.sleep(self.latency_seconds)
+        for chunk in self._chunks(self._answer(messages)):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,312 @@
+"""
+http_client.py — Pooled, retrying HTTP clients for the upstream APIs.
+
+One `UpstreamClient` per upstream (OpenWeatherMap, Google Places,
+Frankfurter) is shared by the whole process, so calls reuse keep-alive
+connections instead of paying a TCP and TLS handshake each time:
+
+    * Connection pooling with a per-upstream connection limit (each
+      upstream is a single host, so the limit is per host).
+    * 429 and 5xx responses, and connection failures, are retried with
+      jittered exponential backoff; Retry-After is honoured.
+    * `get` (blocking, thread-safe) and `aget` (coroutine) share settings.
+    * Timeouts are configured per upstream under `http.upstreams`, adapt
+      to the upstream's observed p95 latency, and are always shortened to
+      what is left of the request deadline.
+    * A circuit breaker per upstream fails calls immediately with
+      `UpstreamUnavailable` after repeated failures, then probes half-open.
+      `upstream_status()` reports breakers and latency histograms.
+    * With an active cassette (`utils.cassette`) calls are recorded or
+      replayed instead of (or as well as) being sent.
+    * `describe_error` turns a failure into text safe to show the model:
+      request URLs carry API keys in their query string.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import threading
+import time
+import weakref
+
+import httpx
+
+from exception.handling import UpstreamUnavailable
+from utils import cassette as cassettes
+from utils import deadline
+from utils.circuit_breaker import CircuitBreaker, LatencyTracker
+from utils.config_loader import load_config
+from utils.metrics import metrics
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_SECRET_PARAM_RE = re.compile(
+    r"\b(" + "|".join(sorted(cassettes.SECRET_PARAMS)) + r")=[^&\s'\"]+", re.IGNORECASE
+)
+
+_clients: dict[str, UpstreamClient] = {}
+_clients_lock = threading.Lock()
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for one upstream API.
+
+    `get`/`aget` return the successful response or raise: an
+    `httpx.HTTPStatusError` for a non-2xx status that is not retried (or
+    still failing after the last retry), an `httpx.TransportError` for a
+    connection failure, `DeadlineExceeded` when the request's time budget
+    is used up, or `UpstreamUnavailable` while the circuit breaker is open.
+
+    Connection failures, timeouts, 429 and 5xx count as breaker failures;
+    other responses (including 4xx) show the upstream is up.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout_seconds: float = 10.0,
+        connect_timeout_seconds: float = 3.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry_seconds: float = 30.0,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 5.0,
+        warm_up_url: str | None = None,
+        circuit_breaker: dict | None = None,
+        adaptive_timeout: dict | None = None,
+    ) -> None:
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.warm_up_url = warm_up_url
+        self.breaker = CircuitBreaker(name, **(circuit_breaker or {}))
+        self.latency = LatencyTracker(**(adaptive_timeout or {}))
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_seconds,
+        )
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        # An AsyncClient is bound to the event loop it was first used on
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, name: str, http_config: dict) -> UpstreamClient:
+        defaults, overrides = http_config["defaults"], http_config["upstreams"].get(name, {})
+        settings = {**defaults, **overrides}
+        for section in ("circuit_breaker", "adaptive_timeout"):  # merged key by key
+            settings[section] = {**defaults.get(section, {}), **overrides.get(section, {})}
+        return cls(name=name, **settings)
+
+    # ── Requests ──────────────────────────────────────────────────────────
+
+    def get(self, url: str, params: dict | None = None) -> httpx.Response:
+        """GET `url`, retrying transient failures."""
+        cassette = cassettes.active()
+        if cassette is not None:
+            return cassette.http(self.name, url, params, lambda: self._get(url, params))
+        return self._get(url, params)
+
+    async def aget(self, url: str, params: dict | None = None) -> httpx.Response:
+        """Async variant of `get`."""
+        cassette = cassettes.active()
+        if cassette is not None:
+            return await cassette.ahttp(self.name, url, params, lambda: self._aget(url, params))
+        return await self._aget(url, params)
+
+    def _get(self, url: str, params: dict | None) -> httpx.Response:
+        client = self._sync_client()
+        for attempt in range(self.max_retries + 1):
+            timeout = self._timeout()
+            self._admit()
+            start = time.perf_counter()
+            try:
+                response = client.get(url, params=params, timeout=timeout)
+            except httpx.TransportError as e:
+                self._record(start, error=True, timed_out=isinstance(e, httpx.TimeoutException))
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self._record(start, error=response.status_code >= 400, status=response.status_code)
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+            metrics.incr(f"http.{self.name}.retries")
+            time.sleep(delay)
+
+    async def _aget(self, url: str, params: dict | None) -> httpx.Response:
+        client = self._async_client()
+        for attempt in range(self.max_retries + 1):
+            timeout = self._timeout()
+            self._admit()
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, params=params, timeout=timeout)
+            except httpx.TransportError as e:
+                self._record(start, error=True, timed_out=isinstance(e, httpx.TimeoutException))
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self._record(start, error=response.status_code >= 400, status=response.status_code)
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+            metrics.incr(f"http.{self.name}.retries")
+            await asyncio.sleep(delay)
+
+    async def awarm_up(self) -> None:
+        """Open a pooled connection to the upstream (any response will do)."""
+        cassette = cassettes.active()
+        if self.warm_up_url and not (cassette is not None and cassette.replaying):
+            await self._async_client().get(self.warm_up_url, timeout=self._timeout())
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the blocking client and the current event loop's async client."""
+        self.close()
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ── Helpers ───────────────────────────────────────────────────────────
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self._limits)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(limits=self._limits)
+        return client
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.name, self.breaker.retry_after())
+
+    def _timeout(self) -> httpx.Timeout:
+        """The adaptive timeout (at most the configured one), shortened to the time left in the request."""
+        timeout = deadline.cap(self.latency.timeout(self.timeout_seconds))
+        return httpx.Timeout(timeout, connect=min(self.connect_timeout_seconds, timeout))
+
+    def _retry_delay(self, attempt: int, outcome: httpx.Response | Exception) -> float | None:
+        """Seconds to wait before retrying `outcome`, or None to stop."""
+        if isinstance(outcome, httpx.Response) and outcome.status_code not in RETRY_STATUSES:
+            return None
+        if isinstance(outcome, httpx.TimeoutException) or attempt >= self.max_retries:
+            return None  # a timed-out call already used its share of the budget
+
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+        if isinstance(outcome, httpx.Response):
+            try:
+                delay = max(delay, float(outcome.headers.get("retry-after", 0)))
+            except ValueError:
+                pass  # an HTTP-date; keep the backoff
+        left = deadline.remaining()
+        if delay > self.backoff_max_seconds or (left is not None and delay >= left):
+            return None
+        return delay
+
+    def _record(self, start: float, error: bool, status: int | None = None, timed_out: bool = False) -> None:
+        elapsed = time.perf_counter() - start
+        metrics.incr(f"http.{self.name}.requests")
+        metrics.observe(f"http.{self.name}.seconds", elapsed)
+        if error:
+            metrics.incr(f"http.{self.name}.errors")
+        if status is not None or timed_out:
+            self.latency.record(elapsed)  # a timeout counts at its full length
+        if status is None or status in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def status(self) -> dict:
+        return {
+            "breaker": self.breaker.snapshot(),
+            "latency": self.latency.snapshot(self.timeout_seconds),
+        }
+
+
+def get_client(name: str) -> UpstreamClient:
+    """Return the process-wide client for upstream `name` (see `http.upstreams`)."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = UpstreamClient.from_config(name, load_config()["http"])
+        return client
+
+
+async def awarm_up_clients(timeout: float = 5.0) -> None:
+    """
+    Open a connection to every configured upstream before the first request.
+    Failures are only logged — a cold pool is slower, not broken.
+    """
+    start = time.perf_counter()
+    names = list(load_config()["http"]["upstreams"])
+    results = await asyncio.gather(
+        *(asyncio.wait_for(get_client(name).awarm_up(), timeout) for name in names),
+        return_exceptions=True,
+    )
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"HTTP warm-up for {name} failed: {result!r}")
+    metrics.observe("startup.http_warmup_seconds", time.perf_counter() - start)
+
+
+def upstream_status() -> dict:
+    """Breaker state and latency summary of every configured upstream."""
+    return {name: get_client(name).status() for name in load_config()["http"]["upstreams"]}
+
+
+async def aclose_clients() -> None:
+    """Close every pooled connection (called at shutdown)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
+
+
+def redact_secrets(text: str) -> str:
+    """Mask API-key query parameters (key, appid, api_key) in `text`."""
+    return _SECRET_PARAM_RE.sub(r"\1=***", text)
+
+
+def describe_error(error: Exception) -> str:
+    """
+    Describe a failed call without leaking credentials.
+
+    HTTP errors are reduced to the upstream host and status (their text
+    holds the full request URL); anything else is its repr, redacted.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"{type(error).__name__}: {error.request.url.host} returned HTTP {error.response.status_code}."
+    if isinstance(error, httpx.TransportError):
+        try:
+            host = error.request.url.host
+        except RuntimeError:  # raised without a request attached
+            host = "the upstream"
+        return f"{type(error).__name__}: could not reach {host}."
+    return redact_secrets(repr(error))
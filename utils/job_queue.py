@@ -0,0 +1,199 @@
+"""
+job_queue.py — Bounded pool of asyncio workers for background plan jobs.
+
+Jobs are persisted by `models.JobManager`; the pool only holds job ids.  At
+startup every queued or interrupted job is queued again, so a restart loses
+no work.  Progress reported by a running job is written back at most every
+`progress_interval_seconds`, and a job with a callback URL gets its final
+state POSTed there when it finishes — from a separate task, so a slow or
+dead callback host never holds a worker slot.  Callback URLs must be
+http(s) and may not point at loopback, private, link-local or other
+internal addresses (`check_callback_url`), or — when `allowed_hosts` is
+set — at any host outside that list.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import time
+import traceback
+from typing import Awaitable, Callable
+from urllib.parse import urlsplit
+
+import httpx
+
+from models import JobManager
+from utils.metrics import metrics
+
+# report(progress=..., partial_output=...) — called by a job while it runs
+ProgressReporter = Callable[..., Awaitable[None]]
+JobFunction = Callable[[dict, ProgressReporter], Awaitable[str]]
+
+
+async def check_callback_url(url: str, allowed_hosts: list[str] | tuple[str, ...] = ()) -> None:
+    """
+    Refuse callback URLs the server must not POST to.
+
+    With `allowed_hosts`, the host must be one of them (or a subdomain of
+    one) — an explicit operator choice, so it may be internal.  Without it,
+    every address the host resolves to must be public: no loopback,
+    private, link-local (cloud metadata), multicast or reserved ranges.
+
+    Raises:
+        ValueError: With the reason the URL is refused.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower().rstrip(".")
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("callback_url must be an http(s) URL with a host.")
+    if allowed_hosts:
+        if not any(host == h or host.endswith(f".{h}") for h in allowed_hosts):
+            raise ValueError(f"callback_url host '{host}' is not in jobs.callback_allowed_hosts.")
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, proto=6)
+    except OSError as e:
+        raise ValueError(f"callback_url host '{host}' does not resolve.") from e
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host '{host}' resolves to a non-public address.")
+
+
+class JobWorkerPool:
+    """
+    Runs `run(job, report)` for queued jobs with at most `workers` at a time.
+
+    `run` returns the final answer; an exception marks the job failed.
+    """
+
+    def __init__(
+        self,
+        manager: JobManager,
+        run: JobFunction,
+        workers: int = 2,
+        progress_interval_seconds: float = 1.0,
+        callback_timeout_seconds: float = 10.0,
+        callback_retries: int = 3,
+        callback_allowed_hosts: list[str] | tuple[str, ...] = (),
+    ) -> None:
+        self.manager = manager
+        self.run = run
+        self.workers = workers
+        self.progress_interval_seconds = progress_interval_seconds
+        self.callback_timeout_seconds = callback_timeout_seconds
+        self.callback_retries = callback_retries
+        self.callback_allowed_hosts = tuple(h.lower() for h in callback_allowed_hosts)
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._callbacks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Re-queue persisted jobs and start the workers."""
+        for job_id in await asyncio.to_thread(self.manager.requeue_unfinished):
+            self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers and pending callbacks.  Jobs they were running stay
+        `running` and resume at next start.
+        """
+        tasks = [*self._tasks, *self._callbacks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._callbacks.clear()
+
+    def submit(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+        metrics.observe("jobs.queue_depth", self._queue.qsize())
+
+    # ── Workers ───────────────────────────────────────────────────────────
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.manager.get_job, job_id)
+        if job is None or job["status"] != JobManager.QUEUED:
+            return
+
+        await asyncio.to_thread(self.manager.mark_running, job_id)
+        start = time.perf_counter()
+        try:
+            answer = await self.run(job, self._reporter(job_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            metrics.incr("jobs.failed")
+            await asyncio.to_thread(self.manager.mark_failed, job_id, str(e))
+        else:
+            metrics.incr("jobs.succeeded")
+            await asyncio.to_thread(self.manager.mark_succeeded, job_id, answer)
+        metrics.observe("jobs.seconds", time.perf_counter() - start)
+
+        if job["callback_url"]:
+            # Off the worker, so retries against a dead host don't delay queued jobs
+            task = asyncio.create_task(self._notify(job["callback_url"], job_id))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    def _reporter(self, job_id: str) -> ProgressReporter:
+        last_write = 0.0
+        pending: dict = {}
+
+        async def report(**fields) -> None:
+            nonlocal last_write
+            pending.update(fields)
+            now = time.monotonic()
+            if now - last_write < self.progress_interval_seconds:
+                return
+            last_write = now
+            update = dict(pending)
+            pending.clear()
+            await asyncio.to_thread(self.manager.update_job, job_id, **update)
+
+        return report
+
+    async def _notify(self, url: str, job_id: str) -> None:
+        """POST the finished job to its callback URL, retrying with backoff."""
+        try:
+            # Checked again at send time: the host's DNS may have changed since the job was queued
+            await check_callback_url(url, self.callback_allowed_hosts)
+        except ValueError as e:
+            metrics.incr("jobs.callbacks_refused")
+            print(f"Job {job_id}: callback refused: {e}")
+            return
+        job = await asyncio.to_thread(self.manager.get_job, job_id)
+        body = json.loads(json.dumps(job, default=str))
+        async with httpx.AsyncClient(timeout=self.callback_timeout_seconds) as client:
+            for attempt in range(self.callback_retries):
+                try:
+                    response = await client.post(url, json=body)
+                    response.raise_for_status()
+                    metrics.incr("jobs.callbacks")
+                    return
+                except httpx.HTTPError:
+                    if attempt < self.callback_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+        metrics.incr("jobs.callbacks_failed")
+        print(f"Job {job_id}: callback to {url} failed after {self.callback_retries} attempt(s).")
@@ -0,0 +1,424 @@
+"""
+llm_scheduler.py — Client-side rate limiting and scheduling for LLM calls.
+
+`ScheduledChatModel` wraps a chat model so every call first obtains a slot
+from an `LLMScheduler`:
+
+    * Requests-per-minute and tokens-per-minute token buckets mirror the
+      provider's limits, so bursts queue locally instead of earning 429s.
+    * Waiting calls are served in (priority, deadline) order; a call that
+      cannot start before its deadline — `max_wait_seconds`, or the request
+      deadline (`utils.deadline`) if sooner — fails with `RateLimitExceeded`.
+    * A 429 from the provider pauses the whole queue for the Retry-After
+      interval (or an exponential backoff) before the call is retried.
+    * Transient failures (5xx, connection errors, timeouts) are retried
+      with the same backoff, pausing only the failed call.  The provider
+      client's own retries are off (`max_retries=0`), so every retry is
+      scheduled here.
+
+Priority is taken from the calling context (`llm_priority`), so background
+work can yield to interactive requests without threading arguments
+through the graph.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from exception.handling import RateLimitExceeded
+from utils.deadline import current as current_deadline
+from utils.metrics import metrics
+from utils.tokens import estimate_messages_tokens, estimate_tokens
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_JOBS = 5
+PRIORITY_BACKGROUND = 10
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Schedule the LLM calls made inside this block at `priority` (lower runs first)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute; holds at most a minute's worth."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)  # an oversized call still gets through eventually
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    deadline: float
+    seq: int
+    tokens: int = field(compare=False)
+    wake: Callable[[], None] = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """True for server errors, dropped connections and timeouts worth retrying."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # SDK errors (groq/openai APIConnectionError, APITimeoutError, httpx.TransportError)
+    # are matched by name so the scheduler does not import every provider SDK
+    return any(
+        cls.__name__ in ("APIConnectionError", "APITimeoutError", "TransportError")
+        for cls in type(exc).__mro__
+    )
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Return the provider's Retry-After for a 429, 0 if absent, None if not a 429."""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LLMScheduler:
+    """
+    Thread-safe admission queue in front of one provider/model.
+
+    Sync callers (graph nodes run in worker threads) and async callers
+    share the same buckets and queue.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_queue_size: int = 100,
+        max_wait_seconds: float = 60.0,
+        max_retries: int = 4,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0,
+        expected_completion_tokens: int = 1024,
+    ) -> None:
+        self.rpm = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tpm = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue_size = max_queue_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.expected_completion_tokens = expected_completion_tokens
+
+        self._lock = threading.Lock()
+        self._queue: list[_Ticket] = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+
+    @classmethod
+    def from_config(cls, scheduler_config: dict, rate_limits: dict) -> "LLMScheduler":
+        return cls(
+            requests_per_minute=rate_limits.get("requests_per_minute", 0),
+            tokens_per_minute=rate_limits.get("tokens_per_minute", 0),
+            max_queue_size=scheduler_config["max_queue_size"],
+            max_wait_seconds=scheduler_config["max_wait_seconds"],
+            max_retries=scheduler_config["max_retries"],
+            backoff_base_seconds=scheduler_config["backoff_base_seconds"],
+            backoff_max_seconds=scheduler_config["backoff_max_seconds"],
+            expected_completion_tokens=scheduler_config["expected_completion_tokens"],
+        )
+
+    # ── Admission ─────────────────────────────────────────────────────────
+
+    def acquire(self, tokens: int) -> None:
+        """Block until a call costing `tokens` may start."""
+        event = threading.Event()
+        ticket = self._enqueue(tokens, event.set)
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._try_admit(ticket, now)
+                if delay <= 0:
+                    return
+                event.wait(min(delay, self._remaining(ticket, now)))
+                event.clear()
+        finally:
+            self._leave(ticket)
+
+    async def aacquire(self, tokens: int) -> None:
+        """Async counterpart of `acquire`."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = self._enqueue(tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._try_admit(ticket, now)
+                if delay <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), min(delay, self._remaining(ticket, now)))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        finally:
+            self._leave(ticket)
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Correct the TPM bucket once a call's real token usage is known."""
+        if self.tpm is None or not used:
+            return
+        with self._lock:
+            if used < reserved:
+                self.tpm.give_back(reserved - used)
+            else:
+                self.tpm.take(used - reserved)
+
+    def retry_delay(self, exc: Exception, attempt: int) -> float | None:
+        """
+        Handle a failed call; returns the seconds to wait before retrying.
+
+        Returns None if the call should not be retried (the caller re-raises
+        `exc`): it is neither a rate-limit nor a transient error, or a
+        transient error has used up `max_retries` or the request deadline.
+
+        A 429 pauses the whole queue for the Retry-After interval or an
+        exponential backoff — whichever is longer — and raises
+        `RateLimitExceeded` once `max_retries` is used up or the pause would
+        exceed `max_wait_seconds`.  A transient error only delays this call.
+        """
+        backoff = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt)
+        retry_after = _retry_after(exc)
+        if retry_after is None:
+            if not _is_transient(exc) or attempt >= self.max_retries:
+                return None
+            delay = backoff * random.uniform(0.8, 1.2)
+            deadline = current_deadline()
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                return None
+            metrics.incr("llm.transient_errors")
+            metrics.incr("llm.retries")
+            return delay
+
+        metrics.incr("llm.rate_limited")
+        delay = max(retry_after, backoff * random.uniform(0.8, 1.2))
+        if attempt >= self.max_retries or delay > self.max_wait_seconds:
+            raise RateLimitExceeded(
+                f"LLM provider is rate limiting requests (gave up after {attempt + 1} attempts).",
+                retry_after=delay,
+            ) from exc
+
+        metrics.incr("llm.retries")
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            if self._queue:
+                self._queue[0].wake()
+        return delay
+
+    # ── Queue internals ───────────────────────────────────────────────────
+
+    def _enqueue(self, tokens: int, wake: Callable[[], None]) -> _Ticket:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._queue) >= self.max_queue_size:
+                metrics.incr("llm.queue_rejected")
+                raise RateLimitExceeded(
+                    "Too many LLM requests are queued.", retry_after=self.max_wait_seconds
+                )
+            ticket = _Ticket(
+                priority=_priority.get(),
+                deadline=min(now + self.max_wait_seconds, current_deadline() or float("inf")),
+                seq=next(self._seq),
+                tokens=tokens,
+                wake=wake,
+                enqueued=now,
+            )
+            heapq.heappush(self._queue, ticket)
+            metrics.observe("llm.queue_depth", len(self._queue))
+            return ticket
+
+    def _try_admit(self, ticket: _Ticket, now: float) -> float:
+        """Admit `ticket` if it is first in line and the buckets allow; else return the wait."""
+        with self._lock:
+            if self._queue[0] is not ticket:
+                return float("inf")  # woken when it reaches the head
+            delay = max(
+                self._blocked_until - now,
+                self.rpm.wait_time(1, now) if self.rpm else 0.0,
+                self.tpm.wait_time(ticket.tokens, now) if self.tpm else 0.0,
+            )
+            if delay > 0:
+                return delay
+
+            if self.rpm:
+                self.rpm.take(1)
+            if self.tpm:
+                self.tpm.take(ticket.tokens)
+            heapq.heappop(self._queue)
+            if self._queue:
+                self._queue[0].wake()
+        metrics.observe("llm.queue_wait_seconds", now - ticket.enqueued)
+        return 0.0
+
+    def _remaining(self, ticket: _Ticket, now: float) -> float:
+        remaining = ticket.deadline - now
+        if remaining <= 0:
+            metrics.incr("llm.queue_timeouts")
+            raise RateLimitExceeded(
+                f"LLM request waited {now - ticket.enqueued:.0f}s for a rate-limit slot "
+                "without reaching the front of the queue before its deadline.",
+                retry_after=max(self._blocked_until - now, 1.0),
+            )
+        return remaining
+
+    def _leave(self, ticket: _Ticket) -> None:
+        """Drop a ticket that gave up (timeout, cancellation) without being admitted."""
+        with self._lock:
+            if ticket not in self._queue:
+                return
+            was_head = self._queue[0] is ticket
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            if was_head and self._queue:
+                self._queue[0].wake()
+
+
+def _usage(message: Any) -> int:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return int(usage.get("total_tokens", 0))
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Chat model that routes every call of `llm` through `scheduler`.
+
+    Tool binding, streaming and callbacks are delegated to the wrapped model,
+    so it is a drop-in replacement for the client `ModelLoader` returns.
+    """
+
+    llm: BaseChatModel
+    scheduler: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.llm._identifying_params
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the wrapped model format the tools, then bind them to the wrapper
+        return self.bind(**self.llm.bind_tools(tools, **kwargs).kwargs)
+
+    def _reserve(self, messages: list, kwargs: dict) -> int:
+        tokens = estimate_messages_tokens(messages) + self.scheduler.expected_completion_tokens
+        if kwargs.get("tools"):
+            tokens += estimate_tokens(json.dumps(kwargs["tools"], default=str))
+        return tokens
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        reserved = self._reserve(messages, kwargs)
+        for attempt in itertools.count():
+            self.scheduler.acquire(reserved)
+            try:
+                result = self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as exc:
+                delay = self.scheduler.retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.scheduler.settle(reserved, _usage(result.generations[0].message))
+            return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        reserved = self._reserve(messages, kwargs)
+        for attempt in itertools.count():
+            await self.scheduler.aacquire(reserved)
+            try:
+                result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as exc:
+                delay = self.scheduler.retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.scheduler.settle(reserved, _usage(result.generations[0].message))
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        reserved = self._reserve(messages, kwargs)
+        for attempt in itertools.count():
+            self.scheduler.acquire(reserved)
+            used, yielded = 0, False
+            try:
+                for chunk in self.llm._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    used += _usage(chunk.message)
+                    yielded = True
+                    yield chunk
+            except Exception as exc:
+                # Once output has reached the caller a retry would duplicate it
+                delay = None if yielded else self.scheduler.retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.scheduler.settle(reserved, used)
+            return
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        reserved = self._reserve(messages, kwargs)
+        for attempt in itertools.count():
+            await self.scheduler.aacquire(reserved)
+            used, yielded = 0, False
+            try:
+                async for chunk in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    used += _usage(chunk.message)
+                    yielded = True
+                    yield chunk
+            except Exception as exc:
+                delay = None if yielded else self.scheduler.retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.scheduler.settle(reserved, used)
+            return
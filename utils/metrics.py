@@ -0,0 +1,90 @@
+"""
+metrics.py — Process-wide, in-memory counters and timing summaries.
+
+Components record what they do (`metrics.incr`, `metrics.observe`) and the
+FastAPI `/metrics` endpoint returns `metrics.snapshot()`.
+
+`request_scope()` additionally collects per-request totals: inside the scope,
+`metrics.incr` also adds to a dict that the caller reads when the request ends.
+The scope lives in a ContextVar, so graph nodes running in tasks or worker
+threads spawned by the request report into it too.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+_request_stats: ContextVar[dict | None] = ContextVar("request_stats", default=None)
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and observations.
+
+    Observations keep count/sum/min/max plus a bounded window of recent
+    samples, from which p50 and p95 are reported.
+    """
+
+    WINDOW = 1024
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._observations: dict[str, dict] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Add `value` to counter `name` (and to the current request's totals)."""
+        stats = _request_stats.get()
+        with self._lock:
+            self._counters[name] += value
+            if stats is not None:
+                stats[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample (e.g. a duration in seconds) for `name`."""
+        with self._lock:
+            obs = self._observations.get(name)
+            if obs is None:
+                obs = self._observations[name] = {
+                    "count": 0, "sum": 0.0, "min": value, "max": value,
+                    "samples": deque(maxlen=self.WINDOW),
+                }
+            obs["count"] += 1
+            obs["sum"] += value
+            obs["min"] = min(obs["min"], value)
+            obs["max"] = max(obs["max"], value)
+            obs["samples"].append(value)
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serialisable copy of every counter and observation."""
+        with self._lock:
+            observations = {}
+            for name, obs in self._observations.items():
+                samples = sorted(obs["samples"])
+                observations[name] = {
+                    "count": obs["count"],
+                    "mean": round(obs["sum"] / obs["count"], 4),
+                    "min": round(obs["min"], 4),
+                    "max": round(obs["max"], 4),
+                    "p50": round(samples[int(0.50 * (len(samples) - 1))], 4),
+                    "p95": round(samples[int(0.95 * (len(samples) - 1))], 4),
+                }
+            return {"counters": dict(self._counters), "observations": observations}
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def request_scope() -> Iterator[dict]:
+    """Collect the counters incremented while handling one request."""
+    stats: dict[str, float] = defaultdict(float)
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
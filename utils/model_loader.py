@@ -1,14 +1,24 @@
+import asyncio
 import os
+import time
 from typing import Any, Literal, Optional
 
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from pydantic import BaseModel, Field
 
+from utils import cassette as cassettes
 from utils.config_loader import load_config
+from utils.fake_llm import FakeChatModel
+from utils.llm_scheduler import LLMScheduler, ScheduledChatModel
+from utils.metrics import metrics
 
 load_dotenv()
 
+# LLM clients are stateless and thread-safe, so one instance per
+# (provider, model) is shared by every ModelLoader in the process — which
+# also makes its scheduler see every call made to that model.
+_LLM_CLIENTS: dict[tuple[str, str], Any] = {}
+
 
 class ConfigLoader:
     """Thin wrapper around the YAML config dict."""
@@ -25,10 +35,10 @@ class ModelLoader(BaseModel):
     """
     Loads and returns a configured LLM instance.
 
-    Supports: 'groq'
+    Supports: 'groq', 'fake' (offline, see `utils.fake_llm`)
     """
 
-    model_provider: Literal["groq"] = "groq"
+    model_provider: Literal["groq", "fake"] = "groq"
     config: Optional[ConfigLoader] = Field(default=None, exclude=True)
 
     def model_post_init(self, context: Any) -> None:
@@ -37,15 +47,78 @@ class ModelLoader(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-    def load_llm(self):
-        """Load and return the LLM model configured for the chosen provider."""
-        print(f"Loading model from provider: {self.model_provider}")
-
+    def load_llm(self, route: str | None = None):
+        """
+        Return the LLM model configured for the chosen provider.
+
+        `route` selects an entry of `llm.<provider>.routes` (e.g. "tools",
+        "synthesis") whose settings override the provider defaults.
+
+        Clients are cached per (provider, model) so repeated loaders reuse
+        the same HTTP client instead of constructing a new one each time.
+        When `llm.scheduler.enabled` is set, the client is wrapped in a
+        `ScheduledChatModel` enforcing the provider's `rate_limits`; with an
+        active cassette, calls are recorded or replayed (`utils.cassette`).
+        """
+        print(f"Loading model from provider: {self.model_provider} (route: {route or 'default'})")
+
+        llm_config = self.config.get_item("llm")
+        provider_config = llm_config[self.model_provider]
+        if route is not None:
+            provider_config = {**provider_config, **provider_config["routes"][route]}
+        model_name = provider_config["model_name"]
+        cache_key = (self.model_provider, model_name)
+        if cache_key in _LLM_CLIENTS:
+            return _LLM_CLIENTS[cache_key]
+
+        scheduler_config = llm_config["scheduler"]
         if self.model_provider == "groq":
+            from langchain_groq import ChatGroq  # the SDK is only imported when used
+
             print("Loading LLM from Groq...")
             groq_api_key = os.getenv("GROQ_API_KEY")
-            llm_config = self.config.get_item("llm")
-            model_name = llm_config["groq"]["model_name"]
-            return ChatGroq(model=model_name, api_key=groq_api_key)
+            # With the scheduler on, it does the retrying: it honours Retry-After
+            # on 429s and backs off on 5xx, connection errors and timeouts
+            retries = {"max_retries": 0} if scheduler_config["enabled"] else {}
+            llm = ChatGroq(model=model_name, api_key=groq_api_key, **retries)
+        elif self.model_provider == "fake":
+            llm = FakeChatModel(
+                model_name=model_name,
+                latency_seconds=provider_config["latency_seconds"],
+                simulated_requests_per_minute=provider_config["simulated_requests_per_minute"],
+            )
+        else:
+            raise ValueError(f"Unsupported model provider: {self.model_provider}")
+
+        if cassettes.active() is not None:
+            # Innermost, so replayed calls still pass through the scheduler
+            llm = cassettes.CassetteChatModel(llm=llm)
+
+        if scheduler_config["enabled"]:
+            scheduler = LLMScheduler.from_config(scheduler_config, provider_config["rate_limits"])
+            llm = ScheduledChatModel(llm=llm, scheduler=scheduler)
+
+        _LLM_CLIENTS[cache_key] = llm
+        return llm
+
+
+async def awarm_up_llms(timeout: float = 5.0) -> None:
+    """
+    Open the HTTP connection of every LLM client loaded so far, so the first
+    request does not pay for DNS and the TLS handshake.
 
-        raise ValueError(f"Unsupported model provider: {self.model_provider}")
\ No newline at end of file
+    Lists the provider's models, which costs no tokens.  Failures are only
+    logged — a cold connection is slower, not broken.
+    """
+    start = time.perf_counter()
+    for (provider, model_name), llm in list(_LLM_CLIENTS.items()):
+        if isinstance(llm, ScheduledChatModel):
+            llm = llm.llm
+        client = getattr(llm, "async_client", None)
+        if client is None:
+            continue  # offline models have nothing to open
+        try:
+            await asyncio.wait_for(client._client.models.list(), timeout)
+        except Exception as e:
+            print(f"LLM warm-up for {provider}/{model_name} failed: {e}")
+    metrics.observe("startup.llm_warmup_seconds", time.perf_counter() - start)
@@ -1,7 +1,20 @@
+import asyncio
+import contextvars
+import datetime
 import os
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 from dotenv import load_dotenv
 
+from exception.handling import DeadlineExceeded, UpstreamUnavailable
+from models import PlaceCatalog
+from utils.config_loader import load_config
+from utils.http_client import get_client
+from utils.metrics import metrics
+from utils.spatial_index import SpatialIndex
+
 load_dotenv()
 
 
@@ -9,17 +22,79 @@ class PlaceInfo:
     """
     Searches for places using the Google Places API and enriches results
     with ratings, review counts, coordinates, and top reviews.
+
+    Every lookup has a blocking variant and an ``a``-prefixed coroutine
+    variant for the async /query path; both share the same parsing and the
+    pooled "google_places" client (`utils.http_client`).
+
+    Both lookups read through the SQLite `PlaceCatalog`: a search whose
+    result list and place fields are still fresh, or a place whose fields
+    are, costs no Google call.  Each field group has its own TTL
+    (`tools.places.field_ttl_seconds`), and a details call only requests the
+    groups that went stale.  Hits, misses and the list price saved are
+    counted under `places.*` in `utils.metrics`.
+
+    Every catalog place with coordinates is also kept in a `SpatialIndex`,
+    so `find_nearby` answers radius queries locally and only runs a Google
+    nearby search where the index holds too few places.
+
+    While the upstream's circuit breaker is open, stored data is served
+    regardless of age: a search answers from its last stored result list,
+    details from the stored place, nearby queries from the index alone.
     """
 
     TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+    NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    MAX_NEARBY_RADIUS_M = 50000  # Google's limit for a nearby search
     DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
 
+    # Details API fields for each catalog field group
+    DETAILS_FIELDS = {
+        "identity": "name,formatted_address,types",
+        "location": "geometry",
+        "ratings": "rating,user_ratings_total",
+        "reviews": "reviews",
+    }
+    SEARCH_GROUPS = ("identity", "location", "ratings")  # what a text search returns
+    DETAILS_GROUPS = ("identity", "location", "ratings", "reviews")
+
+    # Fields a details lookup can return, and the group each comes from
+    DETAIL_VIEW_FIELDS = {
+        "name": "identity",
+        "address": "identity",
+        "types": "identity",
+        "latitude": "location",
+        "longitude": "location",
+        "rating": "ratings",
+        "user_ratings_total": "ratings",
+        "top_review": "reviews",
+    }
+    DEFAULT_DETAIL_FIELDS = ("name", "rating", "user_ratings_total", "latitude", "longitude", "top_review")
+    _VIEW_DEFAULTS = {"name": "", "address": "", "types": [], "user_ratings_total": 0, "top_review": ""}
+
     def __init__(self) -> None:
         self.api_key = os.getenv("GOOGLE_PLACES_API_KEY")
         if not self.api_key:
             raise EnvironmentError(
                 "GOOGLE_PLACES_API_KEY is not set in environment variables."
             )
+        self.http = get_client("google_places")
+
+        places_config = load_config()["tools"]["places"]
+        self.search_ttl = datetime.timedelta(seconds=places_config["search_ttl_seconds"])
+        self.field_ttls = {
+            group: datetime.timedelta(seconds=ttl)
+            for group, ttl in places_config["field_ttl_seconds"].items()
+        }
+        self.costs = places_config["cost_per_call_usd"]
+        self.details_max_concurrency = places_config["details_max_concurrency"]
+        self.nearby_config = places_config["nearby"]
+        self.catalog = PlaceCatalog()
+        self.catalog.purge_expired(
+            self.search_ttl.total_seconds(), max(self.field_ttls.values()).total_seconds()
+        )
+        self._index: SpatialIndex | None = None  # built from the catalog on first use
+        self._index_lock = threading.Lock()
 
     # ── Text Search (enriched) ────────────────────────────────────────────
 
@@ -31,23 +106,92 @@ class PlaceInfo:
             name, address, rating, user_ratings_total,
             latitude, longitude, types, place_id
         """
-        full_query = f"{query} in {location}".strip(" in") if location else query
+        key = self._query_key(query, location)
+        cached = self._cached_search(key)
+        if cached is not None:
+            return cached
 
-        params = {
+        try:
+            response = self.http.get(self.TEXT_SEARCH_URL, params=self._search_params(query, location))
+        except UpstreamUnavailable as e:
+            return self._stored_search(key, e)
+        data = response.json()
+        places = self._parse_search(data)
+        if self._cacheable(data):
+            self._store_search(key, places)
+        return places
+
+    async def asearch(self, query: str, location: str = "") -> list[dict]:
+        """Async variant of `search`."""
+        key = self._query_key(query, location)
+        cached = await asyncio.to_thread(self._cached_search, key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self.http.aget(self.TEXT_SEARCH_URL, params=self._search_params(query, location))
+        except UpstreamUnavailable as e:
+            return await asyncio.to_thread(self._stored_search, key, e)
+        data = response.json()
+        places = self._parse_search(data)
+        if self._cacheable(data):
+            await asyncio.to_thread(self._store_search, key, places)
+        return places
+
+    def _search_params(self, query: str, location: str) -> dict:
+        full_query = f"{query} in {location}".strip(" in") if location else query
+        return {
             "query": full_query,
             "key": self.api_key,
         }
-        response = requests.get(self.TEXT_SEARCH_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
 
+    @staticmethod
+    def _cacheable(data: dict) -> bool:
+        """Only real answers are cached — not REQUEST_DENIED, OVER_QUERY_LIMIT, …"""
+        return data.get("status") in ("OK", "ZERO_RESULTS")
+
+    @staticmethod
+    def _query_key(query: str, location: str) -> str:
+        return f"{' '.join(query.lower().split())}|{' '.join(location.lower().split())}"
+
+    def _cached_search(self, key: str) -> list[dict] | None:
+        """The catalog's answer to a search, if the list and every place on it are fresh."""
+        stored = self.catalog.get_query(key)
+        if stored is not None and self._age(stored[1]) < self.search_ttl:
+            place_ids = stored[0]
+            places = self.catalog.get_places(place_ids)
+            if all(
+                pid in places and self._fresh(places[pid], self.SEARCH_GROUPS) for pid in place_ids
+            ):
+                self._record_hit("search", self.costs["text_search"])
+                return [self._search_view(places[pid]) for pid in place_ids]
+        metrics.incr("places.search.misses")
+        return None
+
+    def _stored_search(self, key: str, error: UpstreamUnavailable) -> list[dict]:
+        """The last stored answer to a search, however old; re-raises `error` if there is none."""
+        stored = self.catalog.get_query(key)
+        places = self.catalog.get_places(stored[0]) if stored else {}
+        if stored is None or any(pid not in places for pid in stored[0]):
+            raise error
+        metrics.incr("places.search.stale_served")
+        return [self._search_view(places[pid]) for pid in stored[0]]
+
+    def _store_search(self, key: str, places: list[dict]) -> None:
+        with_ids = [p for p in places if p["place_id"]]
+        self.catalog.upsert_places(with_ids, self.SEARCH_GROUPS)
+        self.catalog.store_query(key, [p["place_id"] for p in with_ids])
+        self._index_places(with_ids, with_types=True)
+
+    @staticmethod
+    def _parse_search(data: dict) -> list[dict]:
         results = []
         for place in data.get("results", [])[:10]:
             geo = place.get("geometry", {}).get("location", {})
             results.append(
                 {
                     "name": place.get("name", ""),
-                    "address": place.get("formatted_address", ""),
+                    "address": place.get("formatted_address", place.get("vicinity", "")),
                     "rating": place.get("rating", None),
                     "user_ratings_total": place.get("user_ratings_total", 0),
                     "latitude": geo.get("lat", None),
@@ -58,6 +202,138 @@ class PlaceInfo:
             )
         return results
 
+    @staticmethod
+    def _search_view(place: dict) -> dict:
+        return {
+            "name": place["name"] or "",
+            "address": place["address"] or "",
+            "rating": place["rating"],
+            "user_ratings_total": place["user_ratings_total"] or 0,
+            "latitude": place["latitude"],
+            "longitude": place["longitude"],
+            "types": place["types"],
+            "place_id": place["place_id"],
+        }
+
+    # ── Nearby (local spatial index) ──────────────────────────────────────
+
+    def find_nearby(
+        self, lat: float, lng: float, radius_km: float = 1.0, types: list[str] | None = None
+    ) -> list[dict]:
+        """
+        Places within `radius_km` of (lat, lng), nearest first.
+
+        Answered from the spatial index when it holds at least
+        `tools.places.nearby.min_results` matching places (or a Google
+        nearby search already covered this circle); otherwise one Google
+        nearby search fills the catalog first.
+
+        Returns list of dicts with the `search` keys plus distance_km.
+        """
+        types = self._nearby_args(lat, lng, radius_km, types)
+        index = self._spatial_index()
+        if not self._nearby_covered(index, lat, lng, radius_km, types):
+            try:
+                response = self.http.get(self.NEARBY_SEARCH_URL, params=self._nearby_params(lat, lng, radius_km, types))
+            except UpstreamUnavailable:
+                metrics.incr("places.nearby.stale_served")  # whatever the index holds
+            else:
+                self._store_nearby(index, response.json(), lat, lng, radius_km, types)
+        return self._nearby_results(index, lat, lng, radius_km, types)
+
+    async def afind_nearby(
+        self, lat: float, lng: float, radius_km: float = 1.0, types: list[str] | None = None
+    ) -> list[dict]:
+        """Async variant of `find_nearby`."""
+        types = self._nearby_args(lat, lng, radius_km, types)
+        index = self._index or await asyncio.to_thread(self._spatial_index)
+        if not self._nearby_covered(index, lat, lng, radius_km, types):
+            try:
+                response = await self.http.aget(
+                    self.NEARBY_SEARCH_URL, params=self._nearby_params(lat, lng, radius_km, types)
+                )
+            except UpstreamUnavailable:
+                metrics.incr("places.nearby.stale_served")  # whatever the index holds
+            else:
+                await asyncio.to_thread(self._store_nearby, index, response.json(), lat, lng, radius_km, types)
+        return await asyncio.to_thread(self._nearby_results, index, lat, lng, radius_km, types)
+
+    @staticmethod
+    def _nearby_args(lat: float, lng: float, radius_km: float, types: list[str] | None) -> tuple[str, ...]:
+        if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            raise ValueError(f"Invalid coordinates ({lat}, {lng}).")
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive.")
+        return tuple(sorted({t.strip().lower() for t in types or () if t.strip()}))
+
+    def _spatial_index(self) -> SpatialIndex:
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    index = SpatialIndex(self.nearby_config["cell_km"])
+                    index.add_many(self.catalog.locations())
+                    self._index = index
+        return self._index
+
+    def _index_places(self, places: list[dict], with_types: bool) -> None:
+        """Keep a built index in step with the catalog (an unbuilt one reads it later)."""
+        if self._index is None:
+            return
+        for place in places:
+            if place["latitude"] is not None and place["longitude"] is not None:
+                types = place["types"] if with_types else None
+                self._index.add(place["place_id"], place["latitude"], place["longitude"], types)
+
+    def _nearby_covered(
+        self, index: SpatialIndex, lat: float, lng: float, radius_km: float, types: tuple[str, ...]
+    ) -> bool:
+        if (
+            len(index.query(lat, lng, radius_km, types)) >= self.nearby_config["min_results"]
+            or index.is_covered(lat, lng, radius_km, types)
+        ):
+            self._record_hit("nearby", self.costs["nearby_search"])
+            return True
+        metrics.incr("places.nearby.misses")
+        return False
+
+    def _nearby_params(self, lat: float, lng: float, radius_km: float, types: tuple[str, ...]) -> dict:
+        params = {
+            "location": f"{lat},{lng}",
+            "radius": min(round(radius_km * 1000), self.MAX_NEARBY_RADIUS_M),
+            "key": self.api_key,
+        }
+        if len(types) == 1:  # the API filters by a single type; several are filtered locally
+            params["type"] = types[0]
+        return params
+
+    def _store_nearby(
+        self,
+        index: SpatialIndex,
+        data: dict,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        types: tuple[str, ...],
+    ) -> None:
+        if not self._cacheable(data):
+            return
+        places = [p for p in self._parse_search(data) if p["place_id"]]
+        self.catalog.upsert_places(places, self.SEARCH_GROUPS)
+        self._index_places(places, with_types=True)
+        if radius_km * 1000 <= self.MAX_NEARBY_RADIUS_M:
+            index.mark_covered(lat, lng, radius_km, types)
+
+    def _nearby_results(
+        self, index: SpatialIndex, lat: float, lng: float, radius_km: float, types: tuple[str, ...]
+    ) -> list[dict]:
+        matches = index.query(lat, lng, radius_km, types)[: self.nearby_config["max_results"]]
+        places = self.catalog.get_places([pid for pid, _ in matches])
+        return [
+            {**self._search_view(places[pid]), "distance_km": round(distance, 3)}
+            for pid, distance in matches
+            if pid in places
+        ]
+
     # ── Place Details (top review) ────────────────────────────────────────
 
     def get_place_details(self, place_id: str) -> dict:
@@ -65,30 +341,219 @@ class PlaceInfo:
         Fetch details for a single place including the top review.
 
         Returns dict with: name, rating, user_ratings_total,
-                           latitude, longitude, top_review.
+                           latitude, longitude, top_review
+        — or {"error": "..."} saying why the place could not be fetched
+        (e.g. not found vs. upstream unavailable), as `get_places_details`.
         """
-        params = {
+        return self.get_places_details([place_id])[place_id]
+
+    async def aget_place_details(self, place_id: str) -> dict:
+        """Async variant of `get_place_details`."""
+        return (await self.aget_places_details([place_id]))[place_id]
+
+    def get_places_details(self, place_ids: list[str], fields: list[str] | None = None) -> dict:
+        """
+        Fetch details for several places at once.
+
+        Places missing from the catalog (or with stale fields) are fetched
+        concurrently, at most `tools.places.details_max_concurrency` at a
+        time, asking Google only for the stale field groups `fields` needs.
+
+        Args:
+            place_ids: Google place_ids.
+            fields:    Subset of `DETAIL_VIEW_FIELDS` to return
+                       (default: `DEFAULT_DETAIL_FIELDS`).
+
+        Returns:
+            {place_id: {field: value, ...}}, or {place_id: {"error": "..."}}
+            for a place that could not be fetched and is not in the catalog.
+        """
+        place_ids = list(dict.fromkeys(place_ids))
+        fields, groups = self._field_mask(fields)
+        stored, stale = self._cached_details(place_ids, groups)
+        fetched: dict = {}
+        if stale:
+            workers = min(self.details_max_concurrency, len(stale))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="places") as pool:
+                # Copy the context so the request deadline reaches the workers
+                futures = {
+                    pid: pool.submit(contextvars.copy_context().run, self._fetch_details, pid, missing)
+                    for pid, missing in stale.items()
+                }
+                for pid, future in futures.items():
+                    try:
+                        fetched[pid] = future.result()
+                    except Exception as e:
+                        fetched[pid] = e
+            self._store_details(fetched, stale)
+        return self._details_results(place_ids, fields, stored, stale, fetched)
+
+    async def aget_places_details(self, place_ids: list[str], fields: list[str] | None = None) -> dict:
+        """Async variant of `get_places_details`."""
+        place_ids = list(dict.fromkeys(place_ids))
+        fields, groups = self._field_mask(fields)
+        stored, stale = await asyncio.to_thread(self._cached_details, place_ids, groups)
+        fetched: dict = {}
+        if stale:
+            semaphore = asyncio.Semaphore(self.details_max_concurrency)
+
+            async def fetch(pid: str, missing: tuple[str, ...]) -> dict:
+                async with semaphore:
+                    return await self._afetch_details(pid, missing)
+
+            outcomes = await asyncio.gather(
+                *(fetch(pid, missing) for pid, missing in stale.items()), return_exceptions=True
+            )
+            fetched = dict(zip(stale, outcomes))
+            await asyncio.to_thread(self._store_details, fetched, stale)
+        return self._details_results(place_ids, fields, stored, stale, fetched)
+
+    def _field_mask(self, fields: list[str] | None) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """Validate `fields` and return them with the field groups they need."""
+        fields = tuple(dict.fromkeys(fields or self.DEFAULT_DETAIL_FIELDS))
+        unknown = [f for f in fields if f not in self.DETAIL_VIEW_FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Unknown field(s) {unknown}; choose from {list(self.DETAIL_VIEW_FIELDS)}."
+            )
+        needed = {self.DETAIL_VIEW_FIELDS[f] for f in fields}
+        return fields, tuple(g for g in self.DETAILS_GROUPS if g in needed)
+
+    def _cached_details(
+        self, place_ids: list[str], groups: tuple[str, ...]
+    ) -> tuple[dict[str, dict], dict[str, tuple[str, ...]]]:
+        """The stored places, and for each place that needs a call, its stale groups."""
+        stored = self.catalog.get_places(place_ids)
+        stale = {}
+        for pid in place_ids:
+            place = stored.get(pid)
+            missing = tuple(g for g in groups if place is None or not self._fresh(place, (g,)))
+            if missing:
+                stale[pid] = missing
+                metrics.incr("places.details.misses")
+            else:
+                self._record_hit("details", self.costs["details"])
+        return stored, stale
+
+    def _fetch_details(self, place_id: str, groups: tuple[str, ...]) -> dict:
+        response = self.http.get(self.DETAILS_URL, params=self._details_params(place_id, groups))
+        return self._parse_details(place_id, self._details_result(response.json()))
+
+    async def _afetch_details(self, place_id: str, groups: tuple[str, ...]) -> dict:
+        response = await self.http.aget(self.DETAILS_URL, params=self._details_params(place_id, groups))
+        return self._parse_details(place_id, self._details_result(response.json()))
+
+    @staticmethod
+    def _details_result(data: dict) -> dict:
+        status = data.get("status", "OK")
+        if status != "OK" or not data.get("result"):
+            raise ValueError(f"Google Places answered {status} for this place_id.")
+        return data["result"]
+
+    def _store_details(self, fetched: dict, stale: dict[str, tuple[str, ...]]) -> None:
+        for pid, place in fetched.items():
+            if not isinstance(place, Exception):
+                self.catalog.upsert_places([place], stale[pid])
+                if "location" in stale[pid]:
+                    self._index_places([place], with_types="identity" in stale[pid])
+
+    def _details_results(
+        self,
+        place_ids: list[str],
+        fields: tuple[str, ...],
+        stored: dict[str, dict],
+        stale: dict[str, tuple[str, ...]],
+        fetched: dict,
+    ) -> dict:
+        results = {}
+        for pid in place_ids:
+            outcome = fetched.get(pid)
+            if pid not in stale:
+                results[pid] = self._view(stored[pid], fields)
+            elif not isinstance(outcome, Exception):
+                results[pid] = self._view(self._merge(stored.get(pid), outcome, stale[pid]), fields)
+            elif pid in stored:
+                metrics.incr("places.details.stale_served")
+                results[pid] = self._view(stored[pid], fields)  # stale beats nothing
+            else:
+                results[pid] = {"error": self._describe_error(outcome)}
+        return results
+
+    def _details_params(self, place_id: str, groups: tuple[str, ...]) -> dict:
+        return {
             "place_id": place_id,
-            "fields": "name,rating,user_ratings_total,geometry,reviews",
+            "fields": ",".join(self.DETAILS_FIELDS[group] for group in groups),
             "key": self.api_key,
         }
 
-        try:
-            response = requests.get(self.DETAILS_URL, params=params, timeout=10)
-            response.raise_for_status()
-            result = response.json().get("result", {})
-        except Exception:
-            return {}
-
+    @staticmethod
+    def _parse_details(place_id: str, result: dict) -> dict:
         geo = result.get("geometry", {}).get("location", {})
         reviews = result.get("reviews", [])
         top_review = reviews[0].get("text", "") if reviews else ""
 
         return {
+            "place_id": place_id,
             "name": result.get("name", ""),
+            "address": result.get("formatted_address", ""),
+            "types": result.get("types", []),
             "rating": result.get("rating", None),
             "user_ratings_total": result.get("user_ratings_total", 0),
             "latitude": geo.get("lat", None),
             "longitude": geo.get("lng", None),
             "top_review": top_review,
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _merge(stored: dict | None, fetched: dict, groups: tuple[str, ...]) -> dict:
+        """The stored place with the re-fetched `groups` replaced."""
+        merged = dict(stored or fetched)
+        for group in groups:
+            for name in PlaceCatalog.GROUPS[group]:
+                merged[name] = fetched[name]
+        return merged
+
+    @classmethod
+    def _view(cls, place: dict, fields: tuple[str, ...]) -> dict:
+        return {
+            name: cls._VIEW_DEFAULTS.get(name) if place.get(name) is None else place[name]
+            for name in fields
+        }
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """Error text for the model — without the request URL, which carries the API key."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return f"Google Places returned HTTP {error.response.status_code}."
+        if isinstance(error, UpstreamUnavailable):
+            return "Google Places is temporarily unavailable."
+        if isinstance(error, (ValueError, DeadlineExceeded)):
+            return str(error)
+        return f"{type(error).__name__}: could not reach Google Places."
+
+    # ── Freshness ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _age(updated_at: datetime.datetime | None) -> datetime.timedelta:
+        if updated_at is None:
+            return datetime.timedelta.max
+        return datetime.datetime.utcnow() - updated_at
+
+    def _fresh(self, place: dict, groups: tuple[str, ...]) -> bool:
+        return all(self._age(place[f"{group}_updated_at"]) < self.field_ttls[group] for group in groups)
+
+    @staticmethod
+    def _record_hit(kind: str, cost: float) -> None:
+        metrics.incr(f"places.{kind}.hits")
+        metrics.incr("places.cost_saved_usd", cost)
+
+
+def catalog_stats() -> dict:
+    """Hit rates and list price saved by the place catalog since startup."""
+    counters = metrics.snapshot()["counters"]
+    stats = {"cost_saved_usd": round(counters.get("places.cost_saved_usd", 0.0), 4)}
+    for kind in ("search", "details", "nearby"):
+        hits = counters.get(f"places.{kind}.hits", 0)
+        misses = counters.get(f"places.{kind}.misses", 0)
+        stats[f"{kind}_hit_rate"] = round(hits / (hits + misses), 4) if hits + misses else None
+    return stats
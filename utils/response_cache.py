@@ -0,0 +1,241 @@
+"""
+response_cache.py — In-memory cache of finished travel plans.
+
+Plans are keyed on a normalised question, a hash of the user's preference
+block and a time bucket.  Near-duplicate questions ("5 day trip to Paris"
+vs "plan 5 days in paris") are matched with a MinHash/LSH index over
+character shingles of the normalised question's sorted tokens.  Entries expire by TTL and
+are evicted LRU; stale entries can still be served while the caller
+refreshes them in the background (stale-while-revalidate).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from utils.metrics import metrics
+
+_STOPWORDS = {
+    "a", "an", "the", "to", "in", "for", "of", "on", "at", "me", "my", "i",
+    "we", "us", "our", "please", "plan", "planning", "trip", "travel",
+    "itinerary", "want", "would", "like", "can", "you", "make", "create",
+    "give", "need", "visit", "visiting", "holiday", "vacation", "and",
+}
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "a week": "7 day",
+    "weekend": "2 day",
+}
+_SYMBOLS = {"$": " usd ", "€": " eur ", "£": " gbp ", "¥": " jpy ", "₺": " try ", "₹": " inr "}
+_SHINGLE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalise_question(question: str) -> str:
+    """
+    Reduce a question to a canonical token string.
+
+    Word order is kept — "London to Paris" and "Paris to London" are
+    different trips.  Lower-cases, strips accents and punctuation, maps number words and
+    currency symbols, singularises simple plurals and drops filler words.
+    """
+    text = unicodedata.normalize("NFKD", question).encode("ascii", "ignore").decode()
+    for symbol, code in _SYMBOLS.items():
+        text = text.replace(symbol, code)
+    text = text.lower()
+    for word, number in _NUMBER_WORDS.items():
+        text = re.sub(rf"\b{word}\b", number, text)
+    text = re.sub(r"(\d),(\d)", r"\1\2", text)
+
+    tokens = []
+    for token in re.findall(r"[a-z]+|\d+(?:\.\d+)?", text):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+class PlanCache:
+    """
+    TTL + LRU cache of plans with MinHash near-duplicate lookup.
+
+    An entry is *fresh* for `fresh_ttl` seconds, then *stale* until
+    `stale_ttl`, after which it is dropped.  Near-duplicates must share the
+    preference hash, the time bucket and every number in the question, list
+    the words they share in the same order, and reach `similarity_threshold`
+    Jaccard similarity on their shingles.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        fresh_ttl: float = 3600,
+        stale_ttl: float = 6 * 3600,
+        time_bucket_seconds: float = 86400,
+        similarity_threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+    ) -> None:
+        self.max_entries = max_entries
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.time_bucket_seconds = time_bucket_seconds
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        # Fixed (a, b) pairs for the universal hashes h(x) = (a*x + b) mod p
+        self._perms = []
+        for i in range(num_perm):
+            seed = hashlib.blake2b(f"plan-cache-{i}".encode(), digest_size=16).digest()
+            a = int.from_bytes(seed[:8], "big") % _MERSENNE_PRIME | 1
+            b = int.from_bytes(seed[8:], "big") % _MERSENNE_PRIME
+            self._perms.append((a, b))
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._bands: dict[tuple, set[tuple]] = {}
+        self.refreshing: set[tuple] = set()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "PlanCache":
+        """Build a cache from the ``cache.plans`` section of config.yaml."""
+        return cls(
+            max_entries=config["max_entries"],
+            fresh_ttl=config["fresh_ttl_seconds"],
+            stale_ttl=config["stale_ttl_seconds"],
+            time_bucket_seconds=config["time_bucket_seconds"],
+            similarity_threshold=config["similarity_threshold"],
+        )
+
+    # ── Keys ──────────────────────────────────────────────────────────────
+
+    def key(self, question: str, pref_block: str = "") -> tuple:
+        """Return the exact-match key: (normalised question, pref hash, bucket)."""
+        pref_hash = hashlib.sha256(pref_block.encode()).hexdigest()[:16]
+        bucket = int(time.time() // self.time_bucket_seconds)
+        return normalise_question(question), pref_hash, bucket
+
+    @staticmethod
+    def _shingles(normalised: str) -> set[str]:
+        """Character shingles of the sorted tokens, so rephrasings line up."""
+        text = " ".join(sorted(normalised.split()))
+        if len(text) <= _SHINGLE:
+            return {text}
+        return {text[i:i + _SHINGLE] for i in range(len(text) - _SHINGLE + 1)}
+
+    def _signature(self, shingles: set[str]) -> list[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+            for s in shingles
+        ]
+        return [
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, key: tuple, signature: list[int]) -> list[tuple]:
+        scope = key[1:]
+        return [
+            (scope, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    # ── Public API ────────────────────────────────────────────────────────
+
+    def lookup(self, question: str, pref_block: str = "") -> tuple[str | None, str | None, tuple]:
+        """
+        Find a cached answer for `question`.
+
+        Returns:
+            (answer, state, key) where state is "fresh", "stale" or None on
+            a miss, and key is this question's own key — the one to store
+            a fresh answer under, even when a near-duplicate was served.
+        """
+        key = self.key(question, pref_block)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            near = False
+            if entry is None:
+                entry = self._near_duplicate(key)
+                near = entry is not None
+
+            if entry is None or now - entry["stored_at"] > self.stale_ttl:
+                if entry is not None:
+                    self._remove(entry["key"])
+                metrics.incr("plan_cache.misses")
+                return None, None, key
+
+            self._entries.move_to_end(entry["key"])
+            metrics.incr("plan_cache.near_hits" if near else "plan_cache.hits")
+            if now - entry["stored_at"] > self.fresh_ttl:
+                metrics.incr("plan_cache.stale_hits")
+                return entry["answer"], "stale", key
+            return entry["answer"], "fresh", key
+
+    def store(self, key: tuple, answer: str) -> None:
+        """Insert or replace the answer for `key` (as returned by `lookup`)."""
+        shingles = self._shingles(key[0])
+        signature = self._signature(shingles)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = {
+                "key": key,
+                "answer": answer,
+                "stored_at": time.time(),
+                "shingles": shingles,
+                "numbers": set(re.findall(r"\d+(?:\.\d+)?", key[0])),
+                "tokens": key[0].split(),
+                "band_keys": self._band_keys(key, signature),
+            }
+            self._entries[key] = entry
+            for band_key in entry["band_keys"]:
+                self._bands.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    # ── Internals (call with the lock held) ───────────────────────────────
+
+    def _near_duplicate(self, key: tuple) -> dict | None:
+        shingles = self._shingles(key[0])
+        numbers = set(re.findall(r"\d+(?:\.\d+)?", key[0]))
+        tokens = key[0].split()
+        candidates: set[tuple] = set()
+        for band_key in self._band_keys(key, self._signature(shingles)):
+            candidates |= self._bands.get(band_key, set())
+
+        best, best_score = None, self.similarity_threshold
+        for candidate in candidates:
+            entry = self._entries[candidate]
+            if entry["numbers"] != numbers:
+                continue  # "5 days in Paris" must never answer "6 days in Paris"
+            if not self._same_order(tokens, entry["tokens"]):
+                continue  # nor "London to Paris" answer "Paris to London"
+            score = len(shingles & entry["shingles"]) / len(shingles | entry["shingles"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    @staticmethod
+    def _same_order(a: list[str], b: list[str]) -> bool:
+        shared = set(a) & set(b)
+        return [t for t in a if t in shared] == [t for t in b if t in shared]
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        for band_key in entry["band_keys"]:
+            members = self._bands.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._bands[band_key]
@@ -0,0 +1,249 @@
+import math
+
+import numpy as np
+
+from utils.config_loader import load_config
+from utils.spatial_index import EARTH_RADIUS_KM
+
+
+def haversine_matrix(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances (km) between the points, as an (n, n) matrix."""
+    phi = np.radians(lat)[:, None]
+    lam = np.radians(lng)[:, None]
+    a = (
+        np.sin((phi - phi.T) / 2) ** 2
+        + np.cos(phi) * np.cos(phi.T) * np.sin((lam - lam.T) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class RouteOptimizer:
+    """
+    Splits places into day groups and orders each day into a short route.
+
+    1. One NumPy haversine matrix covers every place (and the start point).
+    2. Places are clustered into `days` balanced, geographically compact
+       groups (k-means++ on a local flat projection, then a capacity-bounded
+       assignment so no day gets far more stops than the others).
+    3. Each day is ordered by nearest-neighbour and improved with 2-opt.
+       With a start point (e.g. the hotel) every day is a round trip from it.
+
+    Leg times use the `tools.itinerary` settings: legs up to `walk_max_km`
+    are walked, longer ones take transit with a fixed boarding overhead;
+    straight-line distances are stretched by `detour_factor` for both.
+    """
+
+    KMEANS_ITERATIONS = 25
+    MAX_TWO_OPT_PASSES = 50
+
+    def __init__(self) -> None:
+        itinerary_config = load_config()["tools"]["itinerary"]
+        self.walk_speed_kmh = itinerary_config["walk_speed_kmh"]
+        self.transit_speed_kmh = itinerary_config["transit_speed_kmh"]
+        self.transit_overhead_minutes = itinerary_config["transit_overhead_minutes"]
+        self.walk_max_km = itinerary_config["walk_max_km"]
+        self.detour_factor = itinerary_config["detour_factor"]
+        self.max_places = itinerary_config["max_places"]
+
+    def optimize(self, places: list[dict], days: int, start_point: dict | None = None) -> dict:
+        """
+        Plan `days` routes through `places`.
+
+        Args:
+            places:      Dicts with name, latitude, longitude (place_id optional),
+                         e.g. straight from search_places.
+            days:        Number of days to spread the places over.
+            start_point: Optional dict with latitude, longitude (and name)
+                         where each day starts and ends.
+
+        Returns:
+            {"days": [{day, stops, legs, total_km, total_minutes}, ...],
+             "unplaced": [names of places without coordinates]}
+
+        Raises:
+            ValueError: If `days` < 1, too many places are given, or the
+                        start point has no coordinates.
+        """
+        if days < 1:
+            raise ValueError("days must be at least 1.")
+        located = [p for p in places if self._has_coordinates(p)]
+        unplaced = [p.get("name", "") for p in places if not self._has_coordinates(p)]
+        if len(located) > self.max_places:
+            raise ValueError(f"At most {self.max_places} places can be planned at once.")
+        if start_point is not None and not self._has_coordinates(start_point):
+            raise ValueError("start_point needs latitude and longitude.")
+        if not located:
+            return {"days": [], "unplaced": unplaced}
+
+        points = located + ([start_point] if start_point is not None else [])
+        lat = np.array([float(p["latitude"]) for p in points])
+        lng = np.array([float(p["longitude"]) for p in points])
+        distances = haversine_matrix(lat, lng)
+        start = len(located) if start_point is not None else None
+
+        groups = self._cluster(lat[: len(located)], lng[: len(located)], min(days, len(located)))
+        plan = []
+        for members in groups:
+            order = self._order(distances, members, start)
+            plan.append(self._describe_day(len(plan) + 1, points, distances, order))
+        return {"days": plan, "unplaced": unplaced}
+
+    # ── Clustering ────────────────────────────────────────────────────────
+
+    def _cluster(self, lat: np.ndarray, lng: np.ndarray, k: int) -> list[np.ndarray]:
+        """Indices of the places in each of `k` balanced clusters, west to east."""
+        n = len(lat)
+        if k == 1:
+            return [np.arange(n)]
+        # Flat projection (km) around the centroid is accurate at city scale
+        lat0 = np.radians(lat.mean())
+        xy = np.column_stack(
+            (np.radians(lng) * math.cos(lat0) * EARTH_RADIUS_KM, np.radians(lat) * EARTH_RADIUS_KM)
+        )
+        centres = self._kmeans_pp(xy, k)
+        for _ in range(self.KMEANS_ITERATIONS):
+            labels = self._squared_distances(xy, centres).argmin(axis=1)
+            updated = np.array(
+                [xy[labels == c].mean(axis=0) if np.any(labels == c) else centres[c] for c in range(k)]
+            )
+            if np.allclose(updated, centres):
+                break
+            centres = updated
+
+        labels = self._balanced_assignment(self._squared_distances(xy, centres), math.ceil(n / k))
+        clusters = [np.flatnonzero(labels == c) for c in range(k)]
+        return sorted((c for c in clusters if len(c)), key=lambda c: xy[c, 0].mean())
+
+    @staticmethod
+    def _squared_distances(xy: np.ndarray, centres: np.ndarray) -> np.ndarray:
+        return ((xy[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+
+    @staticmethod
+    def _kmeans_pp(xy: np.ndarray, k: int) -> np.ndarray:
+        """k-means++ seeding with a fixed seed, so the same input gives the same plan."""
+        rng = np.random.default_rng(0)
+        centres = [xy[rng.integers(len(xy))]]
+        for _ in range(1, k):
+            nearest = ((xy[:, None, :] - np.array(centres)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            total = nearest.sum()
+            index = rng.choice(len(xy), p=nearest / total) if total > 0 else rng.integers(len(xy))
+            centres.append(xy[index])
+        return np.array(centres)
+
+    @staticmethod
+    def _balanced_assignment(squared: np.ndarray, capacity: int) -> np.ndarray:
+        """Nearest centre with room left; places with most to lose choose first."""
+        n, k = squared.shape
+        ranked = np.argsort(squared, axis=1)
+        if k > 1:
+            regret = np.take_along_axis(squared, ranked[:, 1:2], axis=1)[:, 0] - squared[np.arange(n), ranked[:, 0]]
+        else:
+            regret = np.zeros(n)
+        labels = np.empty(n, dtype=int)
+        load = np.zeros(k, dtype=int)
+        for i in np.argsort(-regret):
+            for c in ranked[i]:
+                if load[c] < capacity:
+                    labels[i] = c
+                    load[c] += 1
+                    break
+        return labels
+
+    # ── Ordering ──────────────────────────────────────────────────────────
+
+    def _order(self, distances: np.ndarray, members: np.ndarray, start: int | None) -> list[int]:
+        """Visiting order (indices into `distances`) for one day, including the start point."""
+        nodes = np.concatenate((members, [start])) if start is not None else members
+        local = distances[np.ix_(nodes, nodes)]
+        m = len(nodes)
+        if start is None:
+            # A zero-cost dummy node turns the open path into a tour 2-opt can handle
+            local = np.pad(local, ((0, 1), (0, 1)))
+            first = m
+        else:
+            first = m - 1
+        tour = self._two_opt(local, self._nearest_neighbour(local, first))
+        # Rotate so the tour starts at the start (or dummy) node, then map back
+        tour = tour[tour.index(first):] + tour[: tour.index(first)]
+        if start is None:
+            return [int(nodes[i]) for i in tour[1:]]
+        return [int(nodes[i]) for i in tour] + [start]
+
+    @staticmethod
+    def _nearest_neighbour(local: np.ndarray, first: int) -> list[int]:
+        visited = np.zeros(len(local), dtype=bool)
+        tour = [first]
+        visited[first] = True
+        for _ in range(len(local) - 1):
+            row = np.where(visited, np.inf, local[tour[-1]])
+            nxt = int(row.argmin())
+            tour.append(nxt)
+            visited[nxt] = True
+        return tour
+
+    def _two_opt(self, local: np.ndarray, tour: list[int]) -> list[int]:
+        """Reverse segments while that shortens the closed tour (best move per position)."""
+        m = len(tour)
+        if m < 4:
+            return tour
+        route = np.array(tour)
+        for _ in range(self.MAX_TWO_OPT_PASSES):
+            improved = False
+            for i in range(0, m - 2):
+                a, b = route[i], route[i + 1]
+                c = route[i + 2:]
+                d = np.roll(route, -1)[i + 2:]
+                if i == 0:  # edge (last → first) is shared with edge (a → b)
+                    c, d = c[:-1], d[:-1]
+                if not len(c):
+                    continue
+                delta = local[a, c] + local[b, d] - local[a, b] - local[c, d]
+                j = int(delta.argmin())
+                if delta[j] < -1e-9:
+                    route[i + 1 : i + 3 + j] = route[i + 1 : i + 3 + j][::-1]
+                    improved = True
+            if not improved:
+                break
+        return route.tolist()
+
+    # ── Output ────────────────────────────────────────────────────────────
+
+    def _describe_day(self, day: int, points: list[dict], distances: np.ndarray, order: list[int]) -> dict:
+        legs = []
+        for origin, destination in zip(order, order[1:]):
+            distance = float(distances[origin, destination])
+            mode, minutes = self._travel(distance)
+            legs.append(
+                {
+                    "from": points[origin].get("name", ""),
+                    "to": points[destination].get("name", ""),
+                    "distance_km": round(distance, 2),
+                    "mode": mode,
+                    "minutes": minutes,
+                }
+            )
+        return {
+            "day": day,
+            "stops": [self._stop(points[i]) for i in order],
+            "legs": legs,
+            "total_km": round(sum(leg["distance_km"] for leg in legs), 2),
+            "total_minutes": sum(leg["minutes"] for leg in legs),
+        }
+
+    def _travel(self, distance_km: float) -> tuple[str, int]:
+        """("walk" | "transit", estimated minutes) for a straight-line distance."""
+        route_km = distance_km * self.detour_factor
+        if distance_km <= self.walk_max_km:
+            return "walk", max(1, round(route_km / self.walk_speed_kmh * 60))
+        return "transit", round(self.transit_overhead_minutes + route_km / self.transit_speed_kmh * 60)
+
+    @staticmethod
+    def _stop(place: dict) -> dict:
+        stop = {"name": place.get("name", ""), "latitude": place["latitude"], "longitude": place["longitude"]}
+        if place.get("place_id"):
+            stop["place_id"] = place["place_id"]
+        return stop
+
+    @staticmethod
+    def _has_coordinates(place: dict) -> bool:
+        return place.get("latitude") is not None and place.get("longitude") is not None
@@ -0,0 +1,108 @@
+"""
+single_flight.py — Coalesce identical concurrent requests onto one execution.
+
+The first caller for a key starts the work; every caller that arrives while
+it is running awaits the same result.  Results can optionally be kept for a
+short window (idempotency keys), so a retry after a client-side timeout
+attaches to the finished — or still running — execution instead of paying
+for a second one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from typing import Any, Awaitable, Callable
+
+from utils.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Registry of in-flight (and recently finished) executions, keyed by string.
+
+    Executions run as their own tasks, so a caller that disconnects does not
+    cancel the work other callers — or a later retry — are waiting for.
+    Failed executions are never retained, and retained results are swept
+    once they expire, whether or not their key is ever looked up again.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[asyncio.Future, float]] = {}
+        self._expiries: list[tuple[float, str]] = []  # min-heap of (expires_at, key)
+
+    def lookup(self, key: str) -> asyncio.Future | None:
+        """Return the running or retained execution for `key`, if any."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        future, expires_at = entry
+        if future.done() and time.monotonic() > expires_at:
+            del self._entries[key]
+            return None
+        return future
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], keep_for: float = 0) -> Any:
+        """
+        Run `fn()` once per key and return its result to every caller.
+
+        Args:
+            key:      Identity of the execution.
+            fn:       Coroutine factory doing the actual work.
+            keep_for: Seconds to keep a successful result for later callers.
+        """
+        self._sweep()
+        future = self.lookup(key)
+        if future is not None:
+            metrics.incr("single_flight.coalesced")
+            return await asyncio.shield(future)
+
+        task = asyncio.ensure_future(fn())
+        self._entries[key] = (task, float("inf"))
+        task.add_done_callback(lambda t: self._settle(key, t, keep_for))
+        return await asyncio.shield(task)
+
+    # ── Manual API (used where the leader must stream its own progress) ────
+
+    def start(self, key: str) -> asyncio.Future:
+        """Register the calling coroutine as the leader for `key`."""
+        self._sweep()
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (future, float("inf"))
+        return future
+
+    def resolve(self, key: str, future: asyncio.Future, result: Any, keep_for: float = 0) -> None:
+        """Publish the leader's result to every waiting caller."""
+        if not future.done():
+            future.set_result(result)
+        self._settle(key, future, keep_for)
+
+    def fail(self, key: str, future: asyncio.Future, error: BaseException) -> None:
+        """Propagate the leader's failure to every waiting caller."""
+        if not future.done():
+            future.set_exception(error)
+            future.exception()  # mark retrieved; waiters re-raise it themselves
+        self._settle(key, future, 0)
+
+    def _settle(self, key: str, future: asyncio.Future, keep_for: float) -> None:
+        if self._entries.get(key, (None,))[0] is not future:
+            return
+        if future.cancelled() or future.exception() is not None or keep_for <= 0:
+            del self._entries[key]
+        else:
+            expires_at = time.monotonic() + keep_for
+            self._entries[key] = (future, expires_at)
+            if expires_at != float("inf"):
+                heapq.heappush(self._expiries, (expires_at, key))
+        self._sweep()
+
+    def _sweep(self) -> None:
+        """Drop retained results whose window has passed."""
+        now = time.monotonic()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            # The key may have been re-run since; only drop this exact entry
+            if entry is not None and entry[1] == expires_at and entry[0].done():
+                del self._entries[key]
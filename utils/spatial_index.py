@@ -0,0 +1,133 @@
+"""
+spatial_index.py — In-memory grid index over place coordinates.
+
+The globe is cut into cells of `cell_km` × `cell_km` degrees-equivalent
+(latitude bands of `cell_km` / 111.32 degrees, longitude the same number of
+degrees).  A radius query only visits the cells overlapping the query
+circle's bounding box and filters them by great-circle distance, so its
+cost depends on how many places are *nearby*, not on the index size.
+
+The index also remembers which circles an upstream nearby search has
+already covered, so a sparse area is not searched again just because it
+holds few places.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Iterable
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """Thread-safe place_id → (lat, lng, types) index answering radius queries."""
+
+    def __init__(self, cell_km: float = 1.0, max_covered: int = 4096) -> None:
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._lng_cells = math.ceil(360 / self.cell_deg)
+        self._cells: dict[tuple[int, int], dict[str, tuple[float, float, frozenset]]] = {}
+        self._where: dict[str, tuple[int, int]] = {}
+        self._type_sets: dict[frozenset, frozenset] = {}
+        self._covered: deque[tuple[float, float, float, frozenset]] = deque(maxlen=max_covered)
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return (
+            math.floor((lat + 90) / self.cell_deg),
+            math.floor((lng + 180) / self.cell_deg) % self._lng_cells,
+        )
+
+    # ── Updates ───────────────────────────────────────────────────────────
+
+    def add(self, place_id: str, lat: float, lng: float, types: Iterable[str] | None = None) -> None:
+        """Insert or move a place.  `types=None` keeps the place's known types."""
+        with self._lock:
+            self._insert(place_id, lat, lng, types)
+
+    def add_many(self, places: Iterable[tuple[str, float, float, Iterable[str]]]) -> None:
+        """Bulk insert of (place_id, lat, lng, types) tuples."""
+        with self._lock:
+            for place_id, lat, lng, types in places:
+                self._insert(place_id, lat, lng, types)
+
+    def _insert(self, place_id: str, lat: float, lng: float, types: Iterable[str] | None) -> None:
+        old_cell = self._where.get(place_id)
+        old = self._cells[old_cell].pop(place_id) if old_cell is not None else None
+        if old_cell is not None and not self._cells[old_cell]:
+            del self._cells[old_cell]
+        if types is None:
+            type_set = old[2] if old else frozenset()
+        else:
+            type_set = frozenset(types)
+            type_set = self._type_sets.setdefault(type_set, type_set)  # share equal sets
+        cell = self._cell(lat, lng)
+        self._cells.setdefault(cell, {})[place_id] = (lat, lng, type_set)
+        self._where[place_id] = cell
+
+    def mark_covered(self, lat: float, lng: float, radius_km: float, types: Iterable[str] = ()) -> None:
+        """Record that every place of `types` (any, if empty) within the circle was fetched."""
+        with self._lock:
+            self._covered.append((lat, lng, radius_km, frozenset(types)))
+
+    # ── Queries ───────────────────────────────────────────────────────────
+
+    def query(
+        self, lat: float, lng: float, radius_km: float, types: Iterable[str] = ()
+    ) -> list[tuple[str, float]]:
+        """
+        Places within `radius_km` of (lat, lng) having any of `types` (all
+        places, if empty), as (place_id, distance_km) sorted nearest first.
+        """
+        wanted = frozenset(types)
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = max(
+            min(math.cos(math.radians(lat - lat_span)), math.cos(math.radians(lat + lat_span))), 1e-6
+        )
+        lng_span = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        row_min, _ = self._cell(max(lat - lat_span, -90.0), lng)
+        row_max, _ = self._cell(min(lat + lat_span, 90.0), lng)
+        lng_steps = min(math.ceil(2 * lng_span / self.cell_deg) + 1, self._lng_cells)
+        _, col_min = self._cell(lat, lng - lng_span)
+
+        matches = []
+        with self._lock:
+            for row in range(row_min, row_max + 1):
+                for step in range(lng_steps):
+                    entries = self._cells.get((row, (col_min + step) % self._lng_cells))
+                    if not entries:
+                        continue
+                    for place_id, (p_lat, p_lng, p_types) in entries.items():
+                        if wanted and not wanted & p_types:
+                            continue
+                        distance = haversine_km(lat, lng, p_lat, p_lng)
+                        if distance <= radius_km:
+                            matches.append((place_id, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def is_covered(self, lat: float, lng: float, radius_km: float, types: Iterable[str] = ()) -> bool:
+        """True if an earlier fetch covered the whole circle for these types."""
+        wanted = frozenset(types)
+        with self._lock:
+            return any(
+                (not c_types or (wanted and wanted <= c_types))
+                and haversine_km(lat, lng, c_lat, c_lng) + radius_km <= c_radius
+                for c_lat, c_lng, c_radius, c_types in self._covered
+            )
+
+    def __len__(self) -> int:
+        return len(self._where)
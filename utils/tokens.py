@@ -0,0 +1,38 @@
+"""
+tokens.py — Cheap token-count estimates for prompt budgeting.
+
+Uses the common ~4 characters per token heuristic plus a small per-message
+overhead.  Good enough to enforce budgets without loading a tokenizer.
+"""
+
+from __future__ import annotations
+
+import json
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message) -> int:
+    """Estimate the tokens a single LangChain message adds to a prompt."""
+    content = getattr(message, "content", "")
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tokens += estimate_tokens(json.dumps(
+            [{"name": c["name"], "args": c["args"]} for c in tool_calls], default=str
+        ))
+    return tokens
+
+
+def estimate_messages_tokens(messages: list) -> int:
+    """Estimate the total prompt tokens of a message list."""
+    return sum(estimate_message_tokens(m) for m in messages)
@@ -0,0 +1,99 @@
+"""
+tool_cache.py — Tool results shared by every graph run in a scope.
+
+Inside `shared_tool_results(cache)` the `ToolExecutor` looks each call up by
+(tool name, arguments) before running it, so runs that need the same data —
+one city's weather, the EUR→USD rate — fetch it once.  Identical calls that
+overlap wait for the one already in flight.  The cache lives in a
+ContextVar, so it reaches graph nodes and worker threads started inside the
+scope, and is dropped with it.  Failed calls are not kept.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator
+
+from utils.metrics import metrics
+from utils.single_flight import SingleFlight
+
+_cache: ContextVar[ToolResultCache | None] = ContextVar("tool_result_cache", default=None)
+
+
+class ToolResultCache:
+    """Tool outputs keyed by (name, canonical JSON of the arguments)."""
+
+    def __init__(self) -> None:
+        self._flight = SingleFlight()       # async calls still in flight
+        self._running: dict[str, Future] = {}  # sync calls still in flight
+        self._results: dict[str, Any] = {}  # finished calls
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, args: dict) -> str:
+        return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+    async def arun(self, name: str, args: dict, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached output of `name(args)`, awaiting `fn()` on a miss."""
+        key = self.key(name, args)
+        with self._lock:
+            if key in self._results:
+                metrics.incr("tools.shared_cache_hits")
+                return self._results[key]
+        if self._flight.lookup(key) is not None:
+            metrics.incr("tools.shared_cache_hits")
+        output = await self._flight.do(key, fn, keep_for=float("inf"))
+        with self._lock:
+            self._results[key] = output
+        return output
+
+    def run(self, name: str, args: dict, fn: Callable[[], Any]) -> Any:
+        """
+        Synchronous counterpart of `arun` for the thread-pool path: the
+        first thread to miss runs `fn()`, identical calls that overlap it
+        block on its result (or its exception).
+        """
+        key = self.key(name, args)
+        with self._lock:
+            if key in self._results:
+                metrics.incr("tools.shared_cache_hits")
+                return self._results[key]
+            future = self._running.get(key)
+            leader = future is None
+            if leader:
+                future = self._running[key] = Future()
+        if not leader:
+            metrics.incr("tools.shared_cache_hits")
+            return future.result()
+
+        try:
+            output = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._results[key] = output
+            del self._running[key]
+        future.set_result(output)
+        return output
+
+
+@contextmanager
+def shared_tool_results(cache: ToolResultCache) -> Iterator[ToolResultCache]:
+    """Share `cache` between every tool call made inside the block."""
+    token = _cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _cache.reset(token)
+
+
+def current() -> ToolResultCache | None:
+    """The cache of the enclosing `shared_tool_results` block, if any."""
+    return _cache.get()
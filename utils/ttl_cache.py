@@ -0,0 +1,64 @@
+"""
+ttl_cache.py — Small thread-safe TTL + LRU cache for upstream API results.
+
+Used by the tool backends to keep upstream payloads for as long as the
+upstream itself takes to refresh them.  Expired entries are kept until LRU
+eviction, so `get_stale` can still serve them while an upstream is down.
+Hits and misses are counted in `utils.metrics` under `<name>.hits` /
+`<name>.misses`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from utils.metrics import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Mapping of key → value where each entry expires `ttl` seconds after `set`."""
+
+    def __init__(self, name: str, max_entries: int = 1024) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for `key`, or `default` if missing or expired."""
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_MISSING, 0.0))
+            if value is not _MISSING and time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+            else:
+                # An expired entry stays for `get_stale` until evicted
+                value = _MISSING
+        metrics.incr(f"{self.name}.{'misses' if value is _MISSING else 'hits'}")
+        return default if value is _MISSING else value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for `key` even if expired (an upstream-down fallback)."""
+        with self._lock:
+            value, _ = self._entries.get(key, (default, 0.0))
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
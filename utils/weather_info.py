@@ -1,7 +1,17 @@
+import asyncio
+import contextvars
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 from dotenv import load_dotenv
 
+from exception.handling import UpstreamUnavailable
+from utils.config_loader import load_config
+from utils.http_client import get_client
+from utils.metrics import metrics
+from utils.ttl_cache import TTLCache
+
 load_dotenv()
 
 
@@ -9,6 +19,16 @@ class WeatherInfo:
     """
     Retrieves current weather and forecast data from OpenWeatherMap.
     All temperatures are returned in Celsius (units='metric').
+
+    Every lookup has a blocking variant and an ``a``-prefixed coroutine
+    variant for the async /query path; both share the same parsing and the
+    pooled "openweathermap" client (`utils.http_client`).
+
+    Results are cached per city for as long as OWM takes to refresh them
+    (`tools.weather` in config.yaml): current conditions for minutes, the
+    forecast — stored already aggregated into days — for hours.  While the
+    upstream's circuit breaker is open, an expired entry is served instead
+    (current conditions marked ``"stale": True``).
     """
 
     BASE_URL = "https://api.openweathermap.org/data/2.5"
@@ -19,6 +39,32 @@ class WeatherInfo:
             raise EnvironmentError(
                 "OPENWEATHERMAP_API_KEY is not set in environment variables."
             )
+        self.http = get_client("openweathermap")
+
+        weather_config = load_config()["tools"]["weather"]
+        self.current_ttl = weather_config["current_ttl_seconds"]
+        self.forecast_ttl = weather_config["forecast_ttl_seconds"]
+        self.bundle_max_concurrency = weather_config["bundle_max_concurrency"]
+        self._current = TTLCache("weather.current_cache", weather_config["max_cached_cities"])
+        self._forecast = TTLCache("weather.forecast_cache", weather_config["max_cached_cities"])
+
+    def _params(self, city: str, **extra) -> dict:
+        return {"q": city, "appid": self.api_key, "units": "metric", **extra}
+
+    @staticmethod
+    def _city_key(city: str) -> str:
+        return " ".join(city.lower().split())
+
+    @staticmethod
+    def _stale(cache: TTLCache, key: str, error: UpstreamUnavailable):
+        """The expired cache entry for `key`, or re-raise `error` if there is none."""
+        value = cache.get_stale(key)
+        if value is None:
+            raise error
+        metrics.incr("weather.stale_served")
+        return value
+
+    # ── Current conditions ────────────────────────────────────────────────
 
     def get_current_weather(self, city: str) -> dict:
         """
@@ -31,17 +77,32 @@ class WeatherInfo:
             Dictionary with keys: city, temperature, feels_like, humidity,
             description, wind_speed, units.
         """
-        params = {
-            "q": city,
-            "appid": self.api_key,
-            "units": "metric",
-        }
-        response = requests.get(
-            f"{self.BASE_URL}/weather", params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-
+        key = self._city_key(city)
+        current = self._current.get(key)
+        if current is None:
+            try:
+                response = self.http.get(f"{self.BASE_URL}/weather", params=self._params(city))
+            except UpstreamUnavailable as e:
+                return {**self._stale(self._current, key, e), "stale": True}
+            current = self._parse_current(response.json())
+            self._current.set(key, current, self.current_ttl)
+        return dict(current)
+
+    async def aget_current_weather(self, city: str) -> dict:
+        """Async variant of `get_current_weather`."""
+        key = self._city_key(city)
+        current = self._current.get(key)
+        if current is None:
+            try:
+                response = await self.http.aget(f"{self.BASE_URL}/weather", params=self._params(city))
+            except UpstreamUnavailable as e:
+                return {**self._stale(self._current, key, e), "stale": True}
+            current = self._parse_current(response.json())
+            self._current.set(key, current, self.current_ttl)
+        return dict(current)
+
+    @staticmethod
+    def _parse_current(data: dict) -> dict:
         return {
             "city": data["name"],
             "temperature": data["main"]["temp"],
@@ -52,6 +113,8 @@ class WeatherInfo:
             "units": "metric",
         }
 
+    # ── Forecast ──────────────────────────────────────────────────────────
+
     def get_forecast_weather(self, city: str, days: int = 5) -> list[dict]:
         """
         Fetch a multi-day weather forecast for a city.
@@ -65,19 +128,36 @@ class WeatherInfo:
             List of daily forecast dictionaries, each with keys: date,
             avg_temp, min_temp, max_temp, description, units.
         """
-        params = {
-            "q": city,
-            "appid": self.api_key,
-            "units": "metric",
-            "cnt": 40,  # 40 × 3-hour slots = full 5-day window (OWM max)
-        }
-        response = requests.get(
-            f"{self.BASE_URL}/forecast", params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        # Aggregate 3-hour intervals into daily summaries
+        key = self._city_key(city)
+        forecast = self._forecast.get(key)
+        if forecast is None:
+            # 40 × 3-hour slots = full 5-day window (OWM max)
+            try:
+                response = self.http.get(f"{self.BASE_URL}/forecast", params=self._params(city, cnt=40))
+            except UpstreamUnavailable as e:
+                forecast = self._stale(self._forecast, key, e)
+                return [dict(day) for day in forecast[:days]]
+            forecast = self._aggregate_forecast(response.json())
+            self._forecast.set(key, forecast, self.forecast_ttl)
+        return [dict(day) for day in forecast[:days]]
+
+    async def aget_forecast_weather(self, city: str, days: int = 5) -> list[dict]:
+        """Async variant of `get_forecast_weather`."""
+        key = self._city_key(city)
+        forecast = self._forecast.get(key)
+        if forecast is None:
+            try:
+                response = await self.http.aget(f"{self.BASE_URL}/forecast", params=self._params(city, cnt=40))
+            except UpstreamUnavailable as e:
+                forecast = self._stale(self._forecast, key, e)
+                return [dict(day) for day in forecast[:days]]
+            forecast = self._aggregate_forecast(response.json())
+            self._forecast.set(key, forecast, self.forecast_ttl)
+        return [dict(day) for day in forecast[:days]]
+
+    @staticmethod
+    def _aggregate_forecast(data: dict) -> list[dict]:
+        """Aggregate 3-hour intervals into daily summaries."""
         daily: dict[str, dict] = {}
         for entry in data["list"]:
             date = entry["dt_txt"].split(" ")[0]
@@ -94,11 +174,78 @@ class WeatherInfo:
             daily[date]["temps"].append(temp)
 
         forecast = []
-        for day_data in list(daily.values())[:days]:
+        for day_data in daily.values():
             temps = day_data.pop("temps")
             day_data["avg_temp"] = round(sum(temps) / len(temps), 1)
             day_data["min_temp"] = round(min(temps), 1)
             day_data["max_temp"] = round(max(temps), 1)
             forecast.append(day_data)
 
-        return forecast
\ No newline at end of file
+        return forecast
+
+    # ── Bundle (several cities, current + forecast) ──────────────────────
+
+    def get_weather_bundle(self, cities: list[str], days: int = 5) -> dict:
+        """
+        Fetch current conditions and the daily forecast for several cities.
+
+        Cities (and each city's two endpoints) are fetched concurrently;
+        cached results cost no upstream call.
+
+        Returns:
+            {city: {"current": {...}, "forecast": [...]}}, or
+            {city: {"error": "..."}} for a city that could not be fetched.
+        """
+        cities = list(dict.fromkeys(cities))
+        if not cities:
+            return {}
+        workers = min(self.bundle_max_concurrency, 2 * len(cities))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather") as pool:
+            # Copy the context so the request deadline reaches the workers
+            futures = {
+                city: (
+                    pool.submit(contextvars.copy_context().run, self.get_current_weather, city),
+                    pool.submit(contextvars.copy_context().run, self.get_forecast_weather, city, days),
+                )
+                for city in cities
+            }
+            bundle = {}
+            for city, (current, forecast) in futures.items():
+                try:
+                    bundle[city] = {"current": current.result(), "forecast": forecast.result()}
+                except Exception as e:
+                    bundle[city] = {"error": self._describe_error(e)}
+        return bundle
+
+    async def aget_weather_bundle(self, cities: list[str], days: int = 5) -> dict:
+        """Async variant of `get_weather_bundle`."""
+        cities = list(dict.fromkeys(cities))
+        semaphore = asyncio.Semaphore(self.bundle_max_concurrency)
+
+        async def limited(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        async def fetch(city: str) -> dict:
+            try:
+                current, forecast = await asyncio.gather(
+                    limited(self.aget_current_weather(city)),
+                    limited(self.aget_forecast_weather(city, days)),
+                )
+            except Exception as e:
+                return {"error": self._describe_error(e)}
+            return {"current": current, "forecast": forecast}
+
+        results = await asyncio.gather(*(fetch(city) for city in cities))
+        return dict(zip(cities, results))
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """Error text for the model — without the request URL, which carries the API key."""
+        if isinstance(error, httpx.HTTPStatusError):
+            if error.response.status_code == 404:
+                return "City not found."
+            return f"OpenWeatherMap returned HTTP {error.response.status_code}."
+        if isinstance(error, UpstreamUnavailable):
+            return "OpenWeatherMap is temporarily unavailable."
+        return f"{type(error).__name__}: could not reach OpenWeatherMap."